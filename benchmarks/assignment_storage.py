@@ -0,0 +1,97 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from assignment import Assignment  # noqa: E402
+from compact_assignment import CompactAssignment  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+IMPLEMENTATIONS = {"dict": Assignment, "compact": CompactAssignment}
+
+
+def generate_pairs(n_students: int, n_activities: int, seed: int) -> list[tuple[int, int]]:
+    rng = random.Random(seed)
+    return [
+        (student_id, activity_id)
+        for student_id in range(1, n_students + 1)
+        for activity_id in rng.sample(range(1, n_activities + 1), rng.randint(1, 3))
+    ]
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def assign_one_by_one(assignment: Assignment, pairs: list[tuple[int, int]]) -> None:
+    for student_id, activity_id in pairs:
+        assignment.assign_student_to_activity_by_id(student_id, activity_id)
+
+
+def run_implementation(name: str, pairs: list[tuple[int, int]], n_students: int, n_activities: int) -> dict:
+    cls = IMPLEMENTATIONS[name]
+    # Warm up, so one-off allocations (e.g. numpy's caches) are not counted as storage.
+    cls.from_pairs(pairs[:100]).as_dict()
+    tracemalloc.start()
+    assignment = cls.from_pairs(pairs)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    student_ids = range(1, n_students + 1)
+    activity_ids = range(1, n_activities + 1)
+    return {
+        "implementation": name,
+        "memory_mb": memory / 2**20,
+        "bytes_per_pair": memory / len(pairs),
+        "from_pairs_seconds": timed(lambda: cls.from_pairs(pairs)),
+        "assign_seconds": timed(lambda: assign_one_by_one(cls(), pairs)),
+        "is_empty_seconds": timed(lambda: [assignment.is_empty() for _ in range(1000)]),
+        "participant_count_seconds": timed(lambda: [assignment.participant_count(a) for a in activity_ids]),
+        "activities_for_student_seconds": timed(
+            lambda: [assignment.get_activities_for_student(s) for s in student_ids]
+        ),
+        "students_for_activity_seconds": timed(
+            lambda: [assignment.get_students_for_activity(a) for a in activity_ids if assignment.activity_known(a)]
+        ),
+        "as_dict_seconds": timed(assignment.as_dict),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vergleicht Speicher und Laufzeit der beiden Zuteilungsspeicher.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--students-per-activity", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="JSON-Datei; sonst auf die Standardausgabe.")
+    args = parser.parse_args()
+
+    records = []
+    for n_students in args.sizes:
+        n_activities = max(n_students // args.students_per_activity, 5)
+        pairs = generate_pairs(n_students, n_activities, args.seed)
+        for name in IMPLEMENTATIONS:
+            record = run_implementation(name, pairs, n_students, n_activities)
+            record.update(n_students=n_students, n_activities=n_activities, n_pairs=len(pairs))
+            records.append(record)
+            print(
+                f"{n_students:>7} Kinder, {name:>7}: {record['memory_mb']:.1f} MB, "
+                f"{record['from_pairs_seconds']:.3f} s Aufbau, {record['is_empty_seconds']:.4f} s is_empty",
+                file=sys.stderr,
+            )
+
+    output = json.dumps(records, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from assignment import is_transportation_problem, solve_assignment  # noqa: E402
+from generator import GeneratorSettings, generate_instance  # noqa: E402
+from solver import SolverSettings  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vergleicht den Min-Cost-Flow-Pfad mit dem MILP-Solver.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", default="cbc")
+    args = parser.parse_args()
+
+    print(f"{'Kinder':>8} {'Kurse':>6} {'Flow [s]':>10} {'MILP [s]':>10} {'Zielwert gleich':>16}")
+    for n_students in args.sizes:
+        # No timespans and no minimum capacities, so the instance stays a pure flow.
+        generator_settings = GeneratorSettings(
+            n_students=n_students,
+            n_activities=max(n_students // 20, 7),
+            preference_count_weights=[0, 0, 1],
+            overlap_density=0.0,
+            min_capacity_share=0.0,
+        )
+        students, activities = generate_instance(generator_settings, args.seed)
+        assert is_transportation_problem(students, activities)
+
+        results = []
+        for flow_fast_path in (True, False):
+            start = time.perf_counter()
+            result = solve_assignment(
+                students, activities, SolverSettings(backend=args.backend, flow_fast_path=flow_fast_path)
+            )
+            results.append((time.perf_counter() - start, result.objective))
+
+        (flow_time, flow_objective), (milp_time, milp_objective) = results
+        print(
+            f"{n_students:>8} {len(activities):>6} {flow_time:>10.3f} {milp_time:>10.3f} "
+            f"{str(flow_objective == milp_objective):>16}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from assignment import assign_students, solve_assignment  # noqa: E402
+from generator import GeneratorSettings, generate_instance  # noqa: E402
+from solver import SolverSettings  # noqa: E402
+
+DEFAULT_SIZES = [100, 300, 1000, 3000, 10000]
+# Everything from the students and activities up to the input of the solver. Paths that skip a step, e.g. the
+# heuristic, simply do not record its phase.
+MODEL_PHASES = ["symmetry", "presolve", "build_model", "patch_model", "backend_build", "write_mps"]
+
+
+def run_size(n_students: int, args: argparse.Namespace) -> dict:
+    generator_settings = GeneratorSettings(
+        n_students=n_students,
+        n_activities=max(n_students // args.students_per_activity, 5),
+        overlap_density=args.overlap_density,
+        capacity_tightness=args.capacity_tightness,
+        min_capacity_share=args.min_capacity_share,
+    )
+    students, activities = generate_instance(generator_settings, args.seed)
+    settings = SolverSettings(backend=args.backend, time_limit=args.time_limit)
+
+    start = time.perf_counter()
+    result = solve_assignment(students, activities, settings)
+    solve_seconds = time.perf_counter() - start
+    assignment = result.assignment
+
+    start = time.perf_counter()
+    violations = assignment.check_validity(students, activities)
+    check_seconds = time.perf_counter() - start
+
+    record = {
+        "generator": generator_settings.to_dict(),
+        "seed": args.seed,
+        "backend": args.backend,
+        "stats": result.stats.to_dict(),
+        "build_seconds": sum(result.stats.phases.get(name, 0.0) for name in MODEL_PHASES),
+        "solve_seconds": solve_seconds,
+        "check_seconds": check_seconds,
+        "violations": len(violations),
+    }
+    if args.memory:
+        # A separate run, since tracing allocations slows Python down considerably. External solver processes
+        # (e.g. the CBC binary) are not covered.
+        tracemalloc.start()
+        assign_students(students, activities, settings)
+        record["python_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return record
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Misst die Laufzeit der Zuteilung über verschiedene Schulgrößen.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", default="cbc")
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--students-per-activity", type=int, default=20)
+    parser.add_argument("--overlap-density", type=float, default=0.5)
+    parser.add_argument("--capacity-tightness", type=float, default=0.8)
+    parser.add_argument("--min-capacity-share", type=float, default=0.1)
+    parser.add_argument("--memory", action="store_true", help="Zusätzlich den Spitzenspeicher messen.")
+    parser.add_argument("--output", type=Path, default=None, help="JSON-Datei; sonst auf die Standardausgabe.")
+    args = parser.parse_args()
+
+    records = []
+    for n_students in args.sizes:
+        records.append(run_size(n_students, args))
+        print(
+            f"{n_students:>6} Kinder: {records[-1]['build_seconds']:.3f} s Modell, "
+            f"{records[-1]['solve_seconds']:.3f} s Zuteilung",
+            file=sys.stderr,
+        )
+
+    output = json.dumps(records, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output)
+
+
+if __name__ == "__main__":
+    main()
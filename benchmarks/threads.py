@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from assignment import solve_assignment  # noqa: E402
+from generator import GeneratorSettings, generate_instance  # noqa: E402
+from solver import CUT_STRATEGIES, SolverSettings  # noqa: E402
+
+DEFAULT_THREADS = [1, 2, 4, 8, 16]
+
+
+def run_threads(args: argparse.Namespace) -> list[dict]:
+    generator_settings = GeneratorSettings(
+        n_students=args.students,
+        n_activities=max(args.students // args.students_per_activity, 5),
+        overlap_density=args.overlap_density,
+        capacity_tightness=args.capacity_tightness,
+        min_capacity_share=args.min_capacity_share,
+    )
+    students, activities = generate_instance(generator_settings, args.seed)
+
+    records = []
+    for threads in args.threads:
+        settings = SolverSettings(
+            backend=args.backend,
+            time_limit=args.time_limit,
+            threads=threads,
+            seed=args.solver_seed,
+            presolve=not args.no_presolve,
+            cuts=args.cuts,
+            # The fast paths would skip the solver whose threads are measured here.
+            flow_fast_path=False,
+            aggregate_interchangeable=False,
+        )
+        start = time.perf_counter()
+        result = solve_assignment(students, activities, settings)
+        records.append(
+            {
+                "generator": generator_settings.to_dict(),
+                "seed": args.seed,
+                "settings": settings.to_dict(),
+                "stats": result.stats.to_dict(),
+                "objective": result.objective,
+                "gap": result.gap,
+                "seconds": time.perf_counter() - start,
+            }
+        )
+        print(
+            f"{threads:>3} Threads: {records[-1]['seconds']:.3f} s, Zielwert {result.objective:.0f}",
+            file=sys.stderr,
+        )
+    return records
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Misst die Laufzeit des Solvers mit verschiedenen Thread-Anzahlen.")
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[n for n in DEFAULT_THREADS if n <= os.cpu_count()])
+    parser.add_argument("--seed", type=int, default=0, help="Startwert des Generators.")
+    parser.add_argument("--solver-seed", type=int, default=1, help="Startwert des Solvers.")
+    parser.add_argument("--backend", default="cbc-mps")
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--no-presolve", action="store_true")
+    parser.add_argument("--cuts", choices=CUT_STRATEGIES, default="auto")
+    parser.add_argument("--students-per-activity", type=int, default=20)
+    parser.add_argument("--overlap-density", type=float, default=1.0)
+    parser.add_argument("--capacity-tightness", type=float, default=0.8)
+    parser.add_argument("--min-capacity-share", type=float, default=0.2)
+    parser.add_argument("--output", type=Path, default=None, help="JSON-Datei; sonst auf die Standardausgabe.")
+    args = parser.parse_args()
+
+    output = json.dumps(run_threads(args), indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output)
+
+
+if __name__ == "__main__":
+    main()
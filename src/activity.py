@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import copy
 from dataclasses import dataclass, field
 
 from dataclasses_json import dataclass_json
 from singleton_decorator import singleton
 
 from id_generator import IDGenerator, ID
+from student import Student
 
 
 @singleton
@@ -102,3 +104,56 @@ class Activity:
 
 def get_activity_id_map(activities: list[Activity]) -> dict[ID, Activity]:
     return {activity.id: activity for activity in activities}
+
+
+def split_activity(activity: Activity, students: list[Student]) -> Activity:
+    # Renames the activity to "<name> 1" and returns its twin "<name> 2", which every student who chose the
+    # original also chooses with the same preference. The caller adds the twin to its activities.
+    twin = Activity(
+        name=f"{activity.name} 2",
+        min_capacity=activity.min_capacity,
+        max_capacity=activity.max_capacity,
+        timespan=copy.deepcopy(activity.timespan),
+        first_date=activity.first_date,
+        valid_grades=copy.deepcopy(activity.valid_grades),
+    )
+    for student in students:
+        if activity.id in student.preferences:
+            student.preferences[twin.id] = student.preferences[activity.id]
+    activity.name = f"{activity.name} 1"
+    return twin
+
+
+def get_overlap_cliques(activities: list[Activity]) -> list[list[ID]]:
+    # Sweep over the slot boundaries. In doubled coordinates a timespan occupies the closed interval
+    # [2 * from_slot + 1, 2 * to_slot - 1] and an empty timespan the single point 2 * from_slot, which turns the
+    # strict inequalities of Timespan.overlap into plain interval intersection. Empty timespans never overlap each
+    # other, so they are only ever added on top of the currently running activities.
+    start, point, end = 0, 1, 2
+    events = []
+    for activity in activities:
+        timespan = activity.timespan
+        if timespan.from_slot == timespan.to_slot:
+            events.append((2 * timespan.from_slot, point, activity.id))
+        else:
+            events.append((2 * timespan.from_slot + 1, start, activity.id))
+            events.append((2 * timespan.to_slot - 1, end, activity.id))
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    cliques = []
+    running: dict[ID, None] = {}
+    grown = False
+    for _, kind, activity_id in events:
+        if kind == start:
+            running[activity_id] = None
+            grown = True
+        elif kind == point:
+            if running:
+                cliques.append(list(running) + [activity_id])
+        else:
+            if grown and len(running) > 1:
+                cliques.append(list(running))
+            grown = False
+            del running[activity_id]
+
+    return cliques
@@ -1,13 +1,27 @@
 from __future__ import annotations
 
-from collections import defaultdict
-from typing import Any
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import partial
+from itertools import chain, combinations
+from threading import Event
+from typing import TYPE_CHECKING, Any, Iterable
+
+import numpy as np
 
 from activity import Activity, get_activity_id_map
+from decomposition import solve_decomposed
+from flow import solve_min_cost_flow
 from id_generator import ID
+from model import NO_COURSE_PENALTY, build_model
+from presolve import presolve
+from persistent_model import PersistentModel
+from solver import HEURISTIC_BACKEND, ProgressCallback, SolverSettings, SolveStats, solve_model
 from student import Student
+from symmetry import aggregate_interchangeable
 
-import pulp
+if TYPE_CHECKING:
+    from cache import SolutionCache
 
 
 class AssignmentException(Exception):
@@ -59,6 +73,11 @@ class ActivityNotPreferred(AssignmentException):
         super().__init__(f"Kind {student} ist zu Kurs {activity} hinzugefügt den es nicht gewählt hat.")
 
 
+class OverlappingActivities(AssignmentException):
+    def __init__(self, student: Student, activity_0: Activity, activity_1: Activity):
+        super().__init__(f"Kind {student} ist zu den gleichzeitigen Kursen {activity_0} und {activity_1} zugeteilt.")
+
+
 class Assignment:
     def __init__(self):
         self._student_to_activities_map: defaultdict[ID, set[ID]] = defaultdict(set)
@@ -81,15 +100,38 @@ class Assignment:
     def from_dict(cls, data: dict[str, Any]) -> Assignment:
         assert set(data.keys()) == {"student_activity_map", "activity_student_map"}
         assignment = cls()
-        assignment._student_to_activities_map = {
-            int(student_id): set(activity_ids) for student_id, activity_ids in data["student_activity_map"].items()
-        }
-        assignment._activity_to_students_map = {
-            int(activity_id): set(student_ids) for activity_id, student_ids in data["activity_student_map"].items()
-        }
+        assignment._student_to_activities_map = defaultdict(
+            set,
+            {int(student_id): set(activity_ids) for student_id, activity_ids in data["student_activity_map"].items()},
+        )
+        assignment._activity_to_students_map = defaultdict(
+            set,
+            {int(activity_id): set(student_ids) for activity_id, student_ids in data["activity_student_map"].items()},
+        )
 
         return assignment
 
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[tuple[ID, ID]]) -> Assignment:
+        # Fills both maps directly instead of calling assign_student_to_activity_by_id per pair.
+        assignment = cls()
+        student_to_activities = assignment._student_to_activities_map
+        activity_to_students = assignment._activity_to_students_map
+        for student_id, activity_id in pairs:
+            student_to_activities[student_id].add(activity_id)
+            activity_to_students[activity_id].add(student_id)
+        return assignment
+
+    def pair_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        # Student and activity IDs of all pairs, in no particular order.
+        student_map = self._student_to_activities_map
+        students = np.repeat(
+            np.fromiter(student_map.keys(), dtype=np.int64, count=len(student_map)),
+            np.fromiter(map(len, student_map.values()), dtype=np.int64, count=len(student_map)),
+        )
+        activities = np.fromiter(chain.from_iterable(student_map.values()), dtype=np.int64, count=len(students))
+        return students, activities
+
     def __eq__(self, other: Assignment) -> bool:
         if not set(self._student_to_activities_map.keys()) == set(other._student_to_activities_map.keys()):
             return False
@@ -146,98 +188,258 @@ class Assignment:
     def participant_count(self, activity_id: ID) -> int:
         return len(self._activity_to_students_map.get(activity_id, []))
 
+    def student_violations(self, student: Student, activity_map: dict[ID, Activity]) -> list[AssignmentException]:
+        try:
+            assigned_activities = self.get_activities_for_student(student.id)
+        except StudentIDNotAssigned as e:
+            return [e]
+        if len(assigned_activities) == 0:
+            return [NoAssignedActivity(student)]
+
+        exceptions: list[AssignmentException] = []
+        for activity_id in assigned_activities:
+            activity = activity_map[activity_id]
+            if activity_id not in student.preferences:
+                exceptions.append(ActivityNotPreferred(student, activity))
+                continue
+
+            if not activity.is_valid_grade(student.grade):
+                exceptions.append(GradeRestrictionViolation(student, activity))
+                continue
+
+        for activity_id_0, activity_id_1 in combinations(sorted(assigned_activities), 2):
+            if Activity.overlap(activity_map[activity_id_0], activity_map[activity_id_1]):
+                exceptions.append(
+                    OverlappingActivities(student, activity_map[activity_id_0], activity_map[activity_id_1])
+                )
+        return exceptions
+
+    def activity_violations(self, activity: Activity) -> list[AssignmentException]:
+        participant_count = self.participant_count(activity.id)
+        if participant_count < activity.min_capacity:
+            return [MinimumCapacityNotReached(activity, participant_count)]
+        if participant_count > activity.max_capacity:
+            return [MaximumCapacityReached(activity, participant_count)]
+        return []
+
     def check_validity(self, students: list[Student], activities: list[Activity]) -> list[AssignmentException]:
         exceptions = []
 
         activity_map = {activity.id: activity for activity in activities}
 
         for student in students:
-            try:
-                assigned_activities = self.get_activities_for_student(student.id)
-            except StudentIDNotAssigned as e:
-                exceptions.append(e)
-                continue
-            if len(assigned_activities) == 0:
-                exceptions.append(NoAssignedActivity(student))
-                continue
-
-            for activity_id in assigned_activities:
-                activity = activity_map[activity_id]
-                if activity_id not in student.preferences:
-                    exceptions.append(ActivityNotPreferred(student, activity))
-                    continue
-
-                if not activity.is_valid_grade(student.grade):
-                    exceptions.append(GradeRestrictionViolation(student, activity))
-                    continue
+            exceptions.extend(self.student_violations(student, activity_map))
 
         for activity in activities:
-            participant_count = self.participant_count(activity.id)
-            if participant_count < activity.min_capacity:
-                exceptions.append(MinimumCapacityNotReached(activity, participant_count))
-                continue
-            if participant_count > activity.max_capacity:
-                exceptions.append(MaximumCapacityReached(activity, participant_count))
-                continue
+            exceptions.extend(self.activity_violations(activity))
 
         return exceptions
 
 
-def assign_students(students: list[Student], activities: list[Activity]) -> Assignment:
+def check_preferences(students: list[Student], activities: list[Activity]) -> None:
     activity_map = get_activity_id_map(activities)
     for student in students:
         for activity_id in student.preferences:
             if activity_id not in activity_map:
                 raise ActivityIDNotAssigned(activity_id)
 
-    def is_valid(stud: Student, act: Activity) -> bool:
-        return act.id in stud.preferences and act.is_valid_grade(stud.grade)
-
-    prob = pulp.LpProblem("StudentActivityAssignment", pulp.LpMaximize)
-    x = {}
-    no_course_penalties = {}
-    for student in students:
-        for activity in activities:
-            x[(student.id, activity.id)] = pulp.LpVariable(f"x_{student.id}_{activity.id}", 0, 1, pulp.LpBinary)
-        no_course_penalties[student.id] = pulp.LpVariable(f"x_{student.id}_pen", 0, None, pulp.LpInteger)
-
-    for activity in activities:
-        prob += pulp.lpSum(x[(student.id, activity.id)] for student in students) <= activity.max_capacity
-        prob += pulp.lpSum(x[(student.id, activity.id)] for student in students) >= activity.min_capacity
 
+def objective_value(students: list[Student], assignment: Assignment) -> float:
+    value = 0.0
     for student in students:
-        prob += (
-            pulp.lpSum(x[(student.id, activity.id)] for activity in activities if not is_valid(student, activity)) == 0
-        )
-        prob += (
-            pulp.lpSum(x[(student.id, activity.id)] for activity in activities if is_valid(student, activity))
-            + no_course_penalties[student.id]
-            >= 1
+        assigned_activities = (
+            assignment.get_activities_for_student(student.id) if assignment.student_known(student.id) else []
         )
+        if len(assigned_activities) == 0:
+            value -= NO_COURSE_PENALTY
+        for activity_id in assigned_activities:
+            value += 10 - student.preferences[activity_id]
+    return value
 
-    for activity_0 in activities:
-        for activity_1 in activities:
-            if activity_0 == activity_1:
-                continue
-            if not Activity.overlap(activity_0, activity_1):
-                continue
-            for student in students:
-                prob += x[student.id, activity_0.id] + x[student.id, activity_1.id] <= 1
 
-    prob += pulp.lpSum(
-        x[(student.id, activity.id)] * (10 - student.preferences[activity.id])
+def get_settled_students(students: list[Student], activities: list[Activity], assignment: Assignment) -> set[ID]:
+    activity_map = get_activity_id_map(activities)
+    assigned_activities = {
+        student.id: assignment.get_activities_for_student(student.id)
         for student in students
+        if assignment.student_known(student.id)
+    }
+    participant_counts = Counter(chain.from_iterable(assigned_activities.values()))
+    unsettled_activities = {
+        activity.id
         for activity in activities
-        if is_valid(student, activity)
-    ) - 1000 * pulp.lpSum(no_course_penalties[student.id] for student in students)
-
-    solver = pulp.PULP_CBC_CMD(msg=False)
-    prob.solve(solver)
+        if not activity.min_capacity <= participant_counts[activity.id] <= activity.max_capacity
+    }
 
-    assignment = Assignment()
+    settled_students = set()
+    for student in students:
+        activity_ids = assigned_activities.get(student.id, [])
+        if len(activity_ids) == 0 or any(activity_id not in activity_map for activity_id in activity_ids):
+            continue
+        if unsettled_activities.intersection(student.preferences):
+            continue
+        assigned = [activity_map[activity_id] for activity_id in activity_ids]
+        if any(
+            activity.id not in student.preferences or not activity.is_valid_grade(student.grade)
+            for activity in assigned
+        ):
+            continue
+        if any(Activity.overlap(activity_0, activity_1) for activity_0, activity_1 in combinations(assigned, 2)):
+            continue
+        settled_students.add(student.id)
+
+    return settled_students
+
+
+def _assigned_pairs(students: list[Student], assignment: Assignment) -> set[tuple[ID, ID]]:
+    return {
+        (student.id, activity_id)
+        for student in students
+        if assignment.student_known(student.id)
+        for activity_id in assignment.get_activities_for_student(student.id)
+    }
 
-    for (student_id, activity_id), var in x.items():
-        if var.varValue == 1:
-            assignment.assign_student_to_activity_by_id(student_id, activity_id)
 
-    return assignment
+def is_transportation_problem(students: list[Student], activities: list[Activity]) -> bool:
+    # Without minimum capacities and without overlapping choices the model is a pure min-cost flow.
+    if any(activity.min_capacity > 0 for activity in activities):
+        return False
+    activity_map = get_activity_id_map(activities)
+    for student in students:
+        chosen = [
+            activity_map[activity_id]
+            for activity_id in student.preferences
+            if activity_map[activity_id].is_valid_grade(student.grade)
+        ]
+        if any(Activity.overlap(activity_0, activity_1) for activity_0, activity_1 in combinations(chosen, 2)):
+            return False
+    return True
+
+
+@dataclass
+class AssignmentResult:
+    assignment: Assignment
+    status: str
+    objective: float
+    bound: float | None
+    gap: float | None
+    stats: SolveStats | None = None
+
+
+def solve_assignment(
+    students: list[Student],
+    activities: list[Activity],
+    settings: SolverSettings | None = None,
+    initial_assignment: Assignment | None = None,
+    incremental: bool = False,
+    progress_callback: ProgressCallback | None = None,
+    cancel_event: Event | None = None,
+    cache: SolutionCache | None = None,
+    persistent_model: PersistentModel | None = None,
+) -> AssignmentResult:
+    settings = settings or SolverSettings()
+    stats = SolveStats()
+    check_preferences(students, activities)
+
+    if cache is not None:
+        with stats.phase("cache"):
+            key = cache.key(students, activities, settings, initial_assignment, incremental)
+            cached_result = cache.get(key)
+        if cached_result is not None:
+            stats.path = "cache"
+            stats.status = cached_result.status
+            cached_result.stats = stats
+            return cached_result
+
+    if settings.backend == HEURISTIC_BACKEND:
+        # heuristic.py builds on this module, so it is only imported here.
+        from heuristic import HeuristicSettings, solve_heuristic
+
+        stats.path = HEURISTIC_BACKEND
+        with stats.phase("solver"):
+            heuristic_settings = HeuristicSettings(time_limit=settings.time_limit, seed=settings.seed)
+            result = solve_heuristic(students, activities, heuristic_settings, progress_callback, cancel_event)
+        stats.status = result.status
+        result.stats = stats
+        if cache is not None:
+            cache.put(key, result)
+        return result
+
+    # Split courses are solved as one course with the summed capacity and split up again afterwards.
+    previous_pairs = None if initial_assignment is None else _assigned_pairs(students, initial_assignment)
+    # Presolve raises right away if guaranteed courses or capacities already rule out every assignment.
+    if persistent_model is not None:
+        prepared = persistent_model.prepare(students, activities, settings.aggregate_interchangeable, stats)
+        aggregation, students, activities = prepared.aggregation, prepared.students, prepared.activities
+        reductions = prepared.reductions
+    else:
+        aggregation = None
+        if settings.aggregate_interchangeable:
+            with stats.phase("symmetry"):
+                aggregation = aggregate_interchangeable(students, activities)
+        if aggregation is not None:
+            students, activities = aggregation.students, aggregation.activities
+        with stats.phase("presolve"):
+            reductions = presolve(students, activities)
+    if aggregation is not None and initial_assignment is not None:
+        initial_assignment = Assignment.from_pairs(aggregation.aggregate_pairs(previous_pairs))
+
+    with stats.phase("build_model"):
+        # The kept model is shared with later solves, so the students are fixed on a copy of its bounds.
+        model = build_model(students, activities, reductions) if persistent_model is None else prepared.model
+        if incremental:
+            model = model.with_own_bounds()
+
+        initial_values = None
+        if initial_assignment is not None:
+            initial_values = model.values_from_pairs(_assigned_pairs(students, initial_assignment))
+
+        settled_students = set()
+        if incremental and initial_assignment is not None:
+            settled_students = get_settled_students(students, activities, initial_assignment)
+            model.fix_students(initial_values, settled_students)
+    stats.variables, stats.constraints, stats.nonzeros = model.n_columns, model.n_rows, len(model.coefficients)
+
+    solve = solve_decomposed if settings.workers > 1 else solve_model
+    if settings.workers <= 1 and persistent_model is not None:
+        solve = partial(solve_model, backend=persistent_model.backend(settings.backend))
+    stats.path = "decomposed" if settings.workers > 1 else settings.backend
+    if settings.flow_fast_path and not settled_students and is_transportation_problem(students, activities):
+        stats.path = "flow"
+        max_capacities = np.array([activity.max_capacity for activity in activities], dtype=float)
+        with stats.phase("solver"):
+            result = solve_min_cost_flow(model, max_capacities, progress_callback)
+    else:
+        result = solve(model, settings, initial_values, progress_callback, cancel_event, stats)
+    if settled_students and result.status == "Infeasible":
+        # Keeping the settled students in place leaves no room for the changes; fall back to a full re-solve.
+        stats.path += "+fallback"
+        with stats.phase("build_model"):
+            model = build_model(students, activities, reductions) if persistent_model is None else prepared.model
+        result = solve(model, settings, initial_values, progress_callback, cancel_event, stats)
+
+    with stats.phase("assignment"):
+        pairs = model.assigned_pairs(result.values)
+        if aggregation is not None:
+            pairs = aggregation.disaggregate_pairs(pairs, previous_pairs)
+        assignment = Assignment.from_pairs(pairs)
+
+    stats.status = result.status
+    assignment_result = AssignmentResult(assignment, result.status, result.objective, result.bound, result.gap, stats)
+    if cache is not None:
+        cache.put(key, assignment_result)
+    return assignment_result
+
+
+def assign_students(
+    students: list[Student],
+    activities: list[Activity],
+    settings: SolverSettings | None = None,
+    initial_assignment: Assignment | None = None,
+    incremental: bool = False,
+    cache: SolutionCache | None = None,
+    persistent_model: PersistentModel | None = None,
+) -> Assignment:
+    return solve_assignment(
+        students, activities, settings, initial_assignment, incremental, cache=cache, persistent_model=persistent_model
+    ).assignment
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from activity import Activity
+from assignment import Assignment, AssignmentResult
+from solver import SolverSettings
+from student import Student
+
+
+def cache_key(
+    students: list[Student],
+    activities: list[Activity],
+    settings: SolverSettings,
+    initial_assignment: Assignment | None = None,
+    incremental: bool = False,
+) -> str:
+    # Only what can change the optimal assignment goes in; names or the order of the lists do not. A warm start only
+    # changes how fast the optimum is found, but in incremental mode the current assignment fixes students.
+    fixed_pairs = None
+    if incremental and initial_assignment is not None:
+        fixed_pairs = sorted(
+            [student.id, activity_id]
+            for student in students
+            if initial_assignment.student_known(student.id)
+            for activity_id in initial_assignment.get_activities_for_student(student.id)
+        )
+    content = {
+        "students": sorted(
+            [student.id, student.grade, sorted([int(key), value] for key, value in student.preferences.items())]
+            for student in students
+        ),
+        "activities": sorted(
+            [
+                activity.id,
+                activity.min_capacity,
+                activity.max_capacity,
+                activity.timespan.from_slot,
+                activity.timespan.to_slot,
+                list(activity.valid_grades),
+            ]
+            for activity in activities
+        ),
+        "settings": settings.to_dict(),
+        "fixed_pairs": fixed_pairs,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+class SolutionCache:
+    # LRU cache of solved assignments, in memory and optionally on disk (one JSON file per key, the file's
+    # modification time serving as its last use). Only proven optimal results are stored.
+    def __init__(self, directory: Path | None = None, max_entries: int = 16, max_disk_entries: int = 64) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._lock = Lock()
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(
+        self,
+        students: list[Student],
+        activities: list[Activity],
+        settings: SolverSettings,
+        initial_assignment: Assignment | None = None,
+        incremental: bool = False,
+    ) -> str:
+        return cache_key(students, activities, settings, initial_assignment, incremental)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _remember(self, key: str, entry: dict[str, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read(self, key: str) -> dict[str, Any] | None:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), "r") as f:
+                entry = json.loads(f.read())
+            os.utime(self._path(key))
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, entry: dict[str, Any]) -> None:
+        if self.directory is None:
+            return
+        with open(self._path(key), "w") as f:
+            f.write(json.dumps(entry))
+        files = sorted(self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for path in files[: max(len(files) - self.max_disk_entries, 0)]:
+            path.unlink(missing_ok=True)
+
+    def get(self, key: str) -> AssignmentResult | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._read(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        return AssignmentResult(
+            Assignment.from_dict(entry["assignment"]), entry["status"], entry["objective"], entry["bound"], entry["gap"]
+        )
+
+    def put(self, key: str, result: AssignmentResult) -> None:
+        if result.status != "Optimal":
+            return
+        entry = {
+            "assignment": result.assignment.as_dict(),
+            "status": result.status,
+            "objective": result.objective,
+            "bound": result.bound,
+            "gap": result.gap,
+        }
+        with self._lock:
+            self._remember(key, entry)
+            self._write(key, entry)
+
+    def invalidate(self, key: str | None = None) -> None:
+        # Drops a single entry, or everything when no key is given.
+        with self._lock:
+            keys = [key] if key is not None else list(self._entries)
+            for entry_key in keys:
+                self._entries.pop(entry_key, None)
+            if self.directory is None:
+                return
+            paths = [self._path(key)] if key is not None else list(self.directory.glob("*.json"))
+            for path in paths:
+                path.unlink(missing_ok=True)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import sys
+from multiprocessing import freeze_support
+from pathlib import Path
+
+from assignment import solve_assignment
+from diff import diff, format_diff
+from presolve import InfeasibleInput
+from scenarios import Scenario, format_comparison, run_scenarios
+from solver import BACKENDS, CUT_STRATEGIES, HEURISTIC_BACKEND, SolverSettings, SolveStats, UnknownSolverBackend
+from state import State
+
+# Export name -> (function in pdf.py, file name).
+PDF_EXPORTS = {
+    "students": ("create_student_assignment_pdf", "Kinderzuteilungen.pdf"),
+    "activities": ("create_course_assignment_pdf", "Kurszuteilungen.pdf"),
+    "preferences": ("create_course_preference_pdf", "Kurspraeferenzen.pdf"),
+    "attendance": ("create_course_attendance_list_pdf", "Anwesenheitslisten.pdf"),
+}
+
+
+def _add_solver_arguments(parser: argparse.ArgumentParser) -> None:
+    # Options that are not given keep the solver settings saved with the state.
+    parser.add_argument("--backend", choices=list(BACKENDS) + [HEURISTIC_BACKEND], default=None, help="Solver-Backend.")
+    parser.add_argument("--time-limit", type=float, default=None, help="Zeitlimit pro Lösung in Sekunden.")
+    parser.add_argument("--threads", type=int, default=None, help="Anzahl der Solver-Threads.")
+    parser.add_argument("--seed", type=int, default=None, help="Startwert für den Zufall im Solver (ab 1).")
+    parser.add_argument(
+        "--no-presolve", dest="presolve", action="store_false", default=None, help="Vorverarbeitung abschalten."
+    )
+    parser.add_argument("--cuts", choices=CUT_STRATEGIES, default=None, help="Strategie für Schnittebenen.")
+
+
+def _settings_from_arguments(args: argparse.Namespace, settings: SolverSettings) -> SolverSettings:
+    overrides = {
+        name: getattr(args, name)
+        for name in ("backend", "time_limit", "threads", "seed", "presolve", "cuts")
+        if getattr(args, name) is not None
+    }
+    return dataclasses.replace(settings, **overrides)
+
+
+def _add_export_arguments(parser: argparse.ArgumentParser, required: bool = False) -> None:
+    parser.add_argument("--pdf-dir", type=Path, required=required, help="Ordner für die PDF-Exporte.")
+    parser.add_argument(
+        "--pdf", choices=list(PDF_EXPORTS), nargs="+", default=list(PDF_EXPORTS), help="Welche PDFs erstellt werden."
+    )
+
+
+def _export_pdfs(state: State, directory: Path, exports: list[str]) -> None:
+    # reportlab is only needed here, so it is not imported at startup.
+    import pdf
+
+    directory.mkdir(parents=True, exist_ok=True)
+    for export in exports:
+        function_name, file_name = PDF_EXPORTS[export]
+        getattr(pdf, function_name)(state.students, state.activities, state.assignment, directory / file_name)
+
+
+def _write_stats(stats: SolveStats, path: Path) -> None:
+    output = json.dumps(stats.to_dict(), indent=4)
+    if str(path) == "-":
+        print(output)
+    else:
+        path.write_text(output)
+
+
+def solve_command(args: argparse.Namespace) -> int:
+    state = State().read(args.state)
+    settings = _settings_from_arguments(args, state.solver_settings)
+    settings.workers = args.workers
+    try:
+        result = solve_assignment(
+            state.students,
+            state.activities,
+            settings,
+            initial_assignment=None if state.assignment.is_empty() else state.assignment,
+            incremental=args.incremental,
+        )
+    except (InfeasibleInput, UnknownSolverBackend) as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(f"Status: {result.status}, Zielwert: {result.objective:.0f}")
+    if args.stats is not None:
+        _write_stats(result.stats, args.stats)
+    if result.status not in ("Optimal", "Feasible"):
+        return 1
+
+    state.set_assignment(result.assignment)
+    state.write(args.output or args.state)
+    if args.pdf_dir is not None:
+        _export_pdfs(state, args.pdf_dir, args.pdf)
+    return 0
+
+
+def export_command(args: argparse.Namespace) -> int:
+    state = State().read(args.state)
+    _export_pdfs(state, args.pdf_dir, args.pdf)
+    return 0
+
+
+def run_scenarios_command(args: argparse.Namespace) -> int:
+    state = State().read(args.state)
+    with open(args.scenarios, "r") as f:
+        scenarios = [Scenario.from_dict(scenario) for scenario in json.loads(f.read())]
+    if not args.no_base:
+        scenarios.insert(0, Scenario(name="Basis"))
+
+    results = run_scenarios(
+        state.students,
+        state.activities,
+        scenarios,
+        _settings_from_arguments(args, state.solver_settings),
+        max_workers=args.workers,
+    )
+    print(format_comparison(results))
+    return 0
+
+
+def diff_command(args: argparse.Namespace) -> int:
+    # The State is a singleton, so the first file is read completely before the second one replaces it.
+    before = State().read(args.before)
+    before_assignment, before_students, before_activities = before.assignment, before.students, before.activities
+    after = State().read(args.after)
+    assignment_diff = diff(before_assignment, after.assignment)
+
+    # Names of students and activities that only exist in the first file are taken from there.
+    print(format_diff(assignment_diff, before_students + after.students, before_activities + after.activities))
+    if args.json is not None:
+        output = json.dumps(assignment_diff.to_dict(), ensure_ascii=False, indent=4)
+        if str(args.json) == "-":
+            print(output)
+        else:
+            args.json.write_text(output)
+    # As with diff, the exit code tells whether the two plans differ.
+    return 0 if assignment_diff.is_empty() else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="kurszuteilung", description="Kurszuteilung ohne grafische Oberfläche.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    solve = commands.add_parser("solve", help="Teilt die Kinder zu und speichert die Zuteilung im Stand.")
+    solve.add_argument("state", type=Path, help="Gespeicherter Stand (JSON).")
+    solve.add_argument("--output", type=Path, default=None, help="Speichert in diese Datei statt in den Stand.")
+    solve.add_argument("--incremental", action="store_true", help="Bestehende Zuteilungen möglichst beibehalten.")
+    solve.add_argument("--workers", type=int, default=1, help="Anzahl paralleler Prozesse für unabhängige Teile.")
+    solve.add_argument(
+        "--stats", type=Path, default=None, help="Schreibt Laufzeiten und Modellgröße als JSON (- für die Ausgabe)."
+    )
+    _add_solver_arguments(solve)
+    _add_export_arguments(solve)
+    solve.set_defaults(handler=solve_command)
+
+    export = commands.add_parser("export", help="Erstellt die PDFs für einen gespeicherten Stand.")
+    export.add_argument("state", type=Path, help="Gespeicherter Stand (JSON).")
+    _add_export_arguments(export, required=True)
+    export.set_defaults(handler=export_command)
+
+    scenarios = commands.add_parser("scenarios", help="Vergleicht Varianten der Kursplanung.")
+    scenarios.add_argument("state", type=Path, help="Gespeicherter Stand (JSON).")
+    scenarios.add_argument(
+        "scenarios",
+        type=Path,
+        help="JSON-Liste von Szenarien mit name, removed_activities, min_capacities, max_capacities und "
+        "split_activities.",
+    )
+    scenarios.add_argument("--workers", type=int, default=None, help="Anzahl paralleler Prozesse.")
+    scenarios.add_argument("--no-base", action="store_true", help="Den unveränderten Stand nicht mitrechnen.")
+    _add_solver_arguments(scenarios)
+    scenarios.set_defaults(handler=run_scenarios_command)
+
+    compare = commands.add_parser("diff", help="Zeigt, welche Kinder zwischen zwei Ständen den Kurs wechseln.")
+    compare.add_argument("before", type=Path, help="Älterer Stand (JSON).")
+    compare.add_argument("after", type=Path, help="Neuerer Stand (JSON).")
+    compare.add_argument(
+        "--json", type=Path, default=None, help="Schreibt die Unterschiede als JSON (- für die Ausgabe)."
+    )
+    compare.set_defaults(handler=diff_command)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    freeze_support()
+    sys.exit(main())
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+import numpy as np
+
+from assignment import ActivityIDNotAssigned, Assignment, NotAssignedToActivity, StudentIDNotAssigned
+from id_generator import ID
+
+
+def _normalized(assignment: Assignment) -> tuple[dict[ID, set[ID]], dict[ID, set[ID]]]:
+    data = assignment.as_dict()
+    return (
+        {student_id: set(activity_ids) for student_id, activity_ids in data["student_activity_map"].items()},
+        {activity_id: set(student_ids) for activity_id, student_ids in data["activity_student_map"].items()},
+    )
+
+
+class CompactAssignment(Assignment):
+    # Drop-in replacement for Assignment for large plans. Students and activities get dense indices in the order they
+    # are first seen, and the pairs are stored twice as CSR arrays: the activities of every student and the students
+    # of every activity. Changes are collected in two small sets and merged into the arrays by the next query that
+    # reads the rows. Participant counts are kept per student and activity, so participant_count and is_empty are
+    # O(1). A student or activity stays known after its last pair is removed, as in Assignment.
+    def __init__(self):
+        self._student_index: dict[ID, int] = {}
+        self._activity_index: dict[ID, int] = {}
+        self._student_ids: list[ID] = []
+        self._activity_ids: list[ID] = []
+        self._student_counts: list[int] = []
+        self._activity_counts: list[int] = []
+        self._n_pairs = 0
+
+        self._student_indptr = np.zeros(1, dtype=np.int64)
+        self._student_members = np.zeros(0, dtype=np.int32)
+        self._activity_indptr = np.zeros(1, dtype=np.int64)
+        self._activity_members = np.zeros(0, dtype=np.int32)
+        self._added: set[tuple[int, int]] = set()
+        self._removed: set[tuple[int, int]] = set()
+
+    def _student(self, student_id: ID) -> int:
+        index = self._student_index.get(student_id)
+        if index is None:
+            index = self._student_index[student_id] = len(self._student_ids)
+            self._student_ids.append(student_id)
+            self._student_counts.append(0)
+        return index
+
+    def _activity(self, activity_id: ID) -> int:
+        index = self._activity_index.get(activity_id)
+        if index is None:
+            index = self._activity_index[activity_id] = len(self._activity_ids)
+            self._activity_ids.append(activity_id)
+            self._activity_counts.append(0)
+        return index
+
+    def _stored(self, student: int, activity: int) -> bool:
+        if student + 1 >= len(self._student_indptr):
+            return False
+        row = self._student_members[self._student_indptr[student] : self._student_indptr[student + 1]]
+        return bool(np.any(row == activity))
+
+    def _contains(self, student: int, activity: int) -> bool:
+        if (student, activity) in self._added:
+            return True
+        return (student, activity) not in self._removed and self._stored(student, activity)
+
+    def _build(self, students: np.ndarray, activities: np.ndarray) -> None:
+        # The pairs come sorted by student and activity.
+        n_students, n_activities = len(self._student_ids), len(self._activity_ids)
+        self._student_indptr = np.concatenate([[0], np.cumsum(np.bincount(students, minlength=n_students))])
+        self._student_members = activities.astype(np.int32)
+        order = np.argsort(activities, kind="stable")
+        self._activity_indptr = np.concatenate([[0], np.cumsum(np.bincount(activities, minlength=n_activities))])
+        self._activity_members = students[order].astype(np.int32)
+
+    def _flush(self) -> None:
+        if not self._added and not self._removed:
+            return
+        n_activities = len(self._activity_ids)
+        students = np.repeat(np.arange(len(self._student_indptr) - 1), np.diff(self._student_indptr))
+        keys = students * n_activities + self._student_members
+        if self._removed:
+            removed = np.array([student * n_activities + activity for student, activity in self._removed])
+            keys = keys[~np.isin(keys, removed)]
+        if self._added:
+            added = np.array([student * n_activities + activity for student, activity in self._added])
+            keys = np.concatenate([keys, added])
+        keys.sort()
+        self._build(keys // n_activities, keys % n_activities)
+        self._added.clear()
+        self._removed.clear()
+
+    def is_empty(self) -> bool:
+        return self._n_pairs == 0
+
+    def as_dict(self) -> dict[str, Any]:
+        self._flush()
+        activity_ids = np.array(self._activity_ids, dtype=np.int64)[self._student_members].tolist()
+        student_ids = np.array(self._student_ids, dtype=np.int64)[self._activity_members].tolist()
+        student_indptr = self._student_indptr.tolist()
+        activity_indptr = self._activity_indptr.tolist()
+        return {
+            "student_activity_map": {
+                student_id: (
+                    activity_ids[student_indptr[index] : student_indptr[index + 1]]
+                    if index + 1 < len(student_indptr)
+                    else []
+                )
+                for index, student_id in enumerate(self._student_ids)
+            },
+            "activity_student_map": {
+                activity_id: (
+                    student_ids[activity_indptr[index] : activity_indptr[index + 1]]
+                    if index + 1 < len(activity_indptr)
+                    else []
+                )
+                for index, activity_id in enumerate(self._activity_ids)
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> CompactAssignment:
+        assert set(data.keys()) == {"student_activity_map", "activity_student_map"}
+        assignment = cls()
+        for student_id in data["student_activity_map"]:
+            assignment._student(int(student_id))
+        for activity_id in data["activity_student_map"]:
+            assignment._activity(int(activity_id))
+        assignment._add_pairs(
+            (int(student_id), activity_id)
+            for student_id, activity_ids in data["student_activity_map"].items()
+            for activity_id in activity_ids
+        )
+        return assignment
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[tuple[ID, ID]]) -> CompactAssignment:
+        assignment = cls()
+        assignment._add_pairs(pairs)
+        return assignment
+
+    @classmethod
+    def from_assignment(cls, assignment: Assignment) -> CompactAssignment:
+        return cls.from_dict(assignment.as_dict())
+
+    def _add_pairs(self, pairs: Iterable[tuple[ID, ID]]) -> None:
+        # Bulk construction on an empty assignment: all pairs are sorted and deduplicated at once.
+        indices = [(self._student(student_id), self._activity(activity_id)) for student_id, activity_id in pairs]
+        n_activities = max(len(self._activity_ids), 1)
+        keys = np.unique(np.array([student * n_activities + activity for student, activity in indices], dtype=np.int64))
+        students, activities = keys // n_activities, keys % n_activities
+        self._build(students, activities)
+        self._student_counts = np.bincount(students, minlength=len(self._student_ids)).tolist()
+        self._activity_counts = np.bincount(activities, minlength=len(self._activity_ids)).tolist()
+        self._n_pairs = len(keys)
+
+    def pair_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        self._flush()
+        rows = np.repeat(np.arange(len(self._student_indptr) - 1), np.diff(self._student_indptr))
+        return (
+            np.array(self._student_ids, dtype=np.int64)[rows],
+            np.array(self._activity_ids, dtype=np.int64)[self._student_members],
+        )
+
+    def __eq__(self, other: Assignment) -> bool:
+        # Compared by content, so a CompactAssignment equals an Assignment with the same pairs.
+        return _normalized(self) == _normalized(other)
+
+    def student_known(self, student_id: ID) -> bool:
+        return student_id in self._student_index
+
+    def activity_known(self, activity_id: ID) -> bool:
+        return activity_id in self._activity_index
+
+    def get_activities_for_student(self, student_id: ID) -> list[ID]:
+        if student_id not in self._student_index:
+            raise StudentIDNotAssigned(student_id)
+        index = self._student_index[student_id]
+        if self._student_counts[index] == 0:
+            return []
+        self._flush()
+        members = self._student_members[self._student_indptr[index] : self._student_indptr[index + 1]]
+        return [self._activity_ids[activity] for activity in members.tolist()]
+
+    def get_students_for_activity(self, activity_id: ID) -> list[ID]:
+        if activity_id not in self._activity_index:
+            raise ActivityIDNotAssigned(activity_id)
+        index = self._activity_index[activity_id]
+        if self._activity_counts[index] == 0:
+            return []
+        self._flush()
+        members = self._activity_members[self._activity_indptr[index] : self._activity_indptr[index + 1]]
+        return [self._student_ids[student] for student in members.tolist()]
+
+    def assign_student_to_activity_by_id(self, student_id: ID, activity_id: ID) -> None:
+        student, activity = self._student(student_id), self._activity(activity_id)
+        if self._contains(student, activity):
+            return
+        if (student, activity) in self._removed:
+            self._removed.discard((student, activity))
+        else:
+            self._added.add((student, activity))
+        self._student_counts[student] += 1
+        self._activity_counts[activity] += 1
+        self._n_pairs += 1
+
+    def remove_student_from_activity_by_id(self, student_id: ID, activity_id: ID) -> None:
+        if student_id not in self._student_index:
+            raise StudentIDNotAssigned(student_id)
+        student, activity = self._student_index[student_id], self._activity_index.get(activity_id)
+        if activity is None or not self._contains(student, activity):
+            raise NotAssignedToActivity(student_id, activity_id)
+
+        if (student, activity) in self._added:
+            self._added.discard((student, activity))
+        else:
+            self._removed.add((student, activity))
+        self._student_counts[student] -= 1
+        self._activity_counts[activity] -= 1
+        self._n_pairs -= 1
+
+    def participant_count(self, activity_id: ID) -> int:
+        index = self._activity_index.get(activity_id)
+        return 0 if index is None else self._activity_counts[index]
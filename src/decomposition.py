@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import dataclasses
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from threading import Event
+
+import numpy as np
+
+from model import AssignmentModel
+from solver import ProgressCallback, SolverResult, SolverSettings, SolveStats, relative_gap, solve_model
+
+# Set in each worker process by _init_worker.
+_worker_cancel_event: Event | None = None
+
+STATUS_SEVERITY = ["Optimal", "Feasible", "Not Solved", "Undefined", "Unbounded", "Infeasible"]
+
+
+def find_components(model: AssignmentModel) -> np.ndarray:
+    # Connected components of the bipartite student/activity graph, one label per student. Overlap and capacity
+    # rows never couple students that do not share an activity, so these edges are all that is needed.
+    n_students = len(model.student_ids)
+    heads = model.pair_students
+    tails = n_students + model.pair_activities
+    labels = np.arange(n_students + len(model.activity_ids))
+
+    while True:
+        edge_labels = np.minimum(labels[heads], labels[tails])
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, heads, edge_labels)
+        np.minimum.at(new_labels, tails, edge_labels)
+        while not np.array_equal(new_labels, new_labels[new_labels]):
+            new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    return np.unique(labels[:n_students], return_inverse=True)[1]
+
+
+def submodel(
+    model: AssignmentModel, student_mask: np.ndarray, keep_empty_rows: bool
+) -> tuple[AssignmentModel, np.ndarray]:
+    pair_mask = student_mask[model.pair_students]
+    columns = np.concatenate([np.flatnonzero(pair_mask), model.n_pairs + np.flatnonzero(student_mask)])
+    column_map = np.full(model.n_columns, -1)
+    column_map[columns] = np.arange(len(columns))
+
+    entry_mask = column_map[model.col_indices] >= 0
+    row_mask = np.zeros(model.n_rows, dtype=bool)
+    row_mask[model.row_indices[entry_mask]] = True
+    if keep_empty_rows:
+        # Rows without any entry, e.g. an unreachable minimum capacity, have to end up in exactly one submodel.
+        row_mask |= np.bincount(model.row_indices, minlength=model.n_rows) == 0
+    row_map = np.cumsum(row_mask) - 1
+
+    return (
+        AssignmentModel(
+            student_ids=model.student_ids[student_mask],
+            activity_ids=model.activity_ids,
+            pair_students=(np.cumsum(student_mask) - 1)[model.pair_students[pair_mask]],
+            pair_activities=model.pair_activities[pair_mask],
+            objective=model.objective[columns],
+            col_lower=model.col_lower[columns],
+            col_upper=model.col_upper[columns],
+            row_indices=row_map[model.row_indices[entry_mask]],
+            col_indices=column_map[model.col_indices[entry_mask]],
+            coefficients=model.coefficients[entry_mask],
+            row_lower=model.row_lower[row_mask],
+            row_upper=model.row_upper[row_mask],
+            n_capacity_rows=int(row_mask[: model.n_capacity_rows].sum()),
+        ),
+        columns,
+    )
+
+
+def split_model(model: AssignmentModel, n_chunks: int) -> list[tuple[AssignmentModel, np.ndarray]]:
+    # Components are packed into at most n_chunks disjoint groups of similar size (largest first), so thousands of
+    # tiny components do not each pay for a solver start.
+    components = find_components(model)
+    n_components = int(components.max()) + 1 if len(components) > 0 else 0
+    sizes = np.bincount(components, minlength=n_components) + np.bincount(
+        components[model.pair_students], minlength=n_components
+    )
+
+    chunk_of_component = np.zeros(n_components, dtype=np.int64)
+    chunk_sizes = np.zeros(max(min(n_chunks, n_components), 1))
+    for component in np.argsort(-sizes, kind="stable").tolist():
+        chunk = int(np.argmin(chunk_sizes))
+        chunk_of_component[component] = chunk
+        chunk_sizes[chunk] += sizes[component]
+
+    chunks = chunk_of_component[components]
+    return [submodel(model, chunks == chunk, keep_empty_rows=chunk == 0) for chunk in range(len(chunk_sizes))]
+
+
+def solve_decomposed(
+    model: AssignmentModel,
+    settings: SolverSettings,
+    initial_values: np.ndarray | None = None,
+    progress_callback: ProgressCallback | None = None,
+    cancel_event: Event | None = None,
+    stats: SolveStats | None = None,
+) -> SolverResult:
+    chunks = split_model(model, 4 * settings.workers)
+    if len(chunks) <= 1:
+        return solve_model(model, settings, initial_values, progress_callback, cancel_event, stats)
+    # The workers' own phases stay in their processes; here the whole parallel solve counts as the solver phase.
+    with stats.phase("solver") if stats is not None else nullcontext():
+        return _solve_chunks(model, chunks, settings, initial_values, progress_callback, cancel_event)
+
+
+def _solve_chunks(
+    model: AssignmentModel,
+    chunks: list[tuple[AssignmentModel, np.ndarray]],
+    settings: SolverSettings,
+    initial_values: np.ndarray | None,
+    progress_callback: ProgressCallback | None,
+    cancel_event: Event | None,
+) -> SolverResult:
+    # All chunks share one deadline; a chunk that only starts once others have finished gets what is left of it.
+    deadline = None if settings.time_limit is None else time.time() + settings.time_limit
+    # Setting this stops the solves running in the workers as well, not just the chunks that are still queued.
+    worker_cancel_event = multiprocessing.Event()
+    executor = ProcessPoolExecutor(
+        max_workers=settings.workers, initializer=_init_worker, initargs=(worker_cancel_event,)
+    )
+    futures = [
+        executor.submit(
+            _solve_chunk, chunk, settings, None if initial_values is None else initial_values[columns], deadline
+        )
+        for chunk, columns in chunks
+    ]
+    while wait(futures, timeout=0.1).not_done:
+        if cancel_event is not None and cancel_event.is_set():
+            worker_cancel_event.set()
+            executor.shutdown(cancel_futures=True)
+            return SolverResult("Not Solved", np.zeros(model.n_columns), 0.0, None, None)
+    executor.shutdown()
+    results = [future.result() for future in futures]
+
+    values = np.zeros(model.n_columns)
+    for (_, columns), result in zip(chunks, results):
+        values[columns] = result.values
+    status = max((result.status for result in results), key=STATUS_SEVERITY.index)
+    objective = float(model.objective @ values)
+    bounds = [result.bound for result in results]
+    bound = None if None in bounds else float(sum(bounds))
+
+    if progress_callback is not None and status in ("Optimal", "Feasible"):
+        progress_callback(objective)
+    return SolverResult(status, values, objective, bound, relative_gap(objective, bound))
+
+
+def _init_worker(cancel_event: Event) -> None:
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+
+
+def _solve_chunk(
+    chunk: AssignmentModel, settings: SolverSettings, initial_values: np.ndarray | None, deadline: float | None
+) -> SolverResult:
+    if deadline is not None:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return SolverResult("Not Solved", np.zeros(chunk.n_columns), 0.0, None, None)
+        settings = dataclasses.replace(settings, time_limit=remaining)
+    return solve_model(chunk, settings, initial_values, cancel_event=_worker_cancel_event)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+from dataclasses_json import dataclass_json
+
+from activity import Activity
+from assignment import Assignment
+from id_generator import ID
+from student import Student
+
+
+@dataclass_json
+@dataclass
+class StudentDiff:
+    student_id: ID
+    added: list[ID] = field(default_factory=list)
+    removed: list[ID] = field(default_factory=list)
+
+    @property
+    def moved(self) -> bool:
+        # The student left at least one course and joined another one instead.
+        return len(self.added) > 0 and len(self.removed) > 0
+
+
+@dataclass_json
+@dataclass
+class ActivityDiff:
+    activity_id: ID
+    added: list[ID] = field(default_factory=list)
+    removed: list[ID] = field(default_factory=list)
+
+
+@dataclass_json
+@dataclass
+class AssignmentDiff:
+    # Only students and activities whose pairs changed, sorted by ID.
+    students: dict[ID, StudentDiff] = field(default_factory=dict)
+    activities: dict[ID, ActivityDiff] = field(default_factory=dict)
+
+    def is_empty(self) -> bool:
+        return len(self.students) == 0
+
+    def added_pairs(self) -> list[tuple[ID, ID]]:
+        return [(change.student_id, activity_id) for change in self.students.values() for activity_id in change.added]
+
+    def removed_pairs(self) -> list[tuple[ID, ID]]:
+        return [(change.student_id, activity_id) for change in self.students.values() for activity_id in change.removed]
+
+    def moved_students(self) -> list[StudentDiff]:
+        return [change for change in self.students.values() if change.moved]
+
+
+def _pairs(assignment: Assignment) -> np.ndarray:
+    return np.unique(np.column_stack(assignment.pair_arrays()), axis=0)
+
+
+def diff(before: Assignment, after: Assignment) -> AssignmentDiff:
+    # The (student, activity) rows of both plans are numbered by one np.unique over all rows, which works for any
+    # integer IDs. The set differences of the two numberings are the added and removed pairs. Only the changed pairs
+    # are then grouped in Python.
+    before_pairs, after_pairs = _pairs(before), _pairs(after)
+    pairs, keys = np.unique(np.concatenate([before_pairs, after_pairs]), axis=0, return_inverse=True)
+    keys = keys.reshape(-1)
+    before_keys, after_keys = keys[: len(before_pairs)], keys[len(before_pairs) :]
+    result = AssignmentDiff()
+    for side_keys, side in (
+        (np.setdiff1d(after_keys, before_keys, assume_unique=True), "added"),
+        (np.setdiff1d(before_keys, after_keys, assume_unique=True), "removed"),
+    ):
+        for student_id, activity_id in pairs[side_keys].tolist():
+            getattr(result.students.setdefault(student_id, StudentDiff(student_id)), side).append(activity_id)
+            getattr(result.activities.setdefault(activity_id, ActivityDiff(activity_id)), side).append(student_id)
+    result.students = dict(sorted(result.students.items()))
+    result.activities = dict(sorted(result.activities.items()))
+    return result
+
+
+def format_diff(assignment_diff: AssignmentDiff, students: list[Student], activities: list[Activity]) -> str:
+    # IDs that are not in the given lists, e.g. of a removed student, are shown as they are.
+    student_map = {student.id: student for student in students}
+    activity_map = {activity.id: activity for activity in activities}
+
+    def student_name(student_id: ID) -> str:
+        student = student_map.get(student_id)
+        return f"Kind {student_id}" if student is None else f"{student.name} ({student.grade}{student.subgrade})"
+
+    def activity_names(activity_ids: list[ID]) -> str:
+        return ", ".join(
+            activity_map[activity_id].name if activity_id in activity_map else f"Kurs {activity_id}"
+            for activity_id in activity_ids
+        )
+
+    if assignment_diff.is_empty():
+        return "Keine Unterschiede."
+
+    lines = [
+        f"{len(assignment_diff.students)} Kinder mit geänderter Zuteilung, "
+        f"davon {len(assignment_diff.moved_students())} mit Kurswechsel.",
+        "",
+    ]
+    for change in assignment_diff.students.values():
+        if change.moved:
+            text = f"{activity_names(change.removed)} -> {activity_names(change.added)}"
+        elif change.added:
+            text = f"+ {activity_names(change.added)}"
+        else:
+            text = f"- {activity_names(change.removed)}"
+        lines.append(f"{student_name(change.student_id)}: {text}")
+
+    lines.append("")
+    for change in assignment_diff.activities.values():
+        lines.append(f"{activity_names([change.activity_id])}: +{len(change.added)} / -{len(change.removed)}")
+    return "\n".join(lines)
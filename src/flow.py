@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import heapq
+from collections import deque
+
+import numpy as np
+
+from model import NO_COURSE_PENALTY, AssignmentModel
+from solver import ProgressCallback, SolverResult
+
+EPSILON = 1e-9
+
+
+class _FlowNetwork:
+    def __init__(self, n_nodes: int):
+        self.n_nodes = n_nodes
+        self.adjacency: list[list[int]] = [[] for _ in range(n_nodes)]
+        self.heads: list[int] = []
+        self.capacities: list[int] = []
+        self.costs: list[float] = []
+
+    def add_edge(self, tail: int, head: int, capacity: int, cost: float) -> int:
+        # Edge e and its residual edge e ^ 1 are stored next to each other.
+        edge = len(self.heads)
+        self.adjacency[tail].append(edge)
+        self.adjacency[head].append(edge + 1)
+        self.heads.extend((head, tail))
+        self.capacities.extend((capacity, 0))
+        self.costs.extend((cost, -cost))
+        return edge
+
+    def shortest_distances(self, source: int, potentials: list[float]) -> list[float]:
+        heads = self.heads
+        capacities = self.capacities
+        costs = self.costs
+        distances = [float("inf")] * self.n_nodes
+        distances[source] = 0.0
+        queue = [(0.0, source)]
+        while queue:
+            distance, node = heapq.heappop(queue)
+            if distance > distances[node]:
+                continue
+            offset = distance + potentials[node]
+            for edge in self.adjacency[node]:
+                if capacities[edge] <= 0:
+                    continue
+                head = heads[edge]
+                new_distance = offset + costs[edge] - potentials[head]
+                if new_distance < distances[head] - EPSILON:
+                    distances[head] = new_distance
+                    heapq.heappush(queue, (new_distance, head))
+        return distances
+
+    def augment_shortest_paths(self, source: int, sink: int, potentials: list[float]) -> None:
+        # Blocking flows on the admissible subgraph (residual edges with zero reduced cost), i.e. along every
+        # currently shortest path at once, so one Dijkstra run serves many augmentations.
+        heads = self.heads
+        capacities = self.capacities
+        adjacency = self.adjacency
+
+        # Potentials stay fixed during one call, so which edges have zero reduced cost can be computed up front.
+        head_array = np.array(heads)
+        potential_array = np.array(potentials)
+        tail_array = head_array[np.arange(len(heads)) ^ 1]
+        reduced_costs = np.array(self.costs) + potential_array[tail_array] - potential_array[head_array]
+        zero_cost = (np.abs(reduced_costs) < EPSILON).tolist()
+
+        while True:
+            levels = [-1] * self.n_nodes
+            levels[source] = 0
+            queue = deque([source])
+            while queue:
+                node = queue.popleft()
+                for edge in adjacency[node]:
+                    head = heads[edge]
+                    if levels[head] < 0 and capacities[edge] > 0 and zero_cost[edge]:
+                        levels[head] = levels[node] + 1
+                        queue.append(head)
+            if levels[sink] < 0:
+                return
+
+            next_edge = [0] * self.n_nodes
+            path: list[int] = []
+            node = source
+            while True:
+                if node == sink:
+                    flow = min(capacities[edge] for edge in path)
+                    for edge in path:
+                        capacities[edge] -= flow
+                        capacities[edge ^ 1] += flow
+                    # Resume at the tail of the first saturated edge instead of starting over at the source.
+                    saturated = next(idx for idx, edge in enumerate(path) if capacities[edge] == 0)
+                    node = heads[path[saturated] ^ 1]
+                    del path[saturated:]
+                    continue
+                edges = adjacency[node]
+                while next_edge[node] < len(edges):
+                    edge = edges[next_edge[node]]
+                    if capacities[edge] > 0 and zero_cost[edge] and levels[heads[edge]] == levels[node] + 1:
+                        break
+                    next_edge[node] += 1
+                if next_edge[node] < len(edges):
+                    path.append(edges[next_edge[node]])
+                    node = heads[path[-1]]
+                    continue
+                if node == source:
+                    break
+                node = heads[path.pop() ^ 1]
+                next_edge[node] += 1
+
+
+def min_cost_flow_pairs(
+    n_students: int,
+    n_activities: int,
+    pair_students: np.ndarray,
+    pair_activities: np.ndarray,
+    weights: np.ndarray,
+    max_capacities: np.ndarray,
+    no_course_penalties: np.ndarray,
+) -> np.ndarray:
+    # Source -> student -> activity -> sink. The first unit leaving the source towards a student earns the
+    # no-course penalty back, every further unit is free, so the profit per student is concave and successive
+    # shortest paths stay exact. Stops as soon as the cheapest augmenting path no longer pays off.
+    source = 0
+    sink = n_students + n_activities + 1
+    network = _FlowNetwork(n_students + n_activities + 2)
+
+    student_degrees = np.bincount(pair_students, minlength=n_students)
+    activity_degrees = np.bincount(pair_activities, minlength=n_activities)
+    for student, (degree, penalty) in enumerate(zip(student_degrees.tolist(), no_course_penalties.tolist())):
+        if degree > 0:
+            network.add_edge(source, 1 + student, 1, -penalty)
+        if degree > 1:
+            network.add_edge(source, 1 + student, degree - 1, 0.0)
+    pair_edges = [
+        network.add_edge(1 + student, 1 + n_students + activity, 1, -weight)
+        for student, activity, weight in zip(pair_students.tolist(), pair_activities.tolist(), weights.tolist())
+    ]
+    capacities = np.minimum(max_capacities, activity_degrees)
+    for activity, capacity in enumerate(capacities.tolist()):
+        if capacity > 0:
+            network.add_edge(1 + n_students + activity, sink, int(capacity), 0.0)
+
+    # The network is acyclic, so exact initial potentials follow layer by layer and make all reduced costs >= 0.
+    activity_potentials = np.zeros(n_activities)
+    np.minimum.at(activity_potentials, pair_activities, -no_course_penalties[pair_students] - weights)
+    activity_potentials[activity_degrees == 0] = 0
+    reachable = capacities > 0
+    potentials = (
+        [0.0]
+        + np.where(student_degrees > 0, -no_course_penalties, 0.0).tolist()
+        + activity_potentials.tolist()
+        + [float(activity_potentials[reachable].min()) if reachable.any() else 0.0]
+    )
+
+    while True:
+        distances = network.shortest_distances(source, potentials)
+        sink_distance = distances[sink]
+        if sink_distance == float("inf"):
+            break
+        potentials = [potential + min(distance, sink_distance) for potential, distance in zip(potentials, distances)]
+        if potentials[sink] - potentials[source] >= -EPSILON:
+            break
+        network.augment_shortest_paths(source, sink, potentials)
+
+    return np.array([network.capacities[edge] == 0 for edge in pair_edges], dtype=bool)
+
+
+def solve_min_cost_flow(
+    model: AssignmentModel,
+    max_capacities: np.ndarray,
+    progress_callback: ProgressCallback | None = None,
+) -> SolverResult:
+    # Only valid for models without minimum capacities and overlap rows; max_capacities follows model.activity_ids.
+    # Pairs fixed by the presolve take their seats up front, and their students no longer risk the penalty.
+    n_students = len(model.student_ids)
+    n_activities = len(model.activity_ids)
+    fixed = model.col_lower[: model.n_pairs] > 0.5
+    free = ~fixed
+    settled = np.bincount(model.pair_students[fixed], minlength=n_students) > 0
+    chosen = fixed.copy()
+    chosen[free] = min_cost_flow_pairs(
+        n_students,
+        n_activities,
+        model.pair_students[free],
+        model.pair_activities[free],
+        model.objective[: model.n_pairs][free],
+        max_capacities - np.bincount(model.pair_activities[fixed], minlength=n_activities),
+        np.where(settled, 0.0, NO_COURSE_PENALTY),
+    )
+    values = np.zeros(model.n_columns)
+    values[: model.n_pairs] = chosen
+    values[model.n_pairs :] = np.bincount(model.pair_students, chosen, n_students) == 0
+    objective = float(model.objective @ values)
+    if progress_callback is not None:
+        progress_callback(objective)
+    return SolverResult("Optimal", values, objective, objective, 0.0)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from itertools import accumulate
+
+from dataclasses_json import dataclass_json
+
+from activity import Activity, Timespan
+from student import Student
+
+# Afternoon slots a synthetic course can start in: Monday to Friday, 14:00 to 17:00.
+DAYS = range(5)
+START_HOURS = range(14, 18)
+
+
+@dataclass_json
+@dataclass
+class GeneratorSettings:
+    n_students: int = 500
+    n_activities: int = 40
+    # Relative frequency of students choosing 1, 2, 3, ... courses.
+    preference_count_weights: list[float] = field(default_factory=lambda: [0.1, 0.2, 0.4, 0.3])
+    # Popular courses are chosen more often: course k is picked with weight 1 / (k + 1) ** popularity_skew.
+    popularity_skew: float = 0.8
+    # Probability that a course is closed to a particular grade.
+    grade_restriction: float = 0.15
+    # Share of courses with a real timespan; the others keep the empty default timespan and never overlap.
+    overlap_density: float = 0.5
+    # Students per seat, i.e. 1.0 means the seats just suffice if every student takes one course.
+    capacity_tightness: float = 0.8
+    # Share of courses with a minimum number of participants.
+    min_capacity_share: float = 0.1
+
+
+def generate_instance(settings: GeneratorSettings, seed: int = 0) -> tuple[list[Student], list[Activity]]:
+    # IDs are assigned explicitly, so the same seed gives the same instance regardless of the global ID generators.
+    rng = random.Random(seed)
+    mean_capacity = settings.n_students / (settings.n_activities * settings.capacity_tightness)
+
+    activities = []
+    for idx in range(settings.n_activities):
+        valid_grades = [rng.random() >= settings.grade_restriction for _ in range(4)]
+        if not any(valid_grades):
+            valid_grades[rng.randrange(4)] = True
+        timespan = Timespan(0, 0)
+        if rng.random() < settings.overlap_density:
+            day = rng.choice(DAYS)
+            hour = rng.choice(START_HOURS)
+            timespan = Timespan.from_day_hour_minute(day, hour, 0, day, hour + rng.choice((1, 2)), 0)
+        max_capacity = max(1, round(mean_capacity * rng.uniform(0.5, 1.5)))
+        min_capacity = 0
+        if rng.random() < settings.min_capacity_share:
+            min_capacity = rng.randint(1, max(1, max_capacity // 4))
+        activities.append(
+            Activity(
+                name=f"Kurs {idx}",
+                min_capacity=min_capacity,
+                max_capacity=max_capacity,
+                timespan=timespan,
+                valid_grades=valid_grades,
+                id=idx + 1,
+            )
+        )
+
+    popularity = [1 / (rank + 1) ** settings.popularity_skew for rank in range(settings.n_activities)]
+    rng.shuffle(popularity)
+    counts = range(1, len(settings.preference_count_weights) + 1)
+    options_per_grade = {
+        grade: [activity for activity in activities if activity.is_valid_grade(grade)] for grade in range(1, 5)
+    }
+    cum_weights_per_grade = {
+        grade: list(accumulate(popularity[activity.id - 1] for activity in options))
+        for grade, options in options_per_grade.items()
+    }
+
+    students = []
+    for idx in range(settings.n_students):
+        grade = rng.randint(1, 4)
+        options = options_per_grade[grade]
+        cum_weights = cum_weights_per_grade[grade]
+        n_preferences = min(rng.choices(counts, settings.preference_count_weights)[0], len(options))
+        chosen: list[Activity] = []
+        while len(chosen) < n_preferences:
+            activity = rng.choices(options, cum_weights=cum_weights)[0]
+            if activity not in chosen:
+                chosen.append(activity)
+        students.append(
+            Student(
+                name=f"Kind {idx}",
+                grade=grade,
+                subgrade=rng.choice("abc"),
+                preferences={activity.id: rank for rank, activity in enumerate(chosen, start=1)},
+                id=idx + 1,
+            )
+        )
+    return students, activities
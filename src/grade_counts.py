@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import numpy as np
+
+from assignment import Assignment
+from id_generator import ID
+from student import Student
+
+N_GRADES = 4
+
+
+class GradeCountIndex:
+    # Assigned children per activity and grade, with by_class also per activity and class, e.g. "2b".
+    def __init__(self, students: list[Student], assignment: Assignment, by_class: bool = False) -> None:
+        self.assignment = assignment
+        self.by_class = by_class
+        self._grades = {student.id: student.grade for student in students}
+        self._class_index: dict[str, int] = {}
+        self._classes: dict[ID, int] = {}
+        for student in students:
+            name = f"{student.grade}{student.subgrade}"
+            self._classes[student.id] = self._class_index.setdefault(name, len(self._class_index))
+
+        pair_students, pair_activities = assignment.pair_arrays()
+        student_ids = np.array(sorted(self._grades), dtype=np.int64)
+        positions = np.minimum(np.searchsorted(student_ids, pair_students), max(len(student_ids) - 1, 0))
+        known = student_ids[positions] == pair_students if len(student_ids) > 0 else np.zeros(0, dtype=bool)
+        activity_ids, rows = np.unique(pair_activities[known], return_inverse=True)
+        self._activity_index = {activity_id: row for row, activity_id in enumerate(activity_ids.tolist())}
+
+        grades = np.array([self._grades[student_id] for student_id in student_ids.tolist()], dtype=np.int64)
+        self._grade_counts = np.zeros((len(activity_ids), N_GRADES), dtype=np.int64)
+        np.add.at(self._grade_counts, (rows, grades[positions[known]] - 1), 1)
+        self._class_counts = np.zeros((len(activity_ids), len(self._class_index)), dtype=np.int64)
+        if by_class:
+            classes = np.array([self._classes[student_id] for student_id in student_ids.tolist()], dtype=np.int64)
+            np.add.at(self._class_counts, (rows, classes[positions[known]]), 1)
+
+    def _class(self, name: str) -> int:
+        if name not in self._class_index:
+            self._class_index[name] = len(self._class_index)
+            self._class_counts = np.pad(self._class_counts, ((0, 0), (0, 1)))
+        return self._class_index[name]
+
+    def _row(self, activity_id: ID) -> int:
+        if activity_id not in self._activity_index:
+            self._activity_index[activity_id] = len(self._grade_counts)
+            self._grade_counts = np.pad(self._grade_counts, ((0, 1), (0, 0)))
+            self._class_counts = np.pad(self._class_counts, ((0, 1), (0, 0)))
+        return self._activity_index[activity_id]
+
+    def _count(self, student_id: ID, activity_id: ID, delta: int) -> None:
+        if student_id not in self._grades:
+            return
+        row = self._row(activity_id)
+        self._grade_counts[row, self._grades[student_id] - 1] += delta
+        if self.by_class:
+            self._class_counts[row, self._classes[student_id]] += delta
+
+    def pair_changed(self, student_id: ID, activity_id: ID, assigned: bool) -> None:
+        self._count(student_id, activity_id, 1 if assigned else -1)
+
+    def assign_student_to_activity_by_id(self, student_id: ID, activity_id: ID) -> None:
+        assignment = self.assignment
+        if assignment.student_known(student_id) and activity_id in assignment.get_activities_for_student(student_id):
+            return
+        assignment.assign_student_to_activity_by_id(student_id, activity_id)
+        self.pair_changed(student_id, activity_id, True)
+
+    def remove_student_from_activity_by_id(self, student_id: ID, activity_id: ID) -> None:
+        self.assignment.remove_student_from_activity_by_id(student_id, activity_id)
+        self.pair_changed(student_id, activity_id, False)
+
+    def update_student(self, student: Student) -> None:
+        activity_ids = (
+            self.assignment.get_activities_for_student(student.id) if self.assignment.student_known(student.id) else []
+        )
+        for activity_id in activity_ids:
+            self._count(student.id, activity_id, -1)
+        self._grades[student.id] = student.grade
+        self._classes[student.id] = self._class(f"{student.grade}{student.subgrade}")
+        for activity_id in activity_ids:
+            self._count(student.id, activity_id, 1)
+
+    def grade_counts(self, activity_id: ID) -> list[int]:
+        if activity_id not in self._activity_index:
+            return [0] * N_GRADES
+        return self._grade_counts[self._activity_index[activity_id]].tolist()
+
+    def class_counts(self, activity_id: ID) -> dict[str, int]:
+        assert self.by_class
+        if activity_id not in self._activity_index:
+            return {}
+        counts = self._class_counts[self._activity_index[activity_id]].tolist()
+        return {name: counts[column] for name, column in self._class_index.items() if counts[column] > 0}
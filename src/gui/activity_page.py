@@ -1,4 +1,3 @@
-import copy
 from typing import Any
 
 import customtkinter as ctk
@@ -8,6 +7,7 @@ from activity import Activity, Timespan, WEEKDAYS
 from gui.confirmation import confirm_choice
 from gui.error_popup import open_error_popup
 from gui.search_dialog import search_activity
+from journal import Journal
 from state import State
 
 
@@ -73,7 +73,7 @@ class ActivityPage(ctk.CTkFrame):
     def remove_activity(self):
         if (activity := search_activity(self)) is not None:
             if confirm_choice(self, f'Kurs "{activity.name}" wirklich entfernen?'):
-                State().remove_activity_by_id(activity.id)
+                Journal().remove_activity_by_id(activity.id)
                 self.display_activities()
 
     def split_activity(self):
@@ -81,20 +81,7 @@ class ActivityPage(ctk.CTkFrame):
             if not confirm_choice(self, f'Kurs "{activity.name}" wirklich aufspalten?'):
                 return
 
-            activity_2 = Activity(
-                name=f"{activity.name} 2",
-                min_capacity=activity.min_capacity,
-                max_capacity=activity.max_capacity,
-                timespan=activity.timespan,
-                first_date=activity.first_date,
-                valid_grades=copy.deepcopy(activity.valid_grades),
-            )
-            State().add_activity(activity_2)
-            for student in State().students:
-                if activity.id in student.preferences:
-                    student.preferences.append(activity_2.id)
-
-            activity.name = f"{activity.name} 1"
+            Journal().split_activity(activity)
 
             self.display_activities()
 
@@ -298,14 +285,17 @@ class ModifyActivityDialog(ctk.CTkToplevel):
             ):
                 return
 
-            self.current_activity.name = name
-            self.current_activity.timespan = timespan
-            self.current_activity.first_date = first_date
-            self.current_activity.min_capacity = min_capacity
-            self.current_activity.max_capacity = max_capacity
-            self.current_activity.valid_grades = valid_grades
+            Journal().edit_activity(
+                self.current_activity,
+                name=name,
+                timespan=timespan,
+                first_date=first_date,
+                min_capacity=min_capacity,
+                max_capacity=max_capacity,
+                valid_grades=valid_grades,
+            )
         else:
-            state.add_activity(
+            Journal().add_activity(
                 Activity(
                     name=name,
                     min_capacity=min_capacity,
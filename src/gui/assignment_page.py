@@ -1,13 +1,30 @@
 import copy
+import threading
+import time
+from pathlib import Path
 from tkinter import ttk
 from typing import Any
 
 import customtkinter as ctk
 
 from activity import Activity
-from assignment import assign_students, Assignment
+from assignment import Assignment, AssignmentResult, solve_assignment
+from cache import SolutionCache
 from gui.confirmation import confirm_choice
+from gui.error_popup import open_error_popup
+from gui.search_dialog import search_activity, search_student
+from journal import Journal
+from persistent_model import PersistentModel
+from solver import SolverSettings, available_backends
 from state import State
+from student import Student
+
+TIME_LIMIT_OPTIONS = {"Ohne Zeitlimit": None, "10 Sekunden": 10, "1 Minute": 60, "5 Minuten": 300}
+GAP_OPTIONS = {"Optimal": None, "Lücke 1 %": 0.01, "Lücke 5 %": 0.05}
+CUT_OPTIONS = {"Standard": "auto", "Keine": "off", "Nur am Anfang": "root", "Aggressiv": "aggressive"}
+STATUS_NAMES = {"Optimal": "optimal", "Feasible": "zulässig", "Infeasible": "unlösbar", "Not Solved": "nicht gelöst"}
+POLL_INTERVAL_MS = 200
+CACHE_DIRECTORY = Path.home() / ".kurszuteilung" / "cache"
 
 
 class AssignmentPage(ctk.CTkFrame):
@@ -26,31 +43,191 @@ class AssignmentPage(ctk.CTkFrame):
         button_frame = ctk.CTkFrame(self, fg_color=self.cget("fg_color"))
         button_frame.grid(row=2, column=0, padx=20, sticky="w")
 
-        generate_assignment_button = ctk.CTkButton(
+        self.generate_assignment_button = ctk.CTkButton(
             button_frame, text="Generieren", font=ctk.CTkFont(size=18), command=self.generate_assignment
         )
-        generate_assignment_button.grid(row=0, column=0, padx=10)
+        self.generate_assignment_button.grid(row=0, column=0, padx=10)
+
+        self.update_assignment_button = ctk.CTkButton(
+            button_frame, text="Aktualisieren", font=ctk.CTkFont(size=18), command=self.update_assignment
+        )
+        self.update_assignment_button.grid(row=0, column=1, padx=10)
+
+        self.cancel_button = ctk.CTkButton(
+            button_frame, text="Abbrechen", font=ctk.CTkFont(size=18), command=self.cancel_solver, state="disabled"
+        )
+        self.cancel_button.grid(row=0, column=2, padx=10)
 
-        edit_assignment_button = ctk.CTkButton(
+        self.edit_assignment_button = ctk.CTkButton(
             button_frame, text="Löschen", font=ctk.CTkFont(size=18), command=self.reset
         )
-        edit_assignment_button.grid(row=0, column=1, padx=10)
+        self.edit_assignment_button.grid(row=0, column=3, padx=10)
+
+        solver_label = ctk.CTkLabel(button_frame, text="Solver:", font=ctk.CTkFont(size=18))
+        solver_label.grid(row=0, column=4, padx=(30, 10))
+        self.solver_option = ctk.CTkOptionMenu(
+            button_frame, values=available_backends(include_heuristic=True), command=self.set_solver_backend
+        )
+        self.solver_option.grid(row=0, column=5, padx=10)
+
+        self.time_limit_option = ctk.CTkOptionMenu(
+            button_frame, values=list(TIME_LIMIT_OPTIONS), command=self.set_solver_time_limit
+        )
+        self.time_limit_option.grid(row=0, column=6, padx=10)
+
+        self.gap_option = ctk.CTkOptionMenu(button_frame, values=list(GAP_OPTIONS), command=self.set_solver_gap)
+        self.gap_option.grid(row=0, column=7, padx=10)
+
+        solver_settings_button = ctk.CTkButton(
+            button_frame, text="Einstellungen...", font=ctk.CTkFont(size=18), command=self.edit_solver_settings
+        )
+        solver_settings_button.grid(row=0, column=8, padx=10)
+
+        self.result_label = ctk.CTkLabel(button_frame, text="", font=ctk.CTkFont(size=16))
+        self.result_label.grid(row=1, column=0, columnspan=9, padx=10, pady=(10, 0), sticky="w")
+
+        self.violation_label = ctk.CTkLabel(
+            button_frame, text="", font=ctk.CTkFont(size=16), text_color="orange", justify="left"
+        )
+        self.violation_label.grid(row=2, column=0, columnspan=9, padx=10, pady=(10, 0), sticky="w")
+
+        self.solution_cache = SolutionCache(CACHE_DIRECTORY)
+        self.solver_thread: threading.Thread | None = None
+        self.cancel_event = threading.Event()
+        self.solver_started = 0.0
+        self.best_objective: float | None = None
+        self.solver_outcome: AssignmentResult | Exception | None = None
 
         self.assignment_view = ctk.CTkScrollableFrame(self)
         self.assignment_view.grid(row=3, column=0, padx=20, pady=30, sticky="nsew")
         self.assignment_view.grid_columnconfigure(0, weight=1)
         self.assignment_view.grid_columnconfigure(1, weight=1)
 
+        self.display_solver_settings()
         self.display_assignment()
 
     def reset(self):
+        if self.solver_thread is not None:
+            return
         if confirm_choice(self, "Zuteilung wirklich löschen?"):
-            State().set_assignment(Assignment())
+            Journal().set_assignment(Assignment())
             self.display_assignment()
 
-    def generate_assignment(self):
+    def assign_student(self):
+        if self.solver_thread is not None:
+            return
+        if (student := search_student(self)) is None or (activity := search_activity(self)) is None:
+            return
+        Journal().assign_student_to_activity_by_id(student.id, activity.id)
+        self.display_assignment()
+
+    def unassign_student(self):
+        if self.solver_thread is not None:
+            return
+        if (student := search_student(self)) is None or (activity := search_activity(self)) is None:
+            return
+        assignment = State().assignment
+        if not assignment.student_known(student.id) or activity.id not in assignment.get_activities_for_student(
+            student.id
+        ):
+            open_error_popup(self, f"{student.name} ist nicht in {activity.name} eingeteilt!")
+            return
+        Journal().remove_student_from_activity_by_id(student.id, activity.id)
+        self.display_assignment()
+
+    def generate_assignment(self, incremental: bool = False):
+        if self.solver_thread is not None:
+            return
+        # The worker only ever sees copies; the State is touched again on the Tk thread once the result is accepted.
+        state = State()
+        students = copy.deepcopy(state.students)
+        activities = copy.deepcopy(state.activities)
+        initial_assignment = None if state.assignment.is_empty() else copy.deepcopy(state.assignment)
+        # Edits made from here on are only applied to the model by the next solve.
+        persistent_model = Journal().persistent_model.checkout()
+
+        self.cancel_event = threading.Event()
+        self.best_objective = None
+        self.solver_outcome = None
+        self.solver_started = time.monotonic()
+        self.solver_thread = threading.Thread(
+            target=self.run_solver,
+            args=(
+                students,
+                activities,
+                copy.copy(state.solver_settings),
+                initial_assignment,
+                incremental,
+                persistent_model,
+            ),
+            daemon=True,
+        )
+        self.set_solver_running(True)
+        self.solver_thread.start()
+        self.after(POLL_INTERVAL_MS, self.poll_solver)
+
+    def run_solver(
+        self,
+        students: list[Student],
+        activities: list[Activity],
+        settings: SolverSettings,
+        initial_assignment: Assignment | None,
+        incremental: bool,
+        persistent_model: PersistentModel,
+    ):
+        try:
+            self.solver_outcome = solve_assignment(
+                students,
+                activities,
+                settings,
+                initial_assignment=initial_assignment,
+                incremental=incremental,
+                progress_callback=self.report_progress,
+                cancel_event=self.cancel_event,
+                cache=self.solution_cache,
+                persistent_model=persistent_model,
+            )
+        except Exception as e:
+            self.solver_outcome = e
+
+    def report_progress(self, objective: float):
+        self.best_objective = objective
+
+    def cancel_solver(self):
+        self.cancel_event.set()
+        self.cancel_button.configure(state="disabled")
+
+    def set_solver_running(self, running: bool):
+        state = "disabled" if running else "normal"
+        self.generate_assignment_button.configure(state=state)
+        self.update_assignment_button.configure(state=state)
+        self.edit_assignment_button.configure(state=state)
+        self.cancel_button.configure(state="normal" if running else "disabled")
+
+    def poll_solver(self):
+        if self.solver_thread.is_alive():
+            text = f"Berechnung läuft seit {time.monotonic() - self.solver_started:.0f} s"
+            if self.best_objective is not None:
+                text += f", bester Zielwert: {self.best_objective:.0f}"
+            self.result_label.configure(text=text)
+            self.after(POLL_INTERVAL_MS, self.poll_solver)
+            return
+
+        self.solver_thread = None
+        self.set_solver_running(False)
+        if self.cancel_event.is_set():
+            self.result_label.configure(text="Berechnung abgebrochen.")
+            return
+        if isinstance(self.solver_outcome, Exception):
+            self.result_label.configure(text="")
+            open_error_popup(self, str(self.solver_outcome))
+            return
+        self.accept_result(self.solver_outcome)
+
+    def accept_result(self, result: AssignmentResult):
         state = State()
-        new_assignment = assign_students(state.students, state.activities)
+        new_assignment = result.assignment
+        self.display_result(result)
 
         exceptions = new_assignment.check_validity(state.students, state.activities)
 
@@ -61,12 +238,66 @@ class AssignmentPage(ctk.CTkFrame):
             if not confirm_choice(self, confirmation_text):
                 return
 
-        state.set_assignment(new_assignment)
+        Journal().set_assignment(new_assignment)
 
         self.display_assignment()
         self.focus_set()
 
+    def clear_solution_cache(self):
+        self.solution_cache.invalidate()
+        self.result_label.configure(text="Zwischenspeicher geleert.")
+
+    def set_solver_backend(self, backend: str):
+        State().solver_settings.backend = backend
+
+    def set_solver_time_limit(self, option: str):
+        State().solver_settings.time_limit = TIME_LIMIT_OPTIONS[option]
+
+    def set_solver_gap(self, option: str):
+        State().solver_settings.gap = GAP_OPTIONS[option]
+
+    def edit_solver_settings(self):
+        dialog = SolverSettingsDialog(self)
+        dialog.after(50, lambda: dialog.focus_set())
+        self.wait_window(dialog)
+
+    def display_solver_settings(self):
+        # Settings loaded with a save file may hold values the menus do not offer; those are shown as they are.
+        settings = State().solver_settings
+        self.solver_option.set(settings.backend)
+        self.time_limit_option.set(
+            next(
+                (name for name, value in TIME_LIMIT_OPTIONS.items() if value == settings.time_limit),
+                f"{settings.time_limit} s",
+            )
+        )
+        self.gap_option.set(
+            next((name for name, value in GAP_OPTIONS.items() if value == settings.gap), f"Lücke {settings.gap}")
+        )
+
+    def display_result(self, result: AssignmentResult):
+        text = f"Status: {STATUS_NAMES.get(result.status, result.status)}, Zielwert: {result.objective:.0f}"
+        if result.gap is not None:
+            text += f", Lücke: {100 * result.gap:.2f} %"
+        if result.stats is not None:
+            text += f"\n{result.stats.summary()}"
+        self.result_label.configure(text=text)
+
+    def update_assignment(self):
+        self.generate_assignment(incremental=True)
+
+    def display_violations(self):
+        # Read from the index the journal keeps, so this costs nothing after a manual move.
+        violations = [] if State().assignment.is_empty() else Journal().violations.violations()
+        text = ""
+        if len(violations) > 0:
+            text = f"Warnung: Zuteilung enthält {len(violations)} Fehler:\n" + "\n".join(map(str, violations[:5]))
+            if len(violations) > 5:
+                text += "\n..."
+        self.violation_label.configure(text=text)
+
     def display_assignment(self):
+        self.display_violations()
         for widget in self.assignment_view.winfo_children():
             widget.destroy()
         state = State()
@@ -106,3 +337,61 @@ class AssignmentPage(ctk.CTkFrame):
                     activity_frame, text=str(student.grade) + student.subgrade, font=ctk.CTkFont(size=16)
                 )
                 student_grade_label.grid(row=student_row, column=2, padx=20)
+
+
+class SolverSettingsDialog(ctk.CTkToplevel):
+    def __init__(self, master: Any) -> None:
+        ctk.CTkToplevel.__init__(self, master)
+
+        self.title("Solver-Einstellungen")
+
+        self.grid_columnconfigure(1, weight=1)
+        settings = State().solver_settings
+
+        threads_label = ctk.CTkLabel(self, text="Threads (leer: Standard):", font=ctk.CTkFont(size=16))
+        threads_label.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="w")
+        self.threads_entry = ctk.CTkEntry(self)
+        self.threads_entry.grid(row=0, column=1, padx=20, pady=(20, 10), sticky="we")
+        if settings.threads is not None:
+            self.threads_entry.insert(0, str(settings.threads))
+
+        seed_label = ctk.CTkLabel(self, text="Startwert:", font=ctk.CTkFont(size=16))
+        seed_label.grid(row=1, column=0, padx=20, pady=10, sticky="w")
+        self.seed_entry = ctk.CTkEntry(self)
+        self.seed_entry.grid(row=1, column=1, padx=20, pady=10, sticky="we")
+        self.seed_entry.insert(0, str(settings.seed))
+
+        cuts_label = ctk.CTkLabel(self, text="Schnittebenen:", font=ctk.CTkFont(size=16))
+        cuts_label.grid(row=2, column=0, padx=20, pady=10, sticky="w")
+        self.cuts_option = ctk.CTkOptionMenu(self, values=list(CUT_OPTIONS))
+        self.cuts_option.grid(row=2, column=1, padx=20, pady=10, sticky="we")
+        self.cuts_option.set(next(name for name, cuts in CUT_OPTIONS.items() if cuts == settings.cuts))
+
+        self.presolve_var = ctk.BooleanVar(value=settings.presolve)
+        presolve_checkbox = ctk.CTkCheckBox(
+            self, text="Vorverarbeitung", variable=self.presolve_var, onvalue=True, offvalue=False
+        )
+        presolve_checkbox.grid(row=3, column=0, columnspan=2, padx=20, pady=10, sticky="w")
+
+        accept_button = ctk.CTkButton(self, text="Akzeptieren", command=self.on_accept)
+        accept_button.grid(row=4, column=0, padx=20, pady=20)
+
+        cancel_button = ctk.CTkButton(self, text="Abbrechen", command=self.destroy)
+        cancel_button.grid(row=4, column=1, padx=20, pady=20)
+
+    def on_accept(self):
+        threads = self.threads_entry.get().strip()
+        seed = self.seed_entry.get().strip()
+        if threads and (not threads.isdigit() or int(threads) < 1):
+            open_error_popup(self, "Die Anzahl der Threads muss eine positive ganze Zahl sein!")
+            return
+        if not seed.isdigit() or int(seed) < 1:
+            open_error_popup(self, "Der Startwert muss eine positive ganze Zahl sein!")
+            return
+
+        settings = State().solver_settings
+        settings.threads = int(threads) if threads else None
+        settings.seed = int(seed)
+        settings.cuts = CUT_OPTIONS[self.cuts_option.get()]
+        settings.presolve = self.presolve_var.get()
+        self.destroy()
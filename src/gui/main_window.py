@@ -1,12 +1,15 @@
 from pathlib import Path
+from typing import Callable
 
 import customtkinter as ctk
 import tkinter as tk
 import tkinter.filedialog
 
+from journal import Journal, JournalTargetMissing
 from state import State
 from .assignment_page import AssignmentPage
 from .confirmation import confirm_choice
+from .error_popup import open_error_popup
 from .sidebar import Sidebar
 from .statistics_page import StatisticsPage
 from .students_page import StudentsPage
@@ -73,6 +76,16 @@ class MainWindow(ctk.CTk):
         self.bind_all("<Control-s>", lambda _: self.save())
         self.bind_all("<Control-w>", lambda _: self.destroy())
 
+        edit_menu = tk.Menu(menu_bar, tearoff=False)
+        menu_bar.add_cascade(label="Bearbeiten", menu=edit_menu)
+
+        edit_menu.add_command(label="Rückgängig", accelerator="Strg+Z", command=self.undo)
+        edit_menu.add_command(label="Wiederholen", accelerator="Strg+Y", command=self.redo)
+
+        # Bound to the main window only, so the keys do nothing in the edit dialogs.
+        self.bind("<Control-z>", lambda _: self.undo())
+        self.bind("<Control-y>", lambda _: self.redo())
+
         student_menu = tk.Menu(menu_bar, tearoff=False)
         menu_bar.add_cascade(label="Kinder", menu=student_menu)
 
@@ -94,7 +107,13 @@ class MainWindow(ctk.CTk):
         menu_bar.add_cascade(label="Zuteilung", menu=assignment_menu)
 
         assignment_menu.add_command(label="Zuteilung generieren", command=self.assignment_page.generate_assignment)
+        assignment_menu.add_command(label="Zuteilung aktualisieren", command=self.assignment_page.update_assignment)
         assignment_menu.add_command(label="Zuteilung löschen", command=self.assignment_page.reset)
+        assignment_menu.add_separator()
+        assignment_menu.add_command(label="Kind einem Kurs zuteilen...", command=self.assignment_page.assign_student)
+        assignment_menu.add_command(label="Kind aus Kurs austragen...", command=self.assignment_page.unassign_student)
+        assignment_menu.add_separator()
+        assignment_menu.add_command(label="Zwischenspeicher leeren", command=self.assignment_page.clear_solution_cache)
 
         export_menu = tk.Menu(menu_bar, tearoff=False)
         menu_bar.add_cascade(label="Export", menu=export_menu)
@@ -107,9 +126,37 @@ class MainWindow(ctk.CTk):
     def update_display(self):
         self.student_page.display_students()
         self.activity_page.display_activities()
+        self.assignment_page.display_solver_settings()
         self.assignment_page.display_assignment()
         self.statistics_page.display_statistics()
 
+    def dialog_open(self) -> bool:
+        # While a dialog is open it may hold a student or course that an undo would replace or remove.
+        widgets = self.winfo_children()
+        while widgets:
+            widget = widgets.pop()
+            if isinstance(widget, tk.Toplevel) and widget.winfo_exists():
+                return True
+            widgets.extend(widget.winfo_children())
+        return False
+
+    def undo(self):
+        self.run_journal_step(Journal().undo)
+
+    def redo(self):
+        self.run_journal_step(Journal().redo)
+
+    def run_journal_step(self, step: Callable[[], bool]) -> None:
+        if self.dialog_open():
+            return
+        try:
+            changed = step()
+        except JournalTargetMissing as e:
+            open_error_popup(self, str(e))
+            return
+        if changed:
+            self.update_display()
+
     def new(self):
         if not confirm_choice(
             self, "Es sind möglicherweise nicht-gespeicherte Änderungen vorhanden. Wirklich fortfahren?"
@@ -118,6 +165,7 @@ class MainWindow(ctk.CTk):
 
         self.last_save = None
         State().reset()
+        Journal().clear()
         self.update_display()
 
     def load(self):
@@ -129,6 +177,7 @@ class MainWindow(ctk.CTk):
             return
         self.last_save = result_path
         State().read(self.last_save)
+        Journal().clear()
         self.update_display()
 
     def save(self):
@@ -10,6 +10,7 @@ from matplotlib.figure import Figure
 from abc import ABC, abstractmethod
 
 from assignment import StudentIDNotAssigned
+from journal import Journal
 from state import State
 
 
@@ -124,7 +125,8 @@ class AssignmentCountsByCourse(ctk.CTkFrame, StateStatistic):
             return
 
         data = {}
-        student_id_map = {student.id: student for student in state.students}
+        # Kept up to date by the journal with every edit of the assignment.
+        grade_counts = Journal().grade_counts
 
         def shorten_str(s: str, maxlen: int) -> str:
             if len(s) <= maxlen:
@@ -135,10 +137,7 @@ class AssignmentCountsByCourse(ctk.CTkFrame, StateStatistic):
             if not state.assignment.activity_known(activity.id):
                 continue
             short_name = shorten_str(activity.name, 20)
-            data[short_name] = ([0] * 4, activity.min_capacity, activity.max_capacity)
-            for student_id in state.assignment.get_students_for_activity(activity.id):
-                student = student_id_map[student_id]
-                data[short_name][0][student.grade - 1] += 1
+            data[short_name] = (grade_counts.grade_counts(activity.id), activity.min_capacity, activity.max_capacity)
 
         n_bars = len(data)
 
@@ -4,11 +4,13 @@ from typing import Any
 import customtkinter as ctk
 
 from activity import get_activity_id_map
+from assignment import Assignment
 from gui.confirmation import confirm_choice
 from gui.search_dialog import search_student
 from id_generator import ID
+from journal import Journal
 from state import State
-from student import Student
+from student import GUARANTEED_PREFERENCE, Student
 
 
 class StudentsPage(ctk.CTkFrame):
@@ -73,14 +75,17 @@ class StudentsPage(ctk.CTkFrame):
     def remove_student(self):
         if (student := search_student(self)) is not None:
             if confirm_choice(self, f'Kind "{student.name}" ({student.grade}{student.subgrade}) wirklich entfernen?'):
-                State().remove_student_by_id(student.id)
+                Journal().remove_student_by_id(student.id)
                 self.display_students()
 
     def reset_preferences(self):
         if confirm_choice(self, f"Wirklich alle eingetragenen Präferenzen löschen?"):
-            for student in State().students:
-                student.preferences = {}
-                State().reset_assignment()
+            journal = Journal()
+            with journal.group():
+                for student in State().students:
+                    if student.preferences:
+                        journal.edit_student(student, preferences={})
+                journal.set_assignment(Assignment())
             self.display_students()
 
     def display_students(self):
@@ -107,7 +112,7 @@ class StudentsPage(ctk.CTkFrame):
             preference_text = ", ".join(
                 [
                     f"{student.preferences[activity_id]}: {activity_id_map[activity_id].name}".replace(
-                        "-100", "Garantiert"
+                        str(GUARANTEED_PREFERENCE), "Garantiert"
                     )
                     for activity_id in sorted_preferences
                 ]
@@ -174,7 +179,7 @@ class ModifyStudentDialog(ctk.CTkToplevel):
         self.grade_option.set(str(student.grade) + student.subgrade)
         for activity_id in student.preferences:
             preference = student.preferences.get(activity_id, "-")
-            if preference == -100:
+            if preference == GUARANTEED_PREFERENCE:
                 self.preference_options[activity_id].set("Garantiert")
             else:
                 self.preference_options[activity_id].set(preference)
@@ -188,7 +193,7 @@ class ModifyStudentDialog(ctk.CTkToplevel):
         for activity_id, option in self.preference_options.items():
             if option.get() != "-":
                 if option.get() == "Garantiert":
-                    preferences[activity_id] = -100
+                    preferences[activity_id] = GUARANTEED_PREFERENCE
                 else:
                     preferences[activity_id] = int(option.get())
 
@@ -202,12 +207,11 @@ class ModifyStudentDialog(ctk.CTkToplevel):
                 return
 
         if self.current_student is not None:
-            self.current_student.name = name
-            self.current_student.grade = grade
-            self.current_student.subgrade = subgrade
-            self.current_student.preferences = preferences
+            Journal().edit_student(
+                self.current_student, name=name, grade=grade, subgrade=subgrade, preferences=preferences
+            )
         else:
-            state.add_student(
+            Journal().add_student(
                 Student(
                     name=name,
                     grade=grade,
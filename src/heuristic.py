@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from itertools import combinations
+from threading import Event
+
+from dataclasses_json import dataclass_json
+
+from activity import Activity, get_overlap_cliques
+from assignment import (
+    Assignment,
+    AssignmentResult,
+    NoAssignedActivity,
+    StudentIDNotAssigned,
+    check_preferences,
+    objective_value,
+)
+from model import NO_COURSE_PENALTY
+from presolve import Reductions, presolve
+from solver import ProgressCallback
+from student import Student
+
+
+@dataclass_json
+@dataclass
+class HeuristicSettings:
+    iterations: int = 200_000
+    time_limit: float | None = None
+    seed: int | None = None
+
+
+class _LocalSearch:
+    # Students and activities are addressed by their list index. All moves keep max_capacity, grade validity and
+    # overlaps intact and never let a course drop below its min_capacity once it has reached it. The presolve
+    # reductions apply as in the MILP: fixed (guaranteed) pairs are joined first and never left, removed pairs are
+    # never considered.
+    def __init__(self, students: list[Student], activities: list[Activity], rng: random.Random, reductions: Reductions):
+        self.rng = rng
+        self.min_capacities = [activity.min_capacity for activity in activities]
+        self.max_capacities = [activity.max_capacity for activity in activities]
+
+        activity_index = {activity.id: idx for idx, activity in enumerate(activities)}
+        self.overlaps: list[set[int]] = [set() for _ in activities]
+        for clique in get_overlap_cliques(activities):
+            for activity_id_0, activity_id_1 in combinations(clique, 2):
+                self.overlaps[activity_index[activity_id_0]].add(activity_index[activity_id_1])
+                self.overlaps[activity_index[activity_id_1]].add(activity_index[activity_id_0])
+
+        self.weights: list[dict[int, float]] = [
+            {
+                activity_index[activity_id]: 10 - preference
+                for activity_id, preference in student.preferences.items()
+                if activities[activity_index[activity_id]].is_valid_grade(student.grade)
+                and (student.id, activity_id) not in reductions.removed_pairs
+            }
+            for student in students
+        ]
+        student_index = {student.id: idx for idx, student in enumerate(students)}
+        self.fixed: set[tuple[int, int]] = {
+            (student_index[student_id], activity_index[activity_id])
+            for student_id, activity_id in reductions.fixed_pairs
+        }
+        # Best preference first, ties in random order.
+        self.ranked: list[list[int]] = []
+        for weights in self.weights:
+            options = list(weights)
+            rng.shuffle(options)
+            self.ranked.append(sorted(options, key=lambda activity: -weights[activity]))
+
+        self.interested: list[list[int]] = [[] for _ in activities]
+        for student, weights in enumerate(self.weights):
+            for activity in weights:
+                self.interested[activity].append(student)
+
+        self.assigned: list[set[int]] = [set() for _ in students]
+        self.members: list[set[int]] = [set() for _ in activities]
+        self.objective = -NO_COURSE_PENALTY * float(len(students))
+        # Full courses for which no ejection chain was found; cleared whenever the search may have changed that.
+        self.blocked: set[int] = set()
+
+    def has_room(self, activity: int) -> bool:
+        return len(self.members[activity]) < self.max_capacities[activity]
+
+    def can_leave(self, activity: int) -> bool:
+        return len(self.members[activity]) > self.min_capacities[activity]
+
+    def conflicts(self, student: int, activity: int) -> set[int]:
+        return self.overlaps[activity] & self.assigned[student]
+
+    def movable(self, student: int, activities: set[int]) -> bool:
+        return not any((student, activity) in self.fixed for activity in activities)
+
+    def join(self, student: int, activity: int) -> None:
+        if not self.assigned[student]:
+            self.objective += NO_COURSE_PENALTY
+        self.assigned[student].add(activity)
+        self.members[activity].add(student)
+        self.objective += self.weights[student][activity]
+
+    def leave(self, student: int, activity: int) -> None:
+        self.assigned[student].discard(activity)
+        self.members[activity].discard(student)
+        self.objective -= self.weights[student][activity]
+        if not self.assigned[student]:
+            self.objective -= NO_COURSE_PENALTY
+
+    def construct(self, students: list[int]) -> None:
+        # First one course per student, so the no-course penalty is avoided wherever capacity allows, then the
+        # minimum capacities, then every further course that still fits.
+        for student, activity in sorted(self.fixed):
+            self.join(student, activity)
+        for student in students:
+            if self.assigned[student]:
+                continue
+            for activity in self.ranked[student]:
+                if self.has_room(activity):
+                    self.join(student, activity)
+                    break
+        for student in students:
+            if not self.assigned[student]:
+                self.eject_into(student)
+        self.repair_min_capacities()
+        for student in students:
+            self.fill(student)
+
+    def fill(self, student: int) -> None:
+        for activity in self.ranked[student]:
+            if (
+                self.weights[student][activity] > 0
+                and activity not in self.assigned[student]
+                and self.has_room(activity)
+                and not self.conflicts(student, activity)
+            ):
+                self.join(student, activity)
+
+    def free_seat(self, activity: int) -> list[tuple[int, int, int | None]] | None:
+        # Ejection chain, searched breadth first like an augmenting path: a member who keeps another course simply
+        # leaves, otherwise a member moves on to another of their courses, which may in turn have to free a seat. Finds
+        # a chain whenever one exists. Returns the moves deepest first; on failure every course seen is blocked.
+        parents: dict[int, tuple[int, int] | None] = {activity: None}
+        queue = deque([activity])
+        while queue:
+            source = queue.popleft()
+            members = [member for member in self.members[source] if self.movable(member, {source})]
+            for other in members:
+                if len(self.assigned[other]) > 1:
+                    return self._chain(parents, (other, source, None))
+            for other in members:
+                for target in self.ranked[other]:
+                    if (
+                        target in parents
+                        or target in self.blocked
+                        or target in self.assigned[other]
+                        or self.conflicts(other, target) - {source}
+                    ):
+                        continue
+                    parents[target] = (other, source)
+                    if self.has_room(target):
+                        return self._chain(parents, (other, source, target))
+                    queue.append(target)
+        self.blocked |= parents.keys()
+        return None
+
+    @staticmethod
+    def _chain(
+        parents: dict[int, tuple[int, int] | None], last: tuple[int, int, int | None]
+    ) -> list[tuple[int, int, int | None]]:
+        chain = [last]
+        while parents[chain[-1][1]] is not None:
+            other, source = parents[chain[-1][1]]
+            chain.append((other, source, chain[-1][1]))
+        return chain
+
+    def eject_into(self, student: int) -> bool:
+        for activity in self.ranked[student]:
+            if self.has_room(activity):
+                self.join(student, activity)
+                return True
+        for activity in self.ranked[student]:
+            if activity in self.blocked:
+                continue
+            chain = self.free_seat(activity)
+            if chain is None:
+                continue
+            for other, source, target in chain:
+                self.leave(other, source)
+                if target is not None:
+                    self.join(other, target)
+            self.join(student, activity)
+            self.blocked.clear()
+            return True
+        return False
+
+    def repair_min_capacities(self) -> None:
+        for activity, min_capacity in enumerate(self.min_capacities):
+            while len(self.members[activity]) < min_capacity:
+                best_gain, best_student, best_conflicts = None, None, None
+                for student in self.interested[activity]:
+                    if student in self.members[activity]:
+                        continue
+                    conflicts = self.conflicts(student, activity)
+                    if not self.movable(student, conflicts) or not all(
+                        self.can_leave(conflict) for conflict in conflicts
+                    ):
+                        continue
+                    gain = self.weights[student][activity] - sum(
+                        self.weights[student][conflict] for conflict in conflicts
+                    )
+                    if not self.assigned[student]:
+                        gain += NO_COURSE_PENALTY
+                    if best_gain is None or gain > best_gain:
+                        best_gain, best_student, best_conflicts = gain, student, conflicts
+                if best_student is None:
+                    break
+                for conflict in best_conflicts:
+                    self.leave(best_student, conflict)
+                self.join(best_student, activity)
+
+    def improve(self, student: int) -> float:
+        # One randomized move for the given student; returns the objective change, which is never negative.
+        if not self.weights[student]:
+            return 0.0
+        if not self.assigned[student]:
+            before = self.objective
+            self.eject_into(student)
+            return self.objective - before
+
+        activity = self.rng.choice(list(self.weights[student]))
+        if activity in self.assigned[student]:
+            return 0.0
+        weights = self.weights[student]
+        conflicts = self.conflicts(student, activity)
+        if not self.movable(student, conflicts):
+            return 0.0
+
+        if self.has_room(activity):
+            gain = weights[activity] - sum(weights[conflict] for conflict in conflicts)
+            if gain < 0 or not all(self.can_leave(conflict) for conflict in conflicts):
+                return 0.0
+            for conflict in conflicts:
+                self.leave(student, conflict)
+            self.join(student, activity)
+            return gain
+
+        # Full course: take the seat of a member who keeps another course, or swap seats with a member who chose
+        # the student's conflicting course.
+        other = self.rng.choice(list(self.members[activity]))
+        other_weights = self.weights[other]
+        if not self.movable(other, {activity}):
+            return 0.0
+        if len(self.assigned[other]) > 1:
+            gain = weights[activity] - sum(weights[conflict] for conflict in conflicts) - other_weights[activity]
+            if gain < 0 or not all(self.can_leave(conflict) for conflict in conflicts):
+                return 0.0
+            for conflict in conflicts:
+                self.leave(student, conflict)
+            self.leave(other, activity)
+            self.join(student, activity)
+            return gain
+
+        if len(conflicts) != 1:
+            return 0.0
+        (current,) = conflicts
+        if current not in other_weights or current in self.assigned[other]:
+            return 0.0
+        if self.conflicts(other, current) - {activity}:
+            return 0.0
+        gain = weights[activity] - weights[current] + other_weights[current] - other_weights[activity]
+        if gain < 0:
+            return 0.0
+        self.leave(student, current)
+        self.leave(other, activity)
+        self.join(student, activity)
+        self.join(other, current)
+        return gain
+
+
+def solve_heuristic(
+    students: list[Student],
+    activities: list[Activity],
+    settings: HeuristicSettings | None = None,
+    progress_callback: ProgressCallback | None = None,
+    cancel_event: Event | None = None,
+) -> AssignmentResult:
+    settings = settings or HeuristicSettings()
+    check_preferences(students, activities)
+    # Raises like solve_assignment if guaranteed courses or capacities already rule out every assignment.
+    reductions = presolve(students, activities)
+    deadline = None if settings.time_limit is None else time.monotonic() + settings.time_limit
+
+    rng = random.Random(settings.seed)
+    search = _LocalSearch(students, activities, rng, reductions)
+    order = list(range(len(students)))
+    rng.shuffle(order)
+    search.construct(order)
+
+    reported = search.objective
+    if progress_callback is not None:
+        progress_callback(reported)
+    for iteration in range(settings.iterations if students else 0):
+        search.improve(rng.randrange(len(students)))
+        if iteration % len(students) == 0:
+            search.blocked.clear()
+        if iteration % 1024 == 0:
+            if search.objective > reported and progress_callback is not None:
+                reported = search.objective
+                progress_callback(reported)
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            if cancel_event is not None and cancel_event.is_set():
+                break
+    search.blocked.clear()
+    for student in order:
+        if not search.assigned[student]:
+            search.eject_into(student)
+    search.repair_min_capacities()
+
+    assignment = Assignment()
+    for student, activity_indices in zip(students, search.assigned):
+        for activity in activity_indices:
+            assignment.assign_student_to_activity(student, activities[activity])
+
+    # Students without a course are part of every solution the MILP can return too; anything else is a violation.
+    violations = [
+        exception
+        for exception in assignment.check_validity(students, activities)
+        if not isinstance(exception, (NoAssignedActivity, StudentIDNotAssigned))
+    ]
+    status = "Feasible" if not violations else "Not Solved"
+    objective = objective_value(students, assignment)
+    if progress_callback is not None and objective > reported:
+        progress_callback(objective)
+    return AssignmentResult(assignment, status, objective, None, None)
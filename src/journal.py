@@ -0,0 +1,461 @@
+from __future__ import annotations
+
+import copy
+import json
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, fields, replace
+from pathlib import Path
+from typing import Any, Callable, ClassVar, Iterator
+
+from singleton_decorator import singleton
+
+from activity import Activity, split_activity
+from assignment import Assignment
+from grade_counts import GradeCountIndex
+from id_generator import ID
+from persistent_model import PersistentModel
+from state import State
+from student import Student
+from violations import ViolationIndex
+
+
+class JournalTargetMissing(Exception):
+    def __init__(self, item_id: ID):
+        super().__init__(f"Rückgängig/Wiederholen nicht möglich: Eintrag mit ID {item_id} existiert nicht mehr.")
+
+
+def _find(items: list[Student] | list[Activity], item_id: ID) -> Student | Activity:
+    for item in items:
+        if item.id == item_id:
+            return item
+    raise JournalTargetMissing(item_id)
+
+
+def _copy_fields(source: Student | Activity, target: Student | Activity) -> None:
+    # The object in the state is changed in place, so the pages that hold it see the change.
+    for data_field in fields(source):
+        setattr(target, data_field.name, copy.deepcopy(getattr(source, data_field.name)))
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, Assignment):
+        return value.as_dict()
+    if isinstance(value, Operation):
+        return value.to_dict()
+    if isinstance(value, (Student, Activity)):
+        return asdict(value)
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    return value
+
+
+class Operation(ABC):
+    # One reversible change of the state. An operation only stores the objects it touches, so applying and reverting
+    # it costs as much as the change itself and no snapshot of the whole state is needed.
+    kind: ClassVar[str]
+    decoders: ClassVar[dict[str, Callable[[Any], Any]]] = {}
+
+    @abstractmethod
+    def apply(self, state: State) -> None: ...
+
+    @abstractmethod
+    def revert(self, state: State) -> None: ...
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "op": self.kind,
+            **{data_field.name: _encode(getattr(self, data_field.name)) for data_field in fields(self)},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Operation:
+        operation_cls = OPERATIONS[data["op"]]
+        return operation_cls(
+            **{
+                name: operation_cls.decoders.get(name, lambda value: value)(value)
+                for name, value in data.items()
+                if name != "op"
+            }
+        )
+
+
+@dataclass
+class AddStudent(Operation):
+    student: Student
+    index: int
+
+    kind = "add_student"
+    decoders = {"student": Student.from_dict}
+
+    def apply(self, state: State) -> None:
+        state.add_student(copy.deepcopy(self.student), self.index)
+
+    def revert(self, state: State) -> None:
+        state.remove_student_by_id(self.student.id)
+
+
+@dataclass
+class RemoveStudent(Operation):
+    student: Student
+    index: int
+
+    kind = "remove_student"
+    decoders = {"student": Student.from_dict}
+
+    def apply(self, state: State) -> None:
+        state.remove_student_by_id(self.student.id)
+
+    def revert(self, state: State) -> None:
+        state.add_student(copy.deepcopy(self.student), self.index)
+
+
+@dataclass
+class EditStudent(Operation):
+    before: Student
+    after: Student
+
+    kind = "edit_student"
+    decoders = {"before": Student.from_dict, "after": Student.from_dict}
+
+    def apply(self, state: State) -> None:
+        _copy_fields(self.after, _find(state.students, self.after.id))
+
+    def revert(self, state: State) -> None:
+        _copy_fields(self.before, _find(state.students, self.before.id))
+
+
+@dataclass
+class AddActivity(Operation):
+    activity: Activity
+    index: int
+    # Adding an activity resets the assignment; the old one comes back on undo.
+    assignment: Assignment
+
+    kind = "add_activity"
+    decoders = {"activity": Activity.from_dict, "assignment": Assignment.from_dict}
+
+    def apply(self, state: State) -> None:
+        state.add_activity(copy.deepcopy(self.activity), self.index)
+
+    def revert(self, state: State) -> None:
+        state.remove_activity_by_id(self.activity.id)
+        state.set_assignment(self.assignment)
+
+
+@dataclass
+class RemoveActivity(Operation):
+    activity: Activity
+    index: int
+    assignment: Assignment
+    # The preferences for the activity by student, which the removal deletes.
+    preferences: dict[ID, int] = field(default_factory=dict)
+
+    kind = "remove_activity"
+    decoders = {
+        "activity": Activity.from_dict,
+        "assignment": Assignment.from_dict,
+        "preferences": lambda preferences: {int(student_id): value for student_id, value in preferences.items()},
+    }
+
+    def apply(self, state: State) -> None:
+        state.remove_activity_by_id(self.activity.id)
+
+    def revert(self, state: State) -> None:
+        state.add_activity(copy.deepcopy(self.activity), self.index)
+        for student in state.students:
+            if student.id in self.preferences:
+                student.preferences[self.activity.id] = self.preferences[student.id]
+        state.set_assignment(self.assignment)
+
+
+@dataclass
+class EditActivity(Operation):
+    before: Activity
+    after: Activity
+
+    kind = "edit_activity"
+    decoders = {"before": Activity.from_dict, "after": Activity.from_dict}
+
+    def apply(self, state: State) -> None:
+        _copy_fields(self.after, _find(state.activities, self.after.id))
+
+    def revert(self, state: State) -> None:
+        _copy_fields(self.before, _find(state.activities, self.before.id))
+
+
+@dataclass
+class Assign(Operation):
+    student_id: ID
+    activity_id: ID
+
+    kind = "assign"
+
+    def apply(self, state: State) -> None:
+        state.assignment.assign_student_to_activity_by_id(self.student_id, self.activity_id)
+
+    def revert(self, state: State) -> None:
+        state.assignment.remove_student_from_activity_by_id(self.student_id, self.activity_id)
+
+
+@dataclass
+class Unassign(Operation):
+    student_id: ID
+    activity_id: ID
+
+    kind = "unassign"
+
+    def apply(self, state: State) -> None:
+        state.assignment.remove_student_from_activity_by_id(self.student_id, self.activity_id)
+
+    def revert(self, state: State) -> None:
+        state.assignment.assign_student_to_activity_by_id(self.student_id, self.activity_id)
+
+
+@dataclass
+class SetAssignment(Operation):
+    # A new plan from the solver or an emptied plan. Both plans are kept as they are, nothing is copied.
+    before: Assignment
+    after: Assignment
+
+    kind = "set_assignment"
+    decoders = {"before": Assignment.from_dict, "after": Assignment.from_dict}
+
+    def apply(self, state: State) -> None:
+        state.set_assignment(self.after)
+
+    def revert(self, state: State) -> None:
+        state.set_assignment(self.before)
+
+
+@dataclass
+class Group(Operation):
+    # Several operations that are undone and redone as one step, e.g. all changes of a split.
+    operations: list[Operation]
+
+    kind = "group"
+    decoders = {"operations": lambda operations: [Operation.from_dict(operation) for operation in operations]}
+
+    def apply(self, state: State) -> None:
+        for operation in self.operations:
+            operation.apply(state)
+
+    def revert(self, state: State) -> None:
+        for operation in reversed(self.operations):
+            operation.revert(state)
+
+    def flatten(self) -> list[Operation]:
+        return [
+            inner
+            for operation in self.operations
+            for inner in (operation.flatten() if isinstance(operation, Group) else [operation])
+        ]
+
+
+OPERATIONS: dict[str, type[Operation]] = {
+    operation_cls.kind: operation_cls
+    for operation_cls in (
+        AddStudent,
+        RemoveStudent,
+        EditStudent,
+        AddActivity,
+        RemoveActivity,
+        EditActivity,
+        Assign,
+        Unassign,
+        SetAssignment,
+        Group,
+    )
+}
+
+
+@singleton
+class Journal:
+    # Undo and redo for the edits of the State. Every edit goes through one of the methods below, which apply it to
+    # the state and record it as an Operation. With a log file every operation, undo and redo is also appended to the
+    # file as one JSON line, so replay can restore the edits made since the last save.
+    # The journal also keeps the violations and the grade counts of state.assignment, which the GUI reads after every
+    # edit. Moving a student or editing one student or course only updates the affected entries; all other operations
+    # replace the assignment or the lists the indexes were built from, so the indexes are built anew.
+    # persistent_model is told which students and courses each operation changed, so the next solve only builds their
+    # part of the model anew.
+    def __init__(self) -> None:
+        self.state = State()
+        self.log_path: Path | None = None
+        self.persistent_model = PersistentModel()
+        self.clear()
+
+    def clear(self, log_path: Path | None = None) -> None:
+        # To be called whenever the state is replaced as a whole, e.g. on load. A given log file is started anew.
+        self._undo_stack: list[Operation] = []
+        self._redo_stack: list[Operation] = []
+        self._group: list[Operation] | None = None
+        self.log_path = log_path
+        if log_path is not None:
+            log_path.write_text("")
+        self._build_indexes()
+        self.persistent_model.invalidate()
+
+    def _build_indexes(self) -> None:
+        state = self.state
+        self.violations = ViolationIndex(state.students, state.activities, state.assignment)
+        self.grade_counts = GradeCountIndex(state.students, state.assignment)
+
+    def _update_indexes(self, operation: Operation, applied: bool) -> None:
+        operations = operation.flatten() if isinstance(operation, Group) else [operation]
+        self._note_model_changes(operations)
+        if all(isinstance(inner, (Assign, Unassign)) for inner in operations):
+            for inner in operations:
+                self.violations.pair_changed(inner.student_id, inner.activity_id)
+                self.grade_counts.pair_changed(
+                    inner.student_id, inner.activity_id, isinstance(inner, Assign) == applied
+                )
+        elif all(isinstance(inner, (EditStudent, EditActivity)) for inner in operations):
+            assignment = self.state.assignment
+            for inner in operations:
+                if isinstance(inner, EditStudent):
+                    self.violations.update_student(inner.after.id)
+                    self.grade_counts.update_student(_find(self.state.students, inner.after.id))
+                    continue
+                # A new time can make the courses of every participant overlap.
+                self.violations.update_activity(inner.after.id)
+                if assignment.activity_known(inner.after.id):
+                    for student_id in assignment.get_students_for_activity(inner.after.id):
+                        self.violations.update_student(student_id)
+        else:
+            self._build_indexes()
+
+    def _note_model_changes(self, operations: list[Operation]) -> None:
+        # Moves and new plans leave the model as it is.
+        for inner in operations:
+            if isinstance(inner, (AddStudent, RemoveStudent)):
+                self.persistent_model.students_changed({inner.student.id})
+            elif isinstance(inner, EditStudent):
+                self.persistent_model.students_changed({inner.after.id})
+            elif isinstance(inner, EditActivity):
+                self.persistent_model.activities_changed({inner.after.id})
+            elif isinstance(inner, (AddActivity, RemoveActivity)):
+                self.persistent_model.invalidate()
+
+    def can_undo(self) -> bool:
+        return len(self._undo_stack) > 0
+
+    def can_redo(self) -> bool:
+        return len(self._redo_stack) > 0
+
+    def _log(self, entry: dict[str, Any]) -> None:
+        if self.log_path is not None:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _push(self, operation: Operation) -> None:
+        self._undo_stack.append(operation)
+        self._redo_stack.clear()
+        self._log(operation.to_dict())
+
+    def record(self, operation: Operation) -> None:
+        operation.apply(self.state)
+        self._update_indexes(operation, applied=True)
+        if self._group is not None:
+            self._group.append(operation)
+        else:
+            self._push(operation)
+
+    @contextmanager
+    def group(self) -> Iterator[None]:
+        if self._group is not None:
+            yield
+            return
+        self._group = []
+        try:
+            yield
+        finally:
+            operations, self._group = self._group, None
+            if operations:
+                self._push(Group(operations))
+
+    def undo(self) -> bool:
+        if not self._undo_stack:
+            return False
+        # Taken off the stack only once it went through, so a failed undo can be retried.
+        self._undo_stack[-1].revert(self.state)
+        self._update_indexes(self._undo_stack[-1], applied=False)
+        self._redo_stack.append(self._undo_stack.pop())
+        self._log({"op": "undo"})
+        return True
+
+    def redo(self) -> bool:
+        if not self._redo_stack:
+            return False
+        self._redo_stack[-1].apply(self.state)
+        self._update_indexes(self._redo_stack[-1], applied=True)
+        self._undo_stack.append(self._redo_stack.pop())
+        self._log({"op": "redo"})
+        return True
+
+    def replay(self, log_path: Path) -> None:
+        # Applies a log on top of the state it was started from and continues to write to it.
+        self.clear()
+        with open(log_path, "r") as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["op"] == "undo":
+                    self.undo()
+                elif entry["op"] == "redo":
+                    self.redo()
+                else:
+                    self.record(Operation.from_dict(entry))
+        self.log_path = log_path
+
+    def add_student(self, student: Student) -> None:
+        self.record(AddStudent(copy.deepcopy(student), len(self.state.students)))
+
+    def remove_student_by_id(self, student_id: ID) -> None:
+        for index, student in enumerate(self.state.students):
+            if student.id == student_id:
+                self.record(RemoveStudent(student, index))
+                return
+
+    def edit_student(self, student: Student, **changes: Any) -> None:
+        self.record(EditStudent(copy.deepcopy(student), copy.deepcopy(replace(student, **changes))))
+
+    def add_activity(self, activity: Activity) -> None:
+        self.record(AddActivity(copy.deepcopy(activity), len(self.state.activities), self.state.assignment))
+
+    def remove_activity_by_id(self, activity_id: ID) -> None:
+        for index, activity in enumerate(self.state.activities):
+            if activity.id == activity_id:
+                preferences = {
+                    student.id: student.preferences[activity_id]
+                    for student in self.state.students
+                    if activity_id in student.preferences
+                }
+                self.record(RemoveActivity(activity, index, self.state.assignment, preferences))
+                return
+
+    def edit_activity(self, activity: Activity, **changes: Any) -> None:
+        self.record(EditActivity(copy.deepcopy(activity), copy.deepcopy(replace(activity, **changes))))
+
+    def split_activity(self, activity: Activity) -> Activity:
+        # The split runs on copies; the journal then records the renaming, the copied preferences and the twin.
+        renamed = copy.deepcopy(activity)
+        choosers = [copy.deepcopy(student) for student in self.state.students if activity.id in student.preferences]
+        twin = split_activity(renamed, choosers)
+        with self.group():
+            self.edit_activity(activity, name=renamed.name)
+            for chooser in choosers:
+                self.edit_student(_find(self.state.students, chooser.id), preferences=chooser.preferences)
+            self.add_activity(twin)
+        return twin
+
+    def assign_student_to_activity_by_id(self, student_id: ID, activity_id: ID) -> None:
+        assignment = self.state.assignment
+        if assignment.student_known(student_id) and activity_id in assignment.get_activities_for_student(student_id):
+            return
+        self.record(Assign(student_id, activity_id))
+
+    def remove_student_from_activity_by_id(self, student_id: ID, activity_id: ID) -> None:
+        self.record(Unassign(student_id, activity_id))
+
+    def set_assignment(self, assignment: Assignment) -> None:
+        self.record(SetAssignment(self.state.assignment, assignment))
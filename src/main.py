@@ -1,5 +1,14 @@
-from gui import run
-
+import sys
+from multiprocessing import freeze_support
 
 if __name__ == "__main__":
+    freeze_support()
+    # With arguments the command line interface runs; it never imports the GUI.
+    if len(sys.argv) > 1:
+        from cli import main
+
+        sys.exit(main())
+
+    from gui import run
+
     run()
@@ -0,0 +1,429 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+
+from activity import Activity, get_overlap_cliques
+from id_generator import ID
+from presolve import Reductions
+from student import Student
+
+NO_COURSE_PENALTY = 1000
+STRUCTURE_FIELDS = (
+    "student_ids",
+    "activity_ids",
+    "pair_students",
+    "pair_activities",
+    "objective",
+    "row_indices",
+    "col_indices",
+    "coefficients",
+    "row_lower",
+    "row_upper",
+)
+
+
+@dataclass
+class AssignmentModel:
+    # Columns are one binary per valid (student, activity) pair followed by one no-course penalty per student.
+    # Constraints are stored as a COO matrix with lower and upper row bounds; the objective is maximized. The first
+    # n_capacity_rows rows are the capacity rows of the activities, every other row belongs to a single student.
+    student_ids: np.ndarray
+    activity_ids: np.ndarray
+    pair_students: np.ndarray
+    pair_activities: np.ndarray
+    objective: np.ndarray
+    col_lower: np.ndarray
+    col_upper: np.ndarray
+    row_indices: np.ndarray
+    col_indices: np.ndarray
+    coefficients: np.ndarray
+    row_lower: np.ndarray
+    row_upper: np.ndarray
+    n_capacity_rows: int
+
+    @property
+    def n_pairs(self) -> int:
+        return len(self.pair_students)
+
+    @property
+    def n_columns(self) -> int:
+        return len(self.objective)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.row_lower)
+
+    def assigned_pairs(self, values: np.ndarray) -> list[tuple[ID, ID]]:
+        chosen = np.flatnonzero(values[: self.n_pairs] > 0.5)
+        return list(
+            zip(
+                self.student_ids[self.pair_students[chosen]].tolist(),
+                self.activity_ids[self.pair_activities[chosen]].tolist(),
+            )
+        )
+
+    def values_from_pairs(self, pairs: set[tuple[ID, ID]]) -> np.ndarray:
+        student_ids = self.student_ids[self.pair_students].tolist()
+        activity_ids = self.activity_ids[self.pair_activities].tolist()
+        values = np.zeros(self.n_columns)
+        values[: self.n_pairs] = [pair in pairs for pair in zip(student_ids, activity_ids)]
+        values[self.n_pairs :] = np.bincount(self.pair_students, values[: self.n_pairs], len(self.student_ids)) == 0
+        return values
+
+    def with_own_bounds(self) -> AssignmentModel:
+        # A copy that shares everything but the column bounds, e.g. to fix students without touching a kept model.
+        return replace(self, col_lower=self.col_lower.copy(), col_upper=self.col_upper.copy())
+
+    def same_structure(self, other: AssignmentModel) -> bool:
+        # True if one model was derived from the other by with_own_bounds, so only the column bounds can differ.
+        return all(getattr(self, name) is getattr(other, name) for name in STRUCTURE_FIELDS)
+
+    def fix_students(self, values: np.ndarray, student_ids: set[ID]) -> None:
+        fixed = np.isin(self.student_ids[self.pair_students], list(student_ids))
+        self.col_lower[: self.n_pairs][fixed] = values[: self.n_pairs][fixed]
+        self.col_upper[: self.n_pairs][fixed] = values[: self.n_pairs][fixed]
+
+
+def build_model(
+    students: list[Student], activities: list[Activity], reductions: Reductions | None = None
+) -> AssignmentModel:
+    return _add_capacity_rows(_build_student_rows(students, activities, reductions), activities)
+
+
+def replace_students(
+    model: AssignmentModel,
+    student_ids: set[ID],
+    students: list[Student],
+    activities: list[Activity],
+    reductions: Reductions | None = None,
+) -> AssignmentModel:
+    # Drops the columns and rows of the given student IDs and adds those of the given students instead, which are the
+    # current versions of the ones that still exist. Only the capacity rows are assembled again for all pairs, since
+    # an activity's row spans every student. The activities have to be the ones of the model, in the same order,
+    # possibly with other capacities. Up to the order of students, columns and rows the result is the model that
+    # build_model returns for all students.
+    assert [activity.id for activity in activities] == model.activity_ids.tolist()
+    added = _build_student_rows(students, activities, reductions)
+    kept = ~np.isin(model.student_ids, np.fromiter(student_ids, dtype=np.int64, count=len(student_ids)))
+    n_kept = int(kept.sum())
+    kept_pairs = np.flatnonzero(kept[model.pair_students])
+    n_pairs = len(kept_pairs) + added.n_pairs
+
+    column_map = np.full(model.n_columns, -1)
+    column_map[kept_pairs] = np.arange(len(kept_pairs))
+    column_map[model.n_pairs + np.flatnonzero(kept)] = n_pairs + np.arange(n_kept)
+    added_column_map = np.concatenate(
+        [len(kept_pairs) + np.arange(added.n_pairs), n_pairs + n_kept + np.arange(len(added.student_ids))]
+    )
+
+    # A student row is kept with its student; the capacity rows come first and are left out.
+    entry_mask = (model.row_indices >= model.n_capacity_rows) & (column_map[model.col_indices] >= 0)
+    row_mask = np.zeros(model.n_rows, dtype=bool)
+    row_mask[model.row_indices[entry_mask]] = True
+    row_map = np.cumsum(row_mask) - 1
+    n_kept_rows = int(row_mask.sum())
+
+    kept_columns = np.concatenate([kept_pairs, model.n_pairs + np.flatnonzero(kept)])
+    pair_columns = slice(None, len(kept_pairs)), slice(None, added.n_pairs)
+    penalty_columns = slice(len(kept_pairs), None), slice(added.n_pairs, None)
+
+    def columns(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+        old = old[kept_columns]
+        return np.concatenate(
+            [old[pair_columns[0]], new[pair_columns[1]], old[penalty_columns[0]], new[penalty_columns[1]]]
+        )
+
+    return _add_capacity_rows(
+        AssignmentModel(
+            student_ids=np.concatenate([model.student_ids[kept], added.student_ids]),
+            activity_ids=model.activity_ids,
+            pair_students=np.concatenate(
+                [(np.cumsum(kept) - 1)[model.pair_students[kept_pairs]], n_kept + added.pair_students]
+            ),
+            pair_activities=np.concatenate([model.pair_activities[kept_pairs], added.pair_activities]),
+            objective=columns(model.objective, added.objective),
+            col_lower=columns(model.col_lower, added.col_lower),
+            col_upper=columns(model.col_upper, added.col_upper),
+            row_indices=np.concatenate([row_map[model.row_indices[entry_mask]], n_kept_rows + added.row_indices]),
+            col_indices=np.concatenate(
+                [column_map[model.col_indices[entry_mask]], added_column_map[added.col_indices]]
+            ),
+            coefficients=np.concatenate([model.coefficients[entry_mask], added.coefficients]),
+            row_lower=np.concatenate([model.row_lower[row_mask], added.row_lower]),
+            row_upper=np.concatenate([model.row_upper[row_mask], added.row_upper]),
+            n_capacity_rows=0,
+        ),
+        activities,
+    )
+
+
+def _build_student_rows(
+    students: list[Student], activities: list[Activity], reductions: Reductions | None
+) -> AssignmentModel:
+    # All columns and the rows of each student, without the capacity rows.
+    n_students = len(students)
+    n_activities = len(activities)
+
+    student_ids = np.fromiter((student.id for student in students), dtype=np.int64, count=n_students)
+    activity_ids = np.fromiter((activity.id for activity in activities), dtype=np.int64, count=n_activities)
+    grades = np.fromiter((student.grade for student in students), dtype=np.int64, count=n_students)
+    valid_grades = np.array([activity.valid_grades for activity in activities], dtype=bool).reshape(n_activities, 4)
+
+    n_preferences = np.fromiter((len(student.preferences) for student in students), dtype=np.int64, count=n_students)
+    total_preferences = int(n_preferences.sum())
+    preference_activity_ids = np.fromiter(
+        chain.from_iterable(student.preferences.keys() for student in students), dtype=np.int64, count=total_preferences
+    )
+    preference_values = np.fromiter(
+        chain.from_iterable(student.preferences.values() for student in students), dtype=float, count=total_preferences
+    )
+    preference_students = np.repeat(np.arange(n_students), n_preferences)
+
+    activity_order = np.argsort(activity_ids)
+    preference_activities = activity_order[np.searchsorted(activity_ids[activity_order], preference_activity_ids)]
+
+    valid = valid_grades[preference_activities, grades[preference_students] - 1]
+    if reductions is not None and reductions.removed_pairs:
+        valid &= np.fromiter(
+            (
+                pair not in reductions.removed_pairs
+                for pair in zip(student_ids[preference_students].tolist(), preference_activity_ids.tolist())
+            ),
+            dtype=bool,
+            count=len(valid),
+        )
+    pair_students = preference_students[valid]
+    pair_activities = preference_activities[valid]
+    pair_weights = 10 - preference_values[valid]
+    n_pairs = len(pair_students)
+    pair_indices = np.arange(n_pairs)
+
+    fixed = np.zeros(n_pairs, dtype=bool)
+    if reductions is not None and reductions.fixed_pairs:
+        fixed[:] = np.fromiter(
+            (
+                pair in reductions.fixed_pairs
+                for pair in zip(student_ids[pair_students].tolist(), activity_ids[pair_activities].tolist())
+            ),
+            dtype=bool,
+            count=n_pairs,
+        )
+    # Students with a fixed course can never pay the no-course penalty, so they need no cover row.
+    settled = np.bincount(pair_students[fixed], minlength=n_students) > 0
+
+    row_blocks = []
+    col_blocks = []
+    lower_blocks = []
+    upper_blocks = []
+    n_rows = 0
+
+    def add_rows(rows: np.ndarray, cols: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> None:
+        nonlocal n_rows
+        row_blocks.append(rows + n_rows)
+        col_blocks.append(cols)
+        lower_blocks.append(lower)
+        upper_blocks.append(upper)
+        n_rows += len(lower)
+
+    # Every student gets a course or pays the no-course penalty.
+    has_cover_row = ~settled
+    row_of_student = np.cumsum(has_cover_row) - 1
+    in_row = has_cover_row[pair_students]
+    add_rows(
+        np.concatenate([row_of_student[pair_students[in_row]], row_of_student[has_cover_row]]),
+        np.concatenate([pair_indices[in_row], n_pairs + np.flatnonzero(has_cover_row)]),
+        np.ones(int(has_cover_row.sum())),
+        np.full(int(has_cover_row.sum()), np.inf),
+    )
+
+    # One at-most-one row per student and overlap clique, restricted to the courses the student chose.
+    activity_index = {activity_id: idx for idx, activity_id in enumerate(activity_ids.tolist())}
+    cliques = get_overlap_cliques(activities)
+    clique_sizes = np.fromiter((len(clique) for clique in cliques), dtype=np.int64, count=len(cliques))
+    member_cliques = np.repeat(np.arange(len(cliques)), clique_sizes)
+    member_activities = np.fromiter(
+        (activity_index[activity_id] for clique in cliques for activity_id in clique),
+        dtype=np.int64,
+        count=int(clique_sizes.sum()),
+    )
+    member_order = np.argsort(member_activities, kind="stable")
+    member_cliques = member_cliques[member_order]
+    cliques_per_activity = np.bincount(member_activities, minlength=n_activities)
+    first_member = np.cumsum(cliques_per_activity) - cliques_per_activity
+
+    repeats = cliques_per_activity[pair_activities]
+    expanded_pairs = np.repeat(pair_indices, repeats)
+    offsets = np.arange(len(expanded_pairs)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    expanded_cliques = member_cliques[np.repeat(first_member[pair_activities], repeats) + offsets]
+
+    keys = pair_students[expanded_pairs] * max(len(cliques), 1) + expanded_cliques
+    _, key_rows, key_counts = np.unique(keys, return_inverse=True, return_counts=True)
+    is_row = key_counts > 1
+    row_of_key = np.cumsum(is_row) - 1
+    in_row = is_row[key_rows]
+    n_clique_rows = int(is_row.sum())
+    add_rows(
+        row_of_key[key_rows[in_row]],
+        expanded_pairs[in_row],
+        np.full(n_clique_rows, -np.inf),
+        np.ones(n_clique_rows),
+    )
+
+    row_indices = np.concatenate(row_blocks)
+    return AssignmentModel(
+        student_ids=student_ids,
+        activity_ids=activity_ids,
+        pair_students=pair_students,
+        pair_activities=pair_activities,
+        objective=np.concatenate([pair_weights, np.full(n_students, -NO_COURSE_PENALTY, dtype=float)]),
+        col_lower=np.concatenate([fixed.astype(float), np.zeros(n_students)]),
+        col_upper=np.concatenate([np.ones(n_pairs), np.where(settled, 0.0, np.inf)]),
+        row_indices=row_indices,
+        col_indices=np.concatenate(col_blocks),
+        coefficients=np.ones(len(row_indices)),
+        row_lower=np.concatenate(lower_blocks),
+        row_upper=np.concatenate(upper_blocks),
+        n_capacity_rows=0,
+    )
+
+
+def _add_capacity_rows(model: AssignmentModel, activities: list[Activity]) -> AssignmentModel:
+    # Puts the capacity rows in front of the student rows of a model that has none yet. Maxima that can never bind
+    # are skipped; an unreachable minimum is kept so infeasibility shows.
+    n_activities = len(activities)
+    min_capacities = np.fromiter((activity.min_capacity for activity in activities), dtype=float, count=n_activities)
+    max_capacities = np.fromiter((activity.max_capacity for activity in activities), dtype=float, count=n_activities)
+    pair_indices = np.arange(model.n_pairs)
+
+    row_blocks = []
+    col_blocks = []
+    lower_blocks = []
+    upper_blocks = []
+    n_rows = 0
+    candidate_counts = np.bincount(model.pair_activities, minlength=n_activities)
+    for has_row, lower, upper in (
+        (max_capacities < candidate_counts, np.full(n_activities, -np.inf), max_capacities),
+        (min_capacities > 0, min_capacities, np.full(n_activities, np.inf)),
+    ):
+        row_of_activity = np.cumsum(has_row) - 1
+        in_row = has_row[model.pair_activities]
+        row_blocks.append(n_rows + row_of_activity[model.pair_activities[in_row]])
+        col_blocks.append(pair_indices[in_row])
+        lower_blocks.append(lower[has_row])
+        upper_blocks.append(upper[has_row])
+        n_rows += int(has_row.sum())
+
+    row_indices = np.concatenate(row_blocks + [n_rows + model.row_indices])
+    return replace(
+        model,
+        row_indices=row_indices,
+        col_indices=np.concatenate(col_blocks + [model.col_indices]),
+        coefficients=np.ones(len(row_indices)),
+        row_lower=np.concatenate(lower_blocks + [model.row_lower]),
+        row_upper=np.concatenate(upper_blocks + [model.row_upper]),
+        n_capacity_rows=n_rows,
+    )
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _mps_line(kind: str, name: str, entry: str, value: float | None = None) -> str:
+    line = f" {kind:<2} {name:<8}  {entry:<8}"
+    return line if value is None else f"{line}  {_format_number(value):>12}"
+
+
+def write_mps(model: AssignmentModel, path: Path) -> None:
+    with open(path, "w") as f:
+        f.write(mps_structure(model))
+        f.write(mps_bounds(model))
+
+
+def mps_structure(model: AssignmentModel) -> str:
+    # Everything up to the BOUNDS section, which stays the same for models that only differ in their column bounds.
+    # MPS minimizes, so the objective is written negated.
+    row_lower = model.row_lower
+    row_upper = model.row_upper
+    has_lower = np.isfinite(row_lower)
+    has_upper = np.isfinite(row_upper)
+    senses = np.where(~has_lower, "L", np.where(~has_upper | (row_lower != row_upper), "G", "E"))
+    rhs = np.where(has_lower, row_lower, row_upper)
+    is_ranged = has_lower & has_upper & (row_lower != row_upper)
+
+    objective_cols = np.flatnonzero(model.objective)
+    entry_cols = np.concatenate([objective_cols, model.col_indices])
+    entry_rows = np.concatenate([np.full(len(objective_cols), -1), model.row_indices])
+    entry_values = np.concatenate([-model.objective[objective_cols], model.coefficients])
+    order = np.argsort(entry_cols, kind="stable")
+
+    lines = ["NAME          StudentActivityAssignment", "ROWS", " N  OBJ"]
+    lines.extend(f" {sense}  R{row}" for row, sense in enumerate(senses.tolist()))
+    lines.append("COLUMNS")
+    lines.append("    MARKER                 'MARKER'                 'INTORG'")
+    lines.extend(
+        _mps_line("", f"C{col}", "OBJ" if row < 0 else f"R{row}", value)
+        for col, row, value in zip(entry_cols[order].tolist(), entry_rows[order].tolist(), entry_values[order].tolist())
+    )
+    lines.append("    MARKER                 'MARKER'                 'INTEND'")
+    lines.append("RHS")
+    lines.extend(_mps_line("", "RHS", f"R{row}", value) for row, value in enumerate(rhs.tolist()) if value != 0)
+    if is_ranged.any():
+        lines.append("RANGES")
+        lines.extend(
+            _mps_line("", "RNG", f"R{row}", row_upper[row] - row_lower[row])
+            for row in np.flatnonzero(is_ranged).tolist()
+        )
+    return "".join(f"{line}\n" for line in lines)
+
+
+def mps_bounds(model: AssignmentModel) -> str:
+    lines = ["BOUNDS"]
+    for col, (lower, upper) in enumerate(zip(model.col_lower.tolist(), model.col_upper.tolist())):
+        if lower == upper:
+            lines.append(_mps_line("FX", "BND", f"C{col}", lower))
+            continue
+        if np.isinf(upper):
+            lines.append(_mps_line("PL", "BND", f"C{col}"))
+        else:
+            lines.append(_mps_line("UP", "BND", f"C{col}", upper))
+        if lower != 0:
+            lines.append(_mps_line("LO", "BND", f"C{col}", lower))
+    lines.append("ENDATA")
+    return "".join(f"{line}\n" for line in lines)
+
+
+def write_cbc_solution(values: np.ndarray, path: Path) -> None:
+    with open(path, "w") as f:
+        f.write("Feasible - objective value 0\n")
+        f.writelines(
+            f"{col:>7} C{col:<20} {_format_number(value):>20} 0\n" for col, value in enumerate(values.tolist())
+        )
+
+
+def _normalize_cbc_status(cbc_status: str) -> str:
+    # Map the first line of a CBC solution file to the status names used by the solver backends.
+    if cbc_status.startswith("Optimal"):
+        return "Optimal"
+    if "infeasible" in cbc_status.lower():
+        return "Infeasible"
+    if cbc_status.startswith("Unbounded"):
+        return "Unbounded"
+    if cbc_status.startswith("Stopped") and "no integer solution" not in cbc_status:
+        return "Feasible"
+    return "Not Solved"
+
+
+def read_cbc_solution(model: AssignmentModel, path: Path) -> tuple[str, np.ndarray]:
+    values = np.zeros(model.n_columns)
+    with open(path, "r") as f:
+        status = _normalize_cbc_status(f.readline().split(" - ")[0].strip())
+        # Every line holds column index, name, value and reduced cost, prefixed by ** if infeasible. CBC only lists
+        # the nonzero columns, which are converted in bulk and scattered into the dense vector.
+        tokens = f.read().replace("**", "").split()
+    values[np.array(tokens[0::4], dtype=np.int64)] = np.array(tokens[2::4], dtype=float)
+    return status, values
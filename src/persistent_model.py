@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from threading import Lock
+
+from activity import Activity, get_activity_id_map, get_overlap_cliques
+from id_generator import ID
+from model import AssignmentModel, build_model, replace_students
+from presolve import PresolveIndex, Reductions
+from solver import SolverBackend, SolveStats, get_backend
+from student import Student
+from symmetry import (
+    Aggregation,
+    aggregate_activities,
+    aggregate_groups,
+    aggregate_student,
+    group_interchangeable,
+    interchangeability_key,
+    merged_activities,
+)
+
+
+@dataclass
+class PreparedModel:
+    # What solve_assignment needs from the aggregation, presolve and build_model steps. students and activities are
+    # the aggregated ones if aggregation is not None.
+    aggregation: Aggregation | None
+    students: list[Student]
+    activities: list[Activity]
+    reductions: Reductions
+    model: AssignmentModel
+
+
+@dataclass
+class ModelChanges:
+    students: set[ID]
+    activities: set[ID]
+    rebuild: bool = False
+
+    def is_empty(self) -> bool:
+        return not self.students and not self.activities and not self.rebuild
+
+
+class PersistentModel:
+    # Keeps the model of an editing session between solves, together with one solver backend per name. The Journal
+    # notes which students and activities each edit touched. The next prepare then only builds the columns and rows of
+    # the touched students anew and keeps the arrays of all others; without any edit in between, e.g. after moving
+    # students by hand, the model and the backend's copy of it are reused as they are. Adding or removing an activity,
+    # a change of the overlaps, or a change of the interchangeable groups still builds everything anew.
+    # Edits are noted from the GUI thread while a solve may run. checkout is called when the students and activities
+    # for a solve are copied; prepare only applies the edits checked out until then. Not meant for concurrent solves.
+    def __init__(self) -> None:
+        self._backends: dict[str, SolverBackend] = {}
+        self._lock = Lock()
+        self._pending = ModelChanges(set(), set())
+        self._checked_out = ModelChanges(set(), set())
+        self._reset()
+
+    def _reset(self) -> None:
+        self._prepared: PreparedModel | None = None
+        self._aggregate = False
+        self._activity_ids: list[ID] = []
+        # The preferences by student and the choices by activity, both of the students as given to prepare.
+        self._preferences: dict[ID, dict[ID, int]] = {}
+        self._choices: defaultdict[ID, dict[ID, int]] = defaultdict(dict)
+        self._keys: dict[ID, tuple | None] = {}
+        self._cliques: set[frozenset[ID]] = set()
+        # The students of the model, aggregated if there are interchangeable activities.
+        self._students: dict[ID, Student] = {}
+        self._presolve = PresolveIndex()
+
+    def backend(self, name: str) -> SolverBackend:
+        if name not in self._backends:
+            self._backends[name] = get_backend(name)
+        return self._backends[name]
+
+    def students_changed(self, student_ids: set[ID]) -> None:
+        # Added, removed or edited students.
+        with self._lock:
+            self._pending.students.update(student_ids)
+
+    def activities_changed(self, activity_ids: set[ID]) -> None:
+        # Edited activities; added or removed ones need invalidate.
+        with self._lock:
+            self._pending.activities.update(activity_ids)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._pending.rebuild = True
+
+    def checkout(self) -> PersistentModel:
+        with self._lock:
+            checked_out, pending = self._checked_out, self._pending
+            checked_out.students.update(pending.students)
+            checked_out.activities.update(pending.activities)
+            checked_out.rebuild |= pending.rebuild
+            self._pending = ModelChanges(set(), set())
+        return self
+
+    def prepare(
+        self, students: list[Student], activities: list[Activity], aggregate: bool, stats: SolveStats
+    ) -> PreparedModel:
+        # Raises the exceptions of presolve; the next prepare then builds everything anew.
+        with self._lock:
+            changes, self._checked_out = self._checked_out, ModelChanges(set(), set())
+        try:
+            previous = self._prepared
+            activity_ids = [activity.id for activity in activities]
+            unnoted = {student.id for student in students} ^ self._preferences.keys()
+            if (
+                previous is None
+                or changes.rebuild
+                or aggregate != self._aggregate
+                or activity_ids != self._activity_ids
+                or not unnoted <= changes.students
+            ):
+                return self._build(students, activities, aggregate, stats)
+            if changes.is_empty():
+                return previous
+            with stats.phase("patch_model"):
+                prepared = self._patch(students, activities, changes)
+            return prepared or self._build(students, activities, aggregate, stats)
+        except BaseException:
+            self._reset()
+            raise
+
+    def _build(
+        self, students: list[Student], activities: list[Activity], aggregate: bool, stats: SolveStats
+    ) -> PreparedModel:
+        self._reset()
+        self._aggregate = aggregate
+        self._activity_ids = [activity.id for activity in activities]
+        for student in students:
+            self._preferences[student.id] = dict(student.preferences)
+            for activity_id, preference in student.preferences.items():
+                self._choices[activity_id][student.id] = preference
+
+        groups = []
+        if aggregate:
+            with stats.phase("symmetry"):
+                self._keys = {
+                    activity.id: interchangeability_key(activity, list(self._choices[activity.id].items()))
+                    for activity in activities
+                }
+                groups = group_interchangeable(activities, self._keys)
+        aggregation = aggregate_groups(students, activities, groups)
+        if aggregation is not None:
+            students, activities = aggregation.students, aggregation.activities
+        self._students = {student.id: student for student in students}
+        self._cliques = set(map(frozenset, get_overlap_cliques(activities)))
+
+        with stats.phase("presolve"):
+            self._presolve.update(students, activities, set(self._students))
+        with stats.phase("build_model"):
+            model = build_model(students, activities, self._presolve.reductions)
+        self._prepared = PreparedModel(aggregation, students, activities, self._presolve.reductions, model)
+        return self._prepared
+
+    def _patch(
+        self, students: list[Student], activities: list[Activity], changes: ModelChanges
+    ) -> PreparedModel | None:
+        # None if the edits need a full build.
+        previous = self._prepared
+        student_map = {student.id: student for student in students}
+        touched = set(changes.activities)
+        dirty = set(changes.students)
+        for activity_id in changes.activities:
+            dirty.update(self._choices[activity_id])
+        for student_id in changes.students:
+            for activity_id in self._preferences.pop(student_id, {}):
+                del self._choices[activity_id][student_id]
+                touched.add(activity_id)
+            if student_id in student_map:
+                self._preferences[student_id] = dict(student_map[student_id].preferences)
+                for activity_id, preference in self._preferences[student_id].items():
+                    self._choices[activity_id][student_id] = preference
+                    touched.add(activity_id)
+
+        groups = []
+        if self._aggregate:
+            activity_map = get_activity_id_map(activities)
+            for activity_id in touched:
+                self._keys[activity_id] = interchangeability_key(
+                    activity_map[activity_id], list(self._choices[activity_id].items())
+                )
+            groups = group_interchangeable(activities, self._keys)
+        previous_groups = [] if previous.aggregation is None else previous.aggregation.groups
+        if [[activity.id for activity in group] for group in groups] != [
+            [activity.id for activity in group] for group in previous_groups
+        ]:
+            return None
+
+        if groups:
+            activities = aggregate_activities(activities, groups)
+        if changes.activities and set(map(frozenset, get_overlap_cliques(activities))) != self._cliques:
+            return None
+
+        merged = merged_activities(groups)
+        for student_id in dirty:
+            self._students.pop(student_id, None)
+            if student_id in student_map:
+                student = student_map[student_id]
+                self._students[student_id] = aggregate_student(student, merged) if groups else student
+        dirty_students = [self._students[student_id] for student_id in dirty if student_id in self._students]
+        # Students that gain or lose a course through the guarantees of others are built anew as well.
+        dirty |= self._presolve.update(dirty_students, activities, dirty)
+
+        students = list(self._students.values())
+        model = replace_students(
+            previous.model,
+            dirty,
+            [self._students[student_id] for student_id in dirty if student_id in self._students],
+            activities,
+            self._presolve.reductions,
+        )
+        aggregation = Aggregation(students, activities, groups) if groups else None
+        self._prepared = PreparedModel(aggregation, students, activities, self._presolve.reductions, model)
+        return self._prepared
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from itertools import combinations
+
+from activity import Activity, get_activity_id_map
+from id_generator import ID
+from student import GUARANTEED_PREFERENCE, Student
+
+
+class InfeasibleInput(Exception):
+    pass
+
+
+class GuaranteedActivitiesOverlap(InfeasibleInput):
+    def __init__(self, student: Student, activity_0: Activity, activity_1: Activity):
+        super().__init__(
+            f"Die garantierten Kurse {activity_0.name} und {activity_1.name} von Kind {student.name} überschneiden "
+            "sich zeitlich."
+        )
+
+
+class GuaranteedCapacityExceeded(InfeasibleInput):
+    def __init__(self, activity: Activity, guaranteed_count: int):
+        super().__init__(
+            f"Kurs {activity.name} ist {guaranteed_count} Kindern garantiert, hat aber nur {activity.max_capacity} "
+            "Plätze."
+        )
+
+
+class MinimumCapacityUnreachable(InfeasibleInput):
+    def __init__(self, activity: Activity, candidate_count: int):
+        super().__init__(
+            f"Kurs {activity.name} braucht mindestens {activity.min_capacity} Kinder, aber nur {candidate_count} "
+            "können ihm zugeteilt werden."
+        )
+
+
+@dataclass
+class Reductions:
+    fixed_pairs: set[tuple[ID, ID]] = field(default_factory=set)
+    removed_pairs: set[tuple[ID, ID]] = field(default_factory=set)
+
+
+def presolve(students: list[Student], activities: list[Activity]) -> Reductions:
+    # Guaranteed courses are fixed, courses overlapping them are dropped for that student, and courses whose seats
+    # are all taken by guarantees are dropped for everyone else. What is left is checked against the capacities.
+    index = PresolveIndex()
+    index.update(students, activities, {student.id for student in students})
+    return index.reductions
+
+
+def _reduce_student(student: Student, activity_map: dict[ID, Activity]) -> tuple[list[ID], list[ID], list[ID]]:
+    # The fixed, the dropped and the remaining candidate courses of one student.
+    chosen = [
+        activity_map[activity_id]
+        for activity_id in student.preferences
+        if activity_map[activity_id].is_valid_grade(student.grade)
+    ]
+    guaranteed = [activity for activity in chosen if student.preferences[activity.id] == GUARANTEED_PREFERENCE]
+    for activity_0, activity_1 in combinations(guaranteed, 2):
+        if Activity.overlap(activity_0, activity_1):
+            raise GuaranteedActivitiesOverlap(student, activity_0, activity_1)
+
+    fixed, removed, candidates = [], [], []
+    for activity in chosen:
+        if activity in guaranteed:
+            fixed.append(activity.id)
+        elif any(Activity.overlap(activity, guaranteed_activity) for guaranteed_activity in guaranteed):
+            removed.append(activity.id)
+        else:
+            candidates.append(activity.id)
+    return fixed, removed, candidates
+
+
+class PresolveIndex:
+    # The result of presolve, kept up to date while students and capacities change. Only the changed students are
+    # reduced again; the check of the capacities then only works on counts per course. Students that lose or regain a
+    # course because its seats were taken by guarantees or freed again are reported by update, since their pairs
+    # change as well. After an exception the index is out of date and has to be dropped.
+    def __init__(self) -> None:
+        self.reductions = Reductions()
+        self._students: dict[ID, tuple[list[ID], list[ID], list[ID]]] = {}
+        self._candidates: defaultdict[ID, set[ID]] = defaultdict(set)
+        self._guaranteed_counts: Counter[ID] = Counter()
+        self._full: set[ID] = set()
+
+    def update(self, students: list[Student], activities: list[Activity], student_ids: set[ID]) -> set[ID]:
+        # student_ids are all changed students, students the current versions of those that still exist.
+        fixed_pairs, removed_pairs = self.reductions.fixed_pairs, self.reductions.removed_pairs
+        for student_id in student_ids:
+            if student_id not in self._students:
+                continue
+            fixed, removed, candidates = self._students.pop(student_id)
+            fixed_pairs.difference_update((student_id, activity_id) for activity_id in fixed)
+            self._guaranteed_counts.subtract(fixed)
+            removed_pairs.difference_update((student_id, activity_id) for activity_id in removed)
+            for activity_id in candidates:
+                self._candidates[activity_id].discard(student_id)
+                removed_pairs.discard((student_id, activity_id))
+
+        activity_map = get_activity_id_map(activities)
+        for student in students:
+            fixed, removed, candidates = self._students[student.id] = _reduce_student(student, activity_map)
+            fixed_pairs.update((student.id, activity_id) for activity_id in fixed)
+            self._guaranteed_counts.update(fixed)
+            removed_pairs.update((student.id, activity_id) for activity_id in removed)
+            for activity_id in candidates:
+                self._candidates[activity_id].add(student.id)
+                if activity_id in self._full:
+                    removed_pairs.add((student.id, activity_id))
+
+        full = set()
+        for activity in activities:
+            guaranteed_count = self._guaranteed_counts[activity.id]
+            if guaranteed_count > activity.max_capacity:
+                raise GuaranteedCapacityExceeded(activity, guaranteed_count)
+            if guaranteed_count == activity.max_capacity:
+                full.add(activity.id)
+            candidate_count = guaranteed_count + (0 if activity.id in full else len(self._candidates[activity.id]))
+            if candidate_count < activity.min_capacity:
+                raise MinimumCapacityUnreachable(activity, candidate_count)
+
+        changed = set()
+        for activity_id in full ^ self._full:
+            candidates = self._candidates[activity_id]
+            pairs = {(student_id, activity_id) for student_id in candidates}
+            if activity_id in full:
+                removed_pairs.update(pairs)
+            else:
+                removed_pairs.difference_update(pairs)
+            changed.update(candidates)
+        self._full = full
+        return changed - student_ids
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import copy
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from dataclasses_json import dataclass_json
+
+from activity import Activity, ActivityIDGenerator, split_activity
+from assignment import solve_assignment
+from id_generator import ID
+from presolve import InfeasibleInput
+from solver import SolverSettings
+from student import GUARANTEED_PREFERENCE, Student
+
+
+class UnknownScenarioActivity(Exception):
+    def __init__(self, scenario_name: str, activity_id: ID):
+        super().__init__(f"Szenario {scenario_name}: Kurs mit ID {activity_id} existiert nicht.")
+
+
+@dataclass_json
+@dataclass
+class Scenario:
+    # A variation of the base plan. Changes are applied in field order: removals, capacities, splits.
+    name: str
+    removed_activities: list[ID] = field(default_factory=list)
+    min_capacities: dict[ID, int] = field(default_factory=dict)
+    max_capacities: dict[ID, int] = field(default_factory=dict)
+    split_activities: list[ID] = field(default_factory=list)
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    status: str
+    objective: float | None = None
+    unassigned: int | None = None
+    # Number of assigned courses per preference the students gave them.
+    preference_counts: dict[int, int] = field(default_factory=dict)
+    error: str | None = None
+
+
+def _referenced_activities(scenario: Scenario) -> list[ID]:
+    return [
+        *scenario.removed_activities,
+        *scenario.min_capacities,
+        *scenario.max_capacities,
+        *scenario.split_activities,
+    ]
+
+
+def apply_scenario(
+    scenario: Scenario, students: list[Student], activities: list[Activity]
+) -> tuple[list[Student], list[Activity]]:
+    students = copy.deepcopy(students)
+    activities = copy.deepcopy(activities)
+    known_ids = {activity.id for activity in activities}
+    for activity_id in _referenced_activities(scenario):
+        if activity_id not in known_ids:
+            raise UnknownScenarioActivity(scenario.name, activity_id)
+
+    removed = set(scenario.removed_activities)
+    activities = [activity for activity in activities if activity.id not in removed]
+    for student in students:
+        student.preferences = {
+            activity_id: preference
+            for activity_id, preference in student.preferences.items()
+            if activity_id not in removed
+        }
+
+    for activity in activities:
+        activity.min_capacity = scenario.min_capacities.get(activity.id, activity.min_capacity)
+        activity.max_capacity = scenario.max_capacities.get(activity.id, activity.max_capacity)
+
+    # Splits may run in a fresh worker process, so new IDs must not collide with the copied ones. The generator is
+    # shared with the caller when the scenario runs in its process, so its position is restored afterwards.
+    id_generator = ActivityIDGenerator()
+    next_id = id_generator.get_current_id()
+    id_generator.reset(max(known_ids, default=0) + 1)
+    try:
+        for activity in [activity for activity in activities if activity.id in scenario.split_activities]:
+            activities.append(split_activity(activity, students))
+    finally:
+        id_generator.reset(next_id)
+    return students, activities
+
+
+def solve_scenario(
+    scenario: Scenario, students: list[Student], activities: list[Activity], settings: SolverSettings
+) -> ScenarioResult:
+    try:
+        students, activities = apply_scenario(scenario, students, activities)
+        result = solve_assignment(students, activities, settings)
+    except (InfeasibleInput, UnknownScenarioActivity) as e:
+        return ScenarioResult(scenario.name, "Infeasible", error=str(e))
+
+    preference_counts = Counter(
+        student.preferences[activity_id]
+        for student in students
+        if result.assignment.student_known(student.id)
+        for activity_id in result.assignment.get_activities_for_student(student.id)
+    )
+    unassigned = sum(
+        1
+        for student in students
+        if not result.assignment.student_known(student.id)
+        or not result.assignment.get_activities_for_student(student.id)
+    )
+    return ScenarioResult(scenario.name, result.status, result.objective, unassigned, dict(preference_counts))
+
+
+def run_scenarios(
+    students: list[Student],
+    activities: list[Activity],
+    scenarios: list[Scenario],
+    settings: SolverSettings | None = None,
+    max_workers: int | None = None,
+) -> list[ScenarioResult]:
+    # Scenarios are independent full solves, one per process; results come back in the order of the scenarios.
+    settings = settings or SolverSettings()
+    if max_workers == 1 or len(scenarios) <= 1:
+        return [solve_scenario(scenario, students, activities, settings) for scenario in scenarios]
+    with ProcessPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(solve_scenario, scenario, students, activities, settings) for scenario in scenarios]
+        return [future.result() for future in futures]
+
+
+def format_comparison(results: list[ScenarioResult]) -> str:
+    preferences = sorted({preference for result in results for preference in result.preference_counts})
+    header = ["Szenario", "Status", "Zielwert", "Ohne Kurs"] + [
+        "Garantiert" if preference == GUARANTEED_PREFERENCE else f"Präf. {preference}" for preference in preferences
+    ]
+    rows = [header]
+    for result in results:
+        rows.append(
+            [
+                result.name,
+                result.status,
+                "-" if result.objective is None else f"{result.objective:.0f}",
+                "-" if result.unassigned is None else str(result.unassigned),
+            ]
+            + [str(result.preference_counts.get(preference, 0)) for preference in preferences]
+        )
+    widths = [max(len(row[col]) for row in rows) for col in range(len(header))]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+    lines.extend(f"{result.name}: {result.error}" for result in results if result.error is not None)
+    return "\n".join(lines)
@@ -0,0 +1,688 @@
+from __future__ import annotations
+
+import re
+import subprocess
+import tempfile
+import time
+import warnings
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from importlib import import_module
+from pathlib import Path
+from threading import Event, Thread
+from types import ModuleType
+from typing import Callable, ContextManager, Iterator
+
+import numpy as np
+import pulp
+from dataclasses_json import dataclass_json
+
+from model import AssignmentModel, mps_bounds, mps_structure, read_cbc_solution, write_cbc_solution
+
+
+class UnknownSolverBackend(Exception):
+    def __init__(self, name: str):
+        super().__init__(f"Solver {name} ist nicht verfügbar.")
+
+
+@dataclass_json
+@dataclass
+class SolverSettings:
+    backend: str = "cbc"
+    time_limit: float | None = None
+    gap: float | None = None
+    workers: int = 1
+    flow_fast_path: bool = True
+    aggregate_interchangeable: bool = True
+    # None keeps the solver's own default: CBC and HiGHS use one thread, CP-SAT all cores.
+    threads: int | None = None
+    # Seeds start at 1, since CBC takes 0 as "seed from the time of day".
+    seed: int = 1
+    presolve: bool = True
+    cuts: str = "auto"
+
+
+# "auto" leaves the cut separators to the solver, "root" only cuts at the root node.
+CUT_STRATEGIES = ("auto", "off", "root", "aggressive")
+
+
+@dataclass
+class SolverResult:
+    status: str
+    values: np.ndarray
+    objective: float
+    bound: float | None
+    gap: float | None
+
+
+ProgressCallback = Callable[[float], None]
+
+# German names of the phases for the summary; phases without a name are shown as they are.
+PHASE_NAMES = {
+    "cache": "Zwischenspeicher",
+    "presolve": "Vorverarbeitung",
+    "build_model": "Modell",
+    "patch_model": "Modell anpassen",
+    "backend_build": "Solver-Modell",
+    "write_mps": "MPS schreiben",
+    "solver": "Solver",
+    "read_solution": "Lösung lesen",
+    "extract": "Werte auslesen",
+    "assignment": "Zuteilung",
+}
+
+
+@dataclass_json
+@dataclass
+class SolveStats:
+    # Seconds per phase in the order the phases first ran. Nested phases pause the enclosing one, so the phases add
+    # up to the total without double counting.
+    phases: dict[str, float] = field(default_factory=dict)
+    path: str = ""
+    status: str = ""
+    variables: int = 0
+    constraints: int = 0
+    nonzeros: int = 0
+
+    def __post_init__(self) -> None:
+        self._running: list[str] = []
+        self._started = 0.0
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        now = time.perf_counter()
+        if self._running:
+            self._add(self._running[-1], now - self._started)
+        self._running.append(name)
+        self._started = now
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._add(self._running.pop(), now - self._started)
+            self._started = now
+
+    def _add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{PHASE_NAMES.get(name, name)} {seconds:.2f} s" for name, seconds in self.phases.items())
+        return (
+            f"{self.total:.2f} s ({phases}); {self.variables} Variablen, {self.constraints} Nebenbedingungen, "
+            f"Weg: {self.path}"
+        )
+
+
+def relative_gap(objective: float, bound: float | None) -> float | None:
+    if bound is None:
+        return None
+    return abs(bound - objective) / max(abs(objective), 1.0)
+
+
+class SolverBackend(ABC):
+    stats: SolveStats | None = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+    def phase(self, name: str) -> ContextManager[None]:
+        # Backends time their internal steps (e.g. file I/O) with this; solve_model sets self.stats.
+        return self.stats.phase(name) if self.stats is not None else nullcontext()
+
+    @abstractmethod
+    def build(self, model: AssignmentModel) -> None: ...
+
+    @abstractmethod
+    def solve(
+        self,
+        settings: SolverSettings,
+        initial_values: np.ndarray | None = None,
+        progress_callback: ProgressCallback | None = None,
+    ) -> str: ...
+
+    @abstractmethod
+    def extract(self) -> np.ndarray: ...
+
+    def bound(self) -> float | None:
+        return None
+
+    def cancel(self) -> None:
+        # Called from another thread while solve() runs; backends that cannot be interrupted run to completion.
+        pass
+
+
+BACKENDS: dict[str, type[SolverBackend]] = {}
+
+# Not a MILP backend: solve_assignment runs the local search of heuristic.py instead of a model solve. It finds good,
+# but not necessarily optimal, plans for instances too large for the exact solvers. Every child still gets a course
+# whenever the seats allow it.
+HEURISTIC_BACKEND = "heuristic"
+
+
+def register_backend(name: str):
+    def decorator(cls: type[SolverBackend]) -> type[SolverBackend]:
+        BACKENDS[name] = cls
+        return cls
+
+    return decorator
+
+
+def available_backends(include_heuristic: bool = False) -> list[str]:
+    names = [name for name, backend in BACKENDS.items() if backend.is_available()]
+    return names + [HEURISTIC_BACKEND] if include_heuristic else names
+
+
+def get_backend(name: str) -> SolverBackend:
+    if name not in BACKENDS or not BACKENDS[name].is_available():
+        raise UnknownSolverBackend(name)
+    return BACKENDS[name]()
+
+
+def solve_model(
+    model: AssignmentModel,
+    settings: SolverSettings,
+    initial_values: np.ndarray | None = None,
+    progress_callback: ProgressCallback | None = None,
+    cancel_event: Event | None = None,
+    stats: SolveStats | None = None,
+    backend: SolverBackend | None = None,
+) -> SolverResult:
+    backend = backend or get_backend(settings.backend)
+    backend.stats = stats
+    with backend.phase("backend_build"):
+        backend.build(model)
+    if cancel_event is not None and cancel_event.is_set():
+        return SolverResult("Not Solved", np.zeros(model.n_columns), 0.0, None, None)
+    with backend.phase("solver"):
+        if cancel_event is None:
+            status = backend.solve(settings, initial_values, progress_callback)
+        else:
+            finished = Event()
+            Thread(target=_cancel_when_set, args=(backend, cancel_event, finished), daemon=True).start()
+            try:
+                status = backend.solve(settings, initial_values, progress_callback)
+            finally:
+                finished.set()
+    with backend.phase("extract"):
+        values = backend.extract()
+    objective = float(model.objective @ values)
+    bound = backend.bound()
+    if bound is None and status == "Optimal" and not settings.gap:
+        bound = objective
+    return SolverResult(status, values, objective, bound, relative_gap(objective, bound))
+
+
+def _cancel_when_set(backend: SolverBackend, cancel_event: Event, finished: Event) -> None:
+    while not finished.is_set():
+        if cancel_event.wait(0.1):
+            backend.cancel()
+            return
+
+
+def _import_optional(module_name: str) -> ModuleType | None:
+    try:
+        return import_module(module_name)
+    except ImportError:
+        return None
+
+
+def _rows(model: AssignmentModel) -> list[tuple[np.ndarray, np.ndarray]]:
+    order = np.argsort(model.row_indices, kind="stable")
+    splits = np.cumsum(np.bincount(model.row_indices, minlength=model.n_rows))[:-1]
+    return list(zip(np.split(model.col_indices[order], splits), np.split(model.coefficients[order], splits)))
+
+
+def _column_keys(model: AssignmentModel) -> np.ndarray:
+    # (student ID, activity ID) per column, -1 standing in for the activity of a penalty column.
+    keys = np.empty((model.n_columns, 2), dtype=np.int64)
+    keys[: model.n_pairs, 0] = model.student_ids[model.pair_students]
+    keys[: model.n_pairs, 1] = model.activity_ids[model.pair_activities]
+    keys[model.n_pairs :, 0] = model.student_ids
+    keys[model.n_pairs :, 1] = -1
+    return keys
+
+
+_CBC_CUTS = {"off": "off", "root": "root", "aggressive": "forceOn"}
+
+
+def _cbc_options(settings: SolverSettings) -> list[tuple[str, str]]:
+    options = [("randomSeed", str(settings.seed)), ("randomCbcSeed", str(settings.seed))]
+    if settings.threads is not None and settings.threads > 1:
+        # 100 + n makes CBC's parallel search repeatable, so a seed gives the same result with any thread count.
+        options.append(("threads", str(100 + settings.threads)))
+    if not settings.presolve:
+        options += [("presolve", "off"), ("preprocess", "off")]
+    if settings.cuts in _CBC_CUTS:
+        options.append(("cuts", _CBC_CUTS[settings.cuts]))
+    return options
+
+
+class _CbcProcessBackend(SolverBackend):
+    # CBC runs as a child process, so cancel() can kill it at any point of the search.
+    process: subprocess.Popen | None = None
+    cancelled = False
+
+    def _run_cbc(self, command: list[str]) -> Iterator[str]:
+        # Yields the lines of the CBC log. After a cancel the log just ends; callers check self.cancelled.
+        with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True) as process:
+            self.process = process
+            if self.cancelled:
+                process.kill()
+            yield from process.stdout
+        if not self.cancelled and process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        if self.process is not None:
+            self.process.kill()
+
+
+@register_backend("cbc")
+class PulpCbcBackend(_CbcProcessBackend):
+    # Building again on the same instance keeps every pulp variable and constraint that is still part of the new
+    # model and only creates the rest. Rows are identified by their content and assembled in a canonical order, so
+    # the problem handed to CBC is the same as after a fresh build.
+    def __init__(self) -> None:
+        self.model: AssignmentModel | None = None
+        self.variables: dict[str, pulp.LpVariable] = {}
+        self.rows: dict[tuple, list[list[pulp.LpConstraint]]] = {}
+
+    def build(self, model: AssignmentModel) -> None:
+        self.process = None
+        self.cancelled = False
+        if self.model is not None and model.same_structure(self.model):
+            # Only the column bounds can differ, so the constraints are kept as they are.
+            self.model = model
+            for column, lower, upper in zip(self.columns, model.col_lower.tolist(), model.col_upper.tolist()):
+                column.lowBound, column.upBound = lower, upper if np.isfinite(upper) else None
+            return
+        self.model = model
+        self.prob = pulp.LpProblem("StudentActivityAssignment", pulp.LpMaximize)
+
+        column_keys = _column_keys(model)
+        names = [
+            f"x_{student_id}_{activity_id}" if activity_id >= 0 else f"x_{student_id}_pen"
+            for student_id, activity_id in column_keys.tolist()
+        ]
+        variables = {}
+        for name, lower, upper in zip(names, model.col_lower.tolist(), model.col_upper.tolist()):
+            upper = upper if np.isfinite(upper) else None
+            variable = self.variables.get(name)
+            if variable is None:
+                variable = pulp.LpVariable(name, lower, upper, pulp.LpInteger)
+            else:
+                variable.lowBound, variable.upBound = lower, upper
+            variables[name] = variable
+        self.variables = variables
+        self.columns = [variables[name] for name in names]
+
+        order = np.lexsort((column_keys[model.col_indices, 1], column_keys[model.col_indices, 0], model.row_indices))
+        cols = model.col_indices[order]
+        coefficients = model.coefficients[order]
+        # Keys are slices of one byte buffer per array instead of one small array per row.
+        key_buffer = column_keys[cols].tobytes()
+        coefficient_buffer = coefficients.tobytes()
+        key_size = column_keys.itemsize * 2
+        ends = np.cumsum(np.bincount(model.row_indices, minlength=model.n_rows)).tolist()
+        rows: dict[tuple, list[list[pulp.LpConstraint]]] = {}
+        n_constraints = 0
+        start = 0
+        for end, lower, upper in zip(ends, model.row_lower.tolist(), model.row_upper.tolist()):
+            key = (
+                key_buffer[start * key_size : end * key_size],
+                coefficient_buffer[start * coefficients.itemsize : end * coefficients.itemsize],
+                lower,
+                upper,
+            )
+            cached = self.rows.get(key)
+            if cached:
+                constraints = cached.pop()
+            else:
+                constraints = self._constraints(cols[start:end], coefficients[start:end], lower, upper)
+            rows.setdefault(key, []).append(constraints)
+            for constraint in constraints:
+                n_constraints += 1
+                self.prob.addConstraint(constraint, f"_C{n_constraints}")
+            start = end
+        self.rows = rows
+
+        objective_cols = np.flatnonzero(model.objective).tolist()
+        self.prob += pulp.LpAffineExpression([(self.columns[col], model.objective[col]) for col in objective_cols])
+
+    def _constraints(
+        self, cols: np.ndarray, coefficients: np.ndarray, lower: float, upper: float
+    ) -> list[pulp.LpConstraint]:
+        expression = pulp.LpAffineExpression(
+            [(self.columns[col], coefficient) for col, coefficient in zip(cols.tolist(), coefficients.tolist())]
+        )
+        if lower == upper:
+            return [expression == lower]
+        constraints = []
+        if np.isfinite(lower):
+            constraints.append(expression >= lower)
+        if np.isfinite(upper):
+            constraints.append(expression <= upper)
+        return constraints
+
+    def solve(
+        self,
+        settings: SolverSettings,
+        initial_values: np.ndarray | None = None,
+        progress_callback: ProgressCallback | None = None,
+    ) -> str:
+        # Same command as pulp.PULP_CBC_CMD builds, but run through _run_cbc so cancel() can kill it.
+        command_builder = pulp.PULP_CBC_CMD(msg=False)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            mps_path = Path(tmp_dir) / "model.mps"
+            solution_path = Path(tmp_dir) / "model.sol"
+            with self.phase("write_mps"):
+                variables, variable_names, constraint_names, _ = self.prob.writeMPS(str(mps_path), rename=1)
+            command = [command_builder.path, str(mps_path), "-max"]
+            if initial_values is not None:
+                for column, value in zip(self.columns, initial_values.tolist()):
+                    column.setInitialValue(value)
+                start_path = Path(tmp_dir) / "start.mst"
+                command_builder.writesol(str(start_path), self.prob, variables, variable_names, constraint_names)
+                command += ["-mips", str(start_path)]
+            if settings.time_limit is not None:
+                command += ["-sec", str(settings.time_limit)]
+            if settings.gap is not None:
+                command += ["-ratioGap", str(settings.gap)]
+            for name, value in _cbc_options(settings):
+                command += [f"-{name}", value]
+            for _ in self._run_cbc(command + ["-solve", "-printingOptions", "all", "-solution", str(solution_path)]):
+                pass
+            if self.cancelled:
+                for column in self.columns:
+                    column.varValue = None
+                return "Not Solved"
+
+            with self.phase("read_solution"):
+                status, values, _, _, _, sol_status = command_builder.readsol_MPS(
+                    str(solution_path), self.prob, variables, variable_names, constraint_names
+                )
+            self.prob.assignVarsVals(values)
+            self.prob.assignStatus(status, sol_status)
+
+        # pulp only hands back the final solution, so that is the single incumbent that can be reported.
+        if self.prob.sol_status == pulp.LpSolutionOptimal:
+            status = "Optimal"
+        elif self.prob.sol_status == pulp.LpSolutionIntegerFeasible:
+            status = "Feasible"
+        else:
+            return pulp.LpStatus[self.prob.status]
+        if progress_callback is not None:
+            progress_callback(pulp.value(self.prob.objective))
+        return status
+
+    def extract(self) -> np.ndarray:
+        # pulp has already stored the solution on the variables, so a single pass over them is the best it offers.
+        return np.fromiter((column.varValue or 0 for column in self.columns), dtype=float, count=len(self.columns))
+
+
+_CBC_INCUMBENT = re.compile(r"Integer solution of ([-+\d.e]+) found")
+_CBC_BOUND = re.compile(r"(?:best possible|Lower bound:)\s+([-+\d.e]+)")
+
+
+@register_backend("cbc-mps")
+class CbcMpsBackend(_CbcProcessBackend):
+    # The text of the rows and columns is kept for the next build as long as the model keeps its arrays, e.g. when a
+    # PersistentModel hands out the same model with other column bounds.
+    structure: str | None = None
+
+    def build(self, model: AssignmentModel) -> None:
+        if self.structure is not None and not model.same_structure(self.model):
+            self.structure = None
+        self.model = model
+        self.values = np.zeros(model.n_columns)
+        self.process: subprocess.Popen | None = None
+        self.cancelled = False
+
+    def solve(
+        self,
+        settings: SolverSettings,
+        initial_values: np.ndarray | None = None,
+        progress_callback: ProgressCallback | None = None,
+    ) -> str:
+        self.best_bound = None
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            mps_path = Path(tmp_dir) / "model.mps"
+            solution_path = Path(tmp_dir) / "model.sol"
+            with self.phase("write_mps"):
+                if self.structure is None:
+                    self.structure = mps_structure(self.model)
+                mps_path.write_text(self.structure + mps_bounds(self.model))
+            command = [pulp.PULP_CBC_CMD().path, str(mps_path)]
+            if initial_values is not None:
+                start_path = Path(tmp_dir) / "start.sol"
+                write_cbc_solution(initial_values, start_path)
+                command += ["-mips", str(start_path)]
+            if settings.time_limit is not None:
+                command += ["-timeMode", "elapsed", "-sec", str(settings.time_limit)]
+            if settings.gap is not None:
+                command += ["-ratioGap", str(settings.gap)]
+            for name, value in _cbc_options(settings):
+                command += [f"-{name}", value]
+
+            # The MPS objective is minimized, so every value in the log has its sign flipped.
+            incumbent = None
+            for line in self._run_cbc(command + ["-solve", "-solution", str(solution_path)]):
+                if match := _CBC_INCUMBENT.search(line):
+                    incumbent = -float(match.group(1))
+                    if progress_callback is not None:
+                        progress_callback(incumbent)
+                if match := _CBC_BOUND.search(line):
+                    self.best_bound = -float(match.group(1))
+            if self.cancelled:
+                return "Not Solved"
+
+            with self.phase("read_solution"):
+                status, self.values = read_cbc_solution(self.model, solution_path)
+
+        # Solutions found during preprocessing are not logged as incumbents.
+        objective = float(self.model.objective @ self.values)
+        if progress_callback is not None and status in ("Optimal", "Feasible") and incumbent != objective:
+            progress_callback(objective)
+        return status
+
+    def extract(self) -> np.ndarray:
+        return self.values
+
+    def bound(self) -> float | None:
+        return self.best_bound
+
+
+# Available from highspy 1.9 on, see requirements.txt.
+HIGHS_REQUIRED_API = ("cbMipImprovingSolution", "cancelSolve", "HandleUserInterrupt", "resetGlobalScheduler")
+
+
+@register_backend("highs")
+class HighsBackend(SolverBackend):
+    @classmethod
+    def is_available(cls) -> bool:
+        # Older highspy releases lack the callback and cancel API used below; they count as not installed.
+        highspy = _import_optional("highspy")
+        return highspy is not None and all(hasattr(highspy.Highs, name) for name in HIGHS_REQUIRED_API)
+
+    def build(self, model: AssignmentModel) -> None:
+        highspy = import_module("highspy")
+
+        order = np.lexsort((model.row_indices, model.col_indices))
+        lp = highspy.HighsLp()
+        lp.num_col_ = model.n_columns
+        lp.num_row_ = model.n_rows
+        lp.sense_ = highspy.ObjSense.kMaximize
+        lp.col_cost_ = model.objective
+        lp.col_lower_ = model.col_lower
+        lp.col_upper_ = model.col_upper
+        lp.row_lower_ = model.row_lower
+        lp.row_upper_ = model.row_upper
+        lp.integrality_ = [highspy.HighsVarType.kInteger] * model.n_columns
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.start_ = np.concatenate(
+            [[0], np.cumsum(np.bincount(model.col_indices, minlength=model.n_columns))]
+        ).astype(np.int32)
+        lp.a_matrix_.index_ = model.row_indices[order].astype(np.int32)
+        lp.a_matrix_.value_ = model.coefficients[order]
+
+        self.model = model
+        self.highs = highspy.Highs()
+        self.highs.setOptionValue("output_flag", False)
+        self.highs.HandleUserInterrupt = True
+        self.highs.passModel(lp)
+
+    def solve(
+        self,
+        settings: SolverSettings,
+        initial_values: np.ndarray | None = None,
+        progress_callback: ProgressCallback | None = None,
+    ) -> str:
+        highspy = import_module("highspy")
+
+        if settings.time_limit is not None:
+            self.highs.setOptionValue("time_limit", float(settings.time_limit))
+        if settings.gap is not None:
+            self.highs.setOptionValue("mip_rel_gap", float(settings.gap))
+        if settings.threads is not None:
+            # The thread pool is shared by all HiGHS instances of the process and only takes a new size when reset.
+            self.highs.resetGlobalScheduler(True)
+            self.highs.setOptionValue("threads", settings.threads)
+        self.highs.setOptionValue("random_seed", settings.seed)
+        self.highs.setOptionValue("presolve", "choose" if settings.presolve else "off")
+        # HiGHS cannot switch its cuts off or make them more aggressive, only keep them to the root node, and that
+        # only in releases newer than highspy 1.9.
+        if settings.cuts == "root":
+            status = self.highs.setOptionValue("mip_allow_cut_separation_at_nodes", False)
+            if status != highspy.HighsStatus.kOk:
+                warnings.warn("Diese HiGHS-Version kann Schnittebenen nicht auf den Wurzelknoten beschränken.")
+        if initial_values is not None:
+            solution = highspy.HighsSolution()
+            solution.col_value = initial_values.tolist()
+            self.highs.setSolution(solution)
+        if progress_callback is not None:
+            self.highs.cbMipImprovingSolution.subscribe(
+                lambda event: progress_callback(event.data_out.objective_function_value)
+            )
+        self.highs.run()
+
+        status = self.highs.getModelStatus()
+        if status == highspy.HighsModelStatus.kOptimal:
+            return "Optimal"
+        if self.highs.getInfo().primal_solution_status == highspy.SolutionStatus.kSolutionStatusFeasible:
+            return "Feasible"
+        if status in (highspy.HighsModelStatus.kInfeasible, highspy.HighsModelStatus.kUnboundedOrInfeasible):
+            return "Infeasible"
+        if status == highspy.HighsModelStatus.kUnbounded:
+            return "Unbounded"
+        return "Not Solved"
+
+    def extract(self) -> np.ndarray:
+        values = np.array(self.highs.getSolution().col_value, dtype=float)
+        return values if len(values) == self.model.n_columns else np.zeros(self.model.n_columns)
+
+    def bound(self) -> float | None:
+        bound = self.highs.getInfo().mip_dual_bound
+        return bound if np.isfinite(bound) else None
+
+    def cancel(self) -> None:
+        self.highs.cancelSolve()
+
+
+# CP-SAT can keep searching for a long time without closing the gap, e.g. with a single worker, so it is never run
+# without a time limit. The best plan found so far is returned as "Feasible".
+CPSAT_DEFAULT_TIME_LIMIT = 60.0
+
+
+@register_backend("cpsat")
+class CpSatBackend(SolverBackend):
+    @classmethod
+    def is_available(cls) -> bool:
+        return _import_optional("ortools.sat.python.cp_model") is not None
+
+    def build(self, model: AssignmentModel) -> None:
+        cp_model = import_module("ortools.sat.python.cp_model")
+
+        def bound(value: float) -> int:
+            return int(np.clip(value, -cp_model.INT32_MAX, cp_model.INT32_MAX))
+
+        self.model = model
+        self.solver = cp_model.CpSolver()
+        self.cp_model = cp_model.CpModel()
+        # A no-course penalty only ever takes 0 or 1; an unbounded domain keeps CP-SAT from proving a bound.
+        col_upper = model.col_upper.copy()
+        col_upper[model.n_pairs :] = np.minimum(col_upper[model.n_pairs :], 1)
+        self.columns = [
+            self.cp_model.new_int_var(bound(lower), bound(upper), f"c{col}")
+            for col, (lower, upper) in enumerate(zip(model.col_lower.tolist(), col_upper.tolist()))
+        ]
+        for (cols, coefficients), lower, upper in zip(_rows(model), model.row_lower, model.row_upper):
+            expression = cp_model.LinearExpr.weighted_sum(
+                [self.columns[col] for col in cols.tolist()], coefficients.astype(int).tolist()
+            )
+            self.cp_model.add_linear_constraint(expression, bound(lower), bound(upper))
+
+        objective_cols = np.flatnonzero(model.objective).tolist()
+        self.cp_model.maximize(
+            cp_model.LinearExpr.weighted_sum(
+                [self.columns[col] for col in objective_cols], model.objective[objective_cols].astype(int).tolist()
+            )
+        )
+
+    def solve(
+        self,
+        settings: SolverSettings,
+        initial_values: np.ndarray | None = None,
+        progress_callback: ProgressCallback | None = None,
+    ) -> str:
+        cp_model = import_module("ortools.sat.python.cp_model")
+
+        class IncumbentCallback(cp_model.CpSolverSolutionCallback):
+            def on_solution_callback(self) -> None:
+                progress_callback(self.objective_value)
+
+        if initial_values is not None:
+            for column, value in zip(self.columns, initial_values.tolist()):
+                self.cp_model.add_hint(column, int(value))
+        time_limit = CPSAT_DEFAULT_TIME_LIMIT if settings.time_limit is None else settings.time_limit
+        self.solver.parameters.max_time_in_seconds = float(time_limit)
+        if settings.gap is not None:
+            self.solver.parameters.relative_gap_limit = float(settings.gap)
+        if settings.threads is not None:
+            self.solver.parameters.num_workers = settings.threads
+        self.solver.parameters.random_seed = settings.seed
+        self.solver.parameters.cp_model_presolve = settings.presolve
+        if settings.cuts == "off":
+            self.solver.parameters.cut_level = 0
+        elif settings.cuts == "root":
+            self.solver.parameters.only_add_cuts_at_level_zero = True
+        elif settings.cuts == "aggressive":
+            self.solver.parameters.linearization_level = 2
+        status = self.solver.solve(self.cp_model, IncumbentCallback() if progress_callback is not None else None)
+        self.has_solution = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+        if status == cp_model.OPTIMAL:
+            return "Optimal"
+        if status == cp_model.FEASIBLE:
+            return "Feasible"
+        if status == cp_model.INFEASIBLE:
+            return "Infeasible"
+        return "Not Solved"
+
+    def extract(self) -> np.ndarray:
+        if not self.has_solution:
+            return np.zeros(self.model.n_columns)
+        # The columns were created first, so they lead the response's solution vector.
+        return np.array(list(self.solver.response_proto.solution), dtype=float)[: self.model.n_columns]
+
+    def bound(self) -> float | None:
+        return self.solver.best_objective_bound if self.has_solution else None
+
+    def cancel(self) -> None:
+        self.solver.stop_search()
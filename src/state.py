@@ -6,6 +6,7 @@ from singleton_decorator import singleton
 from activity import Activity, ActivityIDGenerator
 from assignment import Assignment
 from id_generator import ID
+from solver import SolverSettings
 from student import Student, StudentIDGenerator
 
 from dataclasses import asdict
@@ -18,6 +19,7 @@ class State:
     students: list[Student] = []
     activities: list[Activity] = []
     assignment: Assignment = Assignment()
+    solver_settings: SolverSettings = SolverSettings()
 
     def __init__(
         self,
@@ -28,6 +30,7 @@ class State:
         self.set_students([])
         self.set_activities([])
         self.reset_assignment()
+        self.reset_solver_settings()
 
     def reset_student_id(self):
         StudentIDGenerator().reset(max([student.id for student in self.students] or [0]) + 1)
@@ -40,6 +43,7 @@ class State:
             "students": [asdict(student) for student in self.students],
             "activities": [asdict(activity) for activity in self.activities],
             "assignment": self.assignment.as_dict(),
+            "solver_settings": self.solver_settings.to_dict(),
         }
 
     def set_students(self, students: list[Student]) -> State:
@@ -47,8 +51,8 @@ class State:
         self.reset_student_id()
         return self
 
-    def add_student(self, student: Student) -> State:
-        self.students.append(student)
+    def add_student(self, student: Student, index: int | None = None) -> State:
+        self.students.insert(len(self.students) if index is None else index, student)
         self.reset_student_id()
         return self
 
@@ -66,8 +70,8 @@ class State:
         self.reset_assignment()
         return self
 
-    def add_activity(self, activity: Activity) -> State:
-        self.activities.append(activity)
+    def add_activity(self, activity: Activity, index: int | None = None) -> State:
+        self.activities.insert(len(self.activities) if index is None else index, activity)
         self.reset_activity_id()
         self.reset_assignment()
         return self
@@ -81,7 +85,7 @@ class State:
         for student in self.students:
             try:
                 del student.preferences[activity_id]
-            except ValueError:
+            except KeyError:
                 pass
 
         self.reset_activity_id()
@@ -95,11 +99,25 @@ class State:
     def reset_assignment(self) -> State:
         return self.set_assignment(Assignment())
 
+    def set_solver_settings(self, solver_settings: SolverSettings) -> State:
+        self.solver_settings = solver_settings
+        return self
+
+    def reset_solver_settings(self) -> State:
+        # The MPS backend streams its incumbents and runs CBC as a child process that can be killed on cancel.
+        return self.set_solver_settings(SolverSettings(backend="cbc-mps"))
+
     def from_dict(self, state_dict: dict[str, Any]) -> State:
-        assert set(state_dict.keys()) == {"students", "activities", "assignment"}
+        # Saves from before the solver settings were stored get the default settings.
+        assert {"students", "activities", "assignment"} <= set(state_dict.keys())
+        assert set(state_dict.keys()) <= {"students", "activities", "assignment", "solver_settings"}
         self.set_students([Student.from_dict(student) for student in state_dict["students"]])
         self.set_activities([Activity.from_dict(activity) for activity in state_dict["activities"]])
         self.set_assignment(Assignment.from_dict(state_dict["assignment"]))
+        if "solver_settings" in state_dict:
+            self.set_solver_settings(SolverSettings.from_dict(state_dict["solver_settings"]))
+        else:
+            self.reset_solver_settings()
 
         return self
 
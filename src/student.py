@@ -5,6 +5,8 @@ from singleton_decorator import singleton
 
 from id_generator import IDGenerator, ID
 
+GUARANTEED_PREFERENCE = -100
+
 
 @singleton
 class StudentIDGenerator(IDGenerator):
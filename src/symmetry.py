@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import dataclasses
+from collections import defaultdict
+from dataclasses import dataclass
+
+from activity import Activity
+from id_generator import ID
+from student import Student
+
+
+def find_interchangeable_activities(students: list[Student], activities: list[Activity]) -> list[list[Activity]]:
+    # Activities are interchangeable when they run at the same (non-empty) time for the same grades and every
+    # student gives all of them the same preference, as after splitting a course. Overlapping each other, no student
+    # can take two of them, so only the number of seats taken in the group matters for the objective.
+    choices: defaultdict[ID, list[tuple[ID, int]]] = defaultdict(list)
+    for student in students:
+        for activity_id, preference in student.preferences.items():
+            choices[activity_id].append((student.id, preference))
+    keys = {activity.id: interchangeability_key(activity, choices[activity.id]) for activity in activities}
+    return group_interchangeable(activities, keys)
+
+
+def interchangeability_key(activity: Activity, choices: list[tuple[ID, int]]) -> tuple | None:
+    # Equal keys mean interchangeable activities; None for an activity that is interchangeable with no other one.
+    if activity.timespan.from_slot == activity.timespan.to_slot or not choices:
+        return None
+    return (
+        activity.timespan.from_slot,
+        activity.timespan.to_slot,
+        activity.first_date,
+        tuple(activity.valid_grades),
+        tuple(sorted(choices)),
+    )
+
+
+def group_interchangeable(activities: list[Activity], keys: dict[ID, tuple | None]) -> list[list[Activity]]:
+    groups: defaultdict[tuple, list[Activity]] = defaultdict(list)
+    for activity in activities:
+        key = keys[activity.id]
+        if key is not None:
+            groups[key].append(activity)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+@dataclass
+class Aggregation:
+    # Each group of interchangeable activities is replaced by its first activity with the summed capacities.
+    students: list[Student]
+    activities: list[Activity]
+    groups: list[list[Activity]]
+
+    def representative(self) -> dict[ID, ID]:
+        return {activity.id: group[0].id for group in self.groups for activity in group}
+
+    def aggregate_pairs(self, pairs: set[tuple[ID, ID]]) -> set[tuple[ID, ID]]:
+        representative = self.representative()
+        return {(student_id, representative.get(activity_id, activity_id)) for student_id, activity_id in pairs}
+
+    def disaggregate_pairs(
+        self, pairs: list[tuple[ID, ID]], previous_pairs: set[tuple[ID, ID]] | None = None
+    ) -> list[tuple[ID, ID]]:
+        # Students keep the activity of the group they had before where its capacity allows, the others fill the
+        # group's activities up to their minimum first. Any count within the summed bounds can be split this way.
+        previous = previous_pairs or set()
+        group_of = {group[0].id: group for group in self.groups}
+        members: defaultdict[ID, list[ID]] = defaultdict(list)
+        result = []
+        for student_id, activity_id in pairs:
+            if activity_id in group_of:
+                members[activity_id].append(student_id)
+            else:
+                result.append((student_id, activity_id))
+
+        for representative_id, student_ids in members.items():
+            group = group_of[representative_id]
+            placed: dict[ID, list[ID]] = {activity.id: [] for activity in group}
+            unplaced = []
+            for student_id in student_ids:
+                activity = next((activity for activity in group if (student_id, activity.id) in previous), None)
+                if activity is not None and len(placed[activity.id]) < activity.max_capacity:
+                    placed[activity.id].append(student_id)
+                else:
+                    unplaced.append(student_id)
+            for student_id in unplaced:
+                activity = min(
+                    (activity for activity in group if len(placed[activity.id]) < activity.max_capacity),
+                    key=lambda activity: (len(placed[activity.id]) >= activity.min_capacity, len(placed[activity.id])),
+                )
+                placed[activity.id].append(student_id)
+            for activity in group:
+                while len(placed[activity.id]) < activity.min_capacity:
+                    donor = next((other for other in group if len(placed[other.id]) > other.min_capacity), None)
+                    if donor is None:
+                        break
+                    placed[activity.id].append(placed[donor.id].pop())
+            result.extend((student_id, activity_id) for activity_id, ids in placed.items() for student_id in ids)
+        return result
+
+
+def aggregate_interchangeable(students: list[Student], activities: list[Activity]) -> Aggregation | None:
+    return aggregate_groups(students, activities, find_interchangeable_activities(students, activities))
+
+
+def aggregate_groups(
+    students: list[Student], activities: list[Activity], groups: list[list[Activity]]
+) -> Aggregation | None:
+    if not groups:
+        return None
+    merged = merged_activities(groups)
+    return Aggregation(
+        [aggregate_student(student, merged) for student in students], aggregate_activities(activities, groups), groups
+    )
+
+
+def merged_activities(groups: list[list[Activity]]) -> set[ID]:
+    # The activities that are dropped in favour of the first activity of their group.
+    return {activity.id for group in groups for activity in group[1:]}
+
+
+def aggregate_activities(activities: list[Activity], groups: list[list[Activity]]) -> list[Activity]:
+    merged = merged_activities(groups)
+    representatives = {
+        group[0].id: dataclasses.replace(
+            group[0],
+            min_capacity=sum(activity.min_capacity for activity in group),
+            max_capacity=sum(activity.max_capacity for activity in group),
+            valid_grades=list(group[0].valid_grades),
+        )
+        for group in groups
+    }
+    return [representatives.get(activity.id, activity) for activity in activities if activity.id not in merged]
+
+
+def aggregate_student(student: Student, merged: set[ID]) -> Student:
+    return dataclasses.replace(
+        student,
+        preferences={
+            activity_id: preference
+            for activity_id, preference in student.preferences.items()
+            if activity_id not in merged
+        },
+    )
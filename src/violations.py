@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from activity import Activity, get_activity_id_map
+from assignment import Assignment, AssignmentException
+from id_generator import ID
+from student import Student
+
+
+class ViolationIndex:
+    # The result of Assignment.check_validity, kept up to date per student and activity.
+    def __init__(self, students: list[Student], activities: list[Activity], assignment: Assignment) -> None:
+        self.assignment = assignment
+        self._students = {student.id: student for student in students}
+        self._activities = get_activity_id_map(activities)
+        self._student_order = {student.id: idx for idx, student in enumerate(students)}
+        self._activity_order = {activity.id: idx for idx, activity in enumerate(activities)}
+        self._student_violations: dict[ID, list[AssignmentException]] = {}
+        self._activity_violations: dict[ID, list[AssignmentException]] = {}
+        for student in students:
+            self.update_student(student.id)
+        for activity in activities:
+            self.update_activity(activity.id)
+
+    def update_student(self, student_id: ID) -> None:
+        if student_id not in self._students:
+            return
+        violations = self.assignment.student_violations(self._students[student_id], self._activities)
+        if violations:
+            self._student_violations[student_id] = violations
+        else:
+            self._student_violations.pop(student_id, None)
+
+    def update_activity(self, activity_id: ID) -> None:
+        if activity_id not in self._activities:
+            return
+        violations = self.assignment.activity_violations(self._activities[activity_id])
+        if violations:
+            self._activity_violations[activity_id] = violations
+        else:
+            self._activity_violations.pop(activity_id, None)
+
+    def pair_changed(self, student_id: ID, activity_id: ID) -> None:
+        self.update_student(student_id)
+        self.update_activity(activity_id)
+
+    def assign_student_to_activity_by_id(self, student_id: ID, activity_id: ID) -> None:
+        self.assignment.assign_student_to_activity_by_id(student_id, activity_id)
+        self.pair_changed(student_id, activity_id)
+
+    def remove_student_from_activity_by_id(self, student_id: ID, activity_id: ID) -> None:
+        self.assignment.remove_student_from_activity_by_id(student_id, activity_id)
+        self.pair_changed(student_id, activity_id)
+
+    def is_valid(self) -> bool:
+        return not self._student_violations and not self._activity_violations
+
+    def violations(self) -> list[AssignmentException]:
+        violations = []
+        for student_id in sorted(self._student_violations, key=self._student_order.__getitem__):
+            violations.extend(self._student_violations[student_id])
+        for activity_id in sorted(self._activity_violations, key=self._activity_order.__getitem__):
+            violations.extend(self._activity_violations[activity_id])
+        return violations
@@ -1,6 +1,6 @@
 import pytest
 
-from activity import Activity, ActivityIDGenerator, InvalidGradeAccessError, Timespan
+from activity import Activity, ActivityIDGenerator, InvalidGradeAccessError, Timespan, get_overlap_cliques
 from dataclasses import asdict
 
 
@@ -59,3 +59,28 @@ def test_activities_overlap():
         Activity(name="A", timespan=Timespan(1, 5)),
         Activity(name="B", timespan=Timespan(4, 10)),
     )
+
+
+def test_overlap_cliques():
+    activities = [
+        Activity(name="A", timespan=Timespan(1, 5)),
+        Activity(name="B", timespan=Timespan(4, 10)),
+        Activity(name="C", timespan=Timespan(3, 8)),
+        Activity(name="D", timespan=Timespan(10, 12)),
+        Activity(name="E", timespan=Timespan(7, 7)),
+        Activity(name="F", timespan=Timespan(7, 7)),
+        Activity(name="G", timespan=Timespan(20, 20)),
+    ]
+    cliques = [set(clique) for clique in get_overlap_cliques(activities)]
+    assert sorted(map(sorted, cliques)) == [[1, 2, 3], [2, 3, 5], [2, 3, 6]]
+
+    for activity_0 in activities:
+        for activity_1 in activities:
+            if activity_0.id == activity_1.id:
+                continue
+            in_common_clique = any({activity_0.id, activity_1.id} <= clique for clique in cliques)
+            assert in_common_clique == Activity.overlap(activity_0, activity_1)
+
+
+def test_overlap_cliques_without_timespans():
+    assert get_overlap_cliques([Activity(name="A"), Activity(name="B")]) == []
@@ -1,9 +1,15 @@
+import random
+
 import assignment as assign_mod
 import pytest
 
 from activity import Activity, Timespan
+from presolve import MinimumCapacityUnreachable
+from solver import SolverSettings, available_backends
 from student import Student
 
+BACKENDS = available_backends()
+
 
 def test_assignment_dict_conversion(example_assignment):
     assert example_assignment == assign_mod.Assignment.from_dict(example_assignment.as_dict())
@@ -16,6 +22,11 @@ def test_assign_by_id():
     assert set(assignment.get_students_for_activity(2)) == {1}
 
 
+def test_assignment_from_pairs(example_assignment):
+    assert assign_mod.Assignment.from_pairs([(1, 1), (1, 2), (2, 2)]) == example_assignment
+    assert assign_mod.Assignment.from_pairs([]).is_empty()
+
+
 def test_assign_remove(example_students, example_activities):
     assignment = assign_mod.Assignment()
     student = example_students[0]
@@ -113,12 +124,22 @@ def test_assign_validity_no_assignment(example_students, example_activities):
     assert any(isinstance(e, assign_mod.NoAssignedActivity) for e in exceptions)
 
 
-def test_auto_assign(example_students, example_activities, example_assignment):
-    assignment = assign_mod.assign_students(example_students, example_activities)
+def test_assign_validity_overlap_violation(example_students, example_activities, example_assignment):
+    example_activities[1].timespan = Timespan(36, 40)
+    exceptions = example_assignment.check_validity(example_students, example_activities)
+    assert [type(e) for e in exceptions] == [assign_mod.OverlappingActivities]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_auto_assign(example_students, example_activities, example_assignment, backend):
+    assignment = assign_mod.assign_students(
+        example_students, example_activities, settings=SolverSettings(backend=backend)
+    )
     assert assignment == example_assignment
 
 
-def test_auto_assign_overbooked():
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_auto_assign_overbooked(backend):
     activities = [
         Activity(name="A", min_capacity=1, max_capacity=1),
         Activity(name="B", min_capacity=0, max_capacity=2),
@@ -128,12 +149,13 @@ def test_auto_assign_overbooked():
         Student(name="B", grade=1, subgrade="a", preferences={activities[0].id: 1}),
         Student(name="C", grade=1, subgrade="a", preferences={activities[0].id: 1, activities[1].id: 1}),
     ]
-    assignment = assign_mod.assign_students(students, activities)
+    assignment = assign_mod.assign_students(students, activities, SolverSettings(backend=backend))
     assert set(assignment.get_students_for_activity(activities[0].id)) == {students[1].id}
     assert set(assignment.get_students_for_activity(activities[1].id)) == {students[0].id, students[2].id}
 
 
-def test_auto_assign_overbooked_all_max_capacity():
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_auto_assign_overbooked_all_max_capacity(backend):
     activities = [
         Activity(name="A", min_capacity=0, max_capacity=2),
         Activity(name="B", min_capacity=0, max_capacity=3),
@@ -144,37 +166,40 @@ def test_auto_assign_overbooked_all_max_capacity():
         Student(name="C", grade=1, subgrade="a", preferences={activities[0].id: 1, activities[1].id: 1}),
         Student(name="D", grade=1, subgrade="a", preferences={activities[0].id: 1, activities[1].id: 1}),
     ]
-    assignment = assign_mod.assign_students(students, activities)
+    assignment = assign_mod.assign_students(students, activities, SolverSettings(backend=backend))
     assert len(assignment.get_students_for_activity(activities[0].id)) == activities[0].max_capacity
     assert len(assignment.get_students_for_activity(activities[1].id)) == activities[1].max_capacity
 
 
-def test_auto_assign_non_existing_preference(example_students, example_activities, example_assignment):
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_auto_assign_non_existing_preference(example_students, example_activities, example_assignment, backend):
     example_students[0].preferences[-1] = 1
     with pytest.raises(assign_mod.ActivityIDNotAssigned):
-        assign_mod.assign_students(example_students, example_activities)
+        assign_mod.assign_students(example_students, example_activities, settings=SolverSettings(backend=backend))
 
 
-def test_auto_assign_minimum_capacity_violation(example_students, example_activities):
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_auto_assign_minimum_capacity_violation(example_students, example_activities, backend):
     example_activities[0].min_capacity = 5
-    assignment = assign_mod.assign_students(example_students, example_activities)
-    exceptions = assignment.check_validity(example_students, example_activities)
-    assert any(isinstance(e, assign_mod.MinimumCapacityNotReached) for e in exceptions)
+    with pytest.raises(MinimumCapacityUnreachable):
+        assign_mod.assign_students(example_students, example_activities, settings=SolverSettings(backend=backend))
 
 
-def test_auto_assign_maximum_capacity_violation():
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_auto_assign_maximum_capacity_violation(backend):
     activity = Activity(name="A", max_capacity=1)
     students = [
         Student(name="A", grade=1, subgrade="a", preferences={activity.id: 1}),
         Student(name="B", grade=1, subgrade="a", preferences={activity.id: 1}),
         Student(name="C", grade=1, subgrade="a", preferences={activity.id: 1}),
     ]
-    assignment = assign_mod.assign_students(students, [activity])
+    assignment = assign_mod.assign_students(students, [activity], settings=SolverSettings(backend=backend))
     exceptions = assignment.check_validity(students, [activity])
     assert any(isinstance(e, assign_mod.StudentIDNotAssigned) for e in exceptions)
 
 
-def test_overbooking_and_capacity_constraints():
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_overbooking_and_capacity_constraints(backend):
     activities = [
         Activity(
             name="A",
@@ -194,12 +219,13 @@ def test_overbooking_and_capacity_constraints():
         Student(name="B", grade=1, subgrade="a", preferences={1: 1}),
         Student(name="C", grade=1, subgrade="a", preferences={1: 1, 2: 1}),
     ]
-    assignment = assign_mod.assign_students(students, activities)
+    assignment = assign_mod.assign_students(students, activities, SolverSettings(backend=backend))
     assert assignment.participant_count(1) <= activities[0].max_capacity
     assert assignment.participant_count(2) <= activities[1].max_capacity
 
 
-def test_timing_conflicts():
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_timing_conflicts(backend):
     activities = [
         Activity(
             name="A",
@@ -218,12 +244,13 @@ def test_timing_conflicts():
         Student(name="A", grade=1, subgrade="a", preferences={1: 1, 2: 1}),
         Student(name="B", grade=1, subgrade="a", preferences={1: 1, 2: 1}),
     ]
-    assignment = assign_mod.assign_students(students, activities)
+    assignment = assign_mod.assign_students(students, activities, SolverSettings(backend=backend))
     assert len(assignment.get_activities_for_student(students[0].id)) == 1
     assert len(assignment.get_activities_for_student(students[1].id)) == 1
 
 
-def test_invalid_preference_assignment():
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_invalid_preference_assignment(backend):
     activities = [
         Activity(
             name="A",
@@ -244,12 +271,13 @@ def test_invalid_preference_assignment():
         ),  # Preference for activity 0 but not allowed there
         Student(name="B", grade=2, subgrade="a", preferences={1: 1, 2: 1}),
     ]
-    assignment = assign_mod.assign_students(students, activities)
+    assignment = assign_mod.assign_students(students, activities, SolverSettings(backend=backend))
     assert set(assignment.get_activities_for_student(students[0].id)) == {activities[1].id}
     assert set(assignment.get_activities_for_student(students[1].id)) == {activities[0].id, activities[1].id}
 
 
-def test_auto_assign_weighted():
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_auto_assign_weighted(backend):
     students = [
         Student(name="A", grade=1, subgrade="a", preferences={1: 1, 2: 2}),
         Student(name="B", grade=2, subgrade="b", preferences={1: 2, 2: 1}),
@@ -263,7 +291,7 @@ def test_auto_assign_weighted():
     target_assignment.assign_student_to_activity_by_id(1, 1)
     target_assignment.assign_student_to_activity_by_id(2, 2)
 
-    assignment = assign_mod.assign_students(students, activities)
+    assignment = assign_mod.assign_students(students, activities, SolverSettings(backend=backend))
     assert assignment == target_assignment
 
     students[0].preferences = {1: 2, 2: 1}
@@ -273,5 +301,133 @@ def test_auto_assign_weighted():
     target_assignment.assign_student_to_activity_by_id(1, 2)
     target_assignment.assign_student_to_activity_by_id(2, 1)
 
-    assignment = assign_mod.assign_students(students, activities)
+    assignment = assign_mod.assign_students(students, activities, SolverSettings(backend=backend))
     assert assignment == target_assignment
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_auto_assign_unlimited_capacity(backend):
+    activity = Activity(name="A")
+    students = [
+        Student(name="A", grade=1, subgrade="a", preferences={activity.id: 1}),
+        Student(name="B", grade=3, subgrade="a", preferences={activity.id: 2}),
+    ]
+    assignment = assign_mod.assign_students(students, [activity], settings=SolverSettings(backend=backend))
+    assert set(assignment.get_students_for_activity(activity.id)) == {students[0].id, students[1].id}
+
+
+def test_backends_equal_objective():
+    rng = random.Random(0)
+    activities = [
+        Activity(
+            name=str(idx),
+            min_capacity=rng.randint(0, 1),
+            max_capacity=rng.randint(2, 6),
+            timespan=Timespan.from_day_hour_minute(day, hour, 0, day, hour + 2, 0),
+            valid_grades=[rng.random() < 0.8 for _ in range(4)],
+        )
+        for idx, (day, hour) in enumerate((rng.randint(0, 2), rng.randint(12, 15)) for _ in range(12))
+    ]
+    students = [
+        Student(
+            name=str(idx),
+            grade=rng.randint(1, 4),
+            subgrade="a",
+            preferences={activity.id: rng.randint(1, 3) for activity in rng.sample(activities, rng.randint(1, 4))},
+        )
+        for idx in range(40)
+    ]
+
+    objectives = [
+        assign_mod.objective_value(
+            students, assign_mod.assign_students(students, activities, SolverSettings(backend=backend))
+        )
+        for backend in BACKENDS
+    ]
+    assert len(set(objectives)) == 1, dict(zip(BACKENDS, objectives))
+
+
+def test_settled_students():
+    activities = [
+        Activity(name="A", max_capacity=1),
+        Activity(name="B", max_capacity=2),
+        Activity(name="C", max_capacity=2),
+    ]
+    students = [
+        Student(name="A", grade=1, subgrade="a", preferences={1: 1, 2: 2}),
+        Student(name="B", grade=1, subgrade="a", preferences={2: 1}),
+        Student(name="C", grade=1, subgrade="a", preferences={1: 1, 3: 1}),
+        Student(name="D", grade=1, subgrade="a", preferences={3: 1}),
+    ]
+    assignment = assign_mod.Assignment()
+    assignment.assign_student_to_activity_by_id(1, 1)
+    assignment.assign_student_to_activity_by_id(2, 2)
+    assignment.assign_student_to_activity_by_id(3, 1)
+
+    # Activity 1 is overbooked, so everybody who chose it may move; student 4 has no course yet.
+    assert assign_mod.get_settled_students(students, activities, assignment) == {2}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_warm_start(example_students, example_activities, example_assignment, backend):
+    assignment = assign_mod.assign_students(
+        example_students,
+        example_activities,
+        settings=SolverSettings(backend=backend),
+        initial_assignment=example_assignment,
+    )
+    assert assignment == example_assignment
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_incremental_late_student(backend):
+    activities = [
+        Activity(name="A", max_capacity=2),
+        Activity(name="B", max_capacity=2),
+    ]
+    students = [
+        Student(name="A", grade=1, subgrade="a", preferences={1: 2, 2: 1}),
+        Student(name="B", grade=1, subgrade="a", preferences={1: 1}),
+    ]
+    assignment = assign_mod.assign_students(students, activities, SolverSettings(backend=backend))
+
+    # The late student would push student A out of activity 1 in a fresh solve.
+    students.append(Student(name="C", grade=1, subgrade="a", preferences={1: 1, 2: 3}))
+    new_assignment = assign_mod.assign_students(
+        students, activities, settings=SolverSettings(backend=backend), initial_assignment=assignment, incremental=True
+    )
+    for student in students[:2]:
+        assert set(new_assignment.get_activities_for_student(student.id)) == set(
+            assignment.get_activities_for_student(student.id)
+        )
+    assert set(new_assignment.get_activities_for_student(students[2].id)) == {2}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_incremental_capacity_change(backend):
+    activities = [
+        Activity(name="A", max_capacity=2),
+        Activity(name="B", max_capacity=2),
+    ]
+    students = [
+        Student(name="A", grade=1, subgrade="a", preferences={1: 1, 2: 2}),
+        Student(name="B", grade=1, subgrade="a", preferences={1: 1, 2: 2}),
+    ]
+    assignment = assign_mod.Assignment()
+    assignment.assign_student_to_activity_by_id(1, 1)
+    assignment.assign_student_to_activity_by_id(2, 1)
+
+    activities[0].max_capacity = 1
+    new_assignment = assign_mod.assign_students(
+        students, activities, settings=SolverSettings(backend=backend), initial_assignment=assignment, incremental=True
+    )
+    assert new_assignment.check_validity(students, activities) == []
+    assert new_assignment.participant_count(1) == 1
+
+
+def test_solve_assignment_result(example_students, example_activities, example_assignment):
+    result = assign_mod.solve_assignment(example_students, example_activities, SolverSettings(time_limit=5))
+    assert result.assignment == example_assignment
+    assert result.status == "Optimal"
+    assert result.objective == assign_mod.objective_value(example_students, example_assignment)
+    assert result.gap == 0
@@ -0,0 +1,105 @@
+import pytest
+
+from activity import Activity
+from assignment import AssignmentResult, assign_students, solve_assignment
+from cache import SolutionCache, cache_key
+from solver import SolverSettings
+from student import Student
+
+
+@pytest.fixture
+def optimal_result(example_assignment) -> AssignmentResult:
+    return AssignmentResult(example_assignment, "Optimal", 27.0, 27.0, 0.0)
+
+
+def test_cache_key(example_students, example_activities):
+    key = cache_key(example_students, example_activities, SolverSettings())
+    assert key == cache_key(example_students[::-1], example_activities[::-1], SolverSettings())
+    assert key != cache_key(example_students, example_activities, SolverSettings(backend="cbc-mps"))
+
+    example_students[0].preferences[1] = 2
+    assert key != cache_key(example_students, example_activities, SolverSettings())
+    example_students[0].preferences[1] = 1
+
+    example_activities[1].max_capacity = 3
+    assert key != cache_key(example_students, example_activities, SolverSettings())
+
+
+def test_cache_key_incremental(example_students, example_activities, example_assignment):
+    settings = SolverSettings()
+    key = cache_key(example_students, example_activities, settings)
+    assert key == cache_key(example_students, example_activities, settings, example_assignment)
+    assert key != cache_key(example_students, example_activities, settings, example_assignment, incremental=True)
+
+
+def test_cache_hit_and_miss(optimal_result):
+    cache = SolutionCache()
+    assert cache.get("a") is None
+    cache.put("a", optimal_result)
+    result = cache.get("a")
+    assert result.assignment == optimal_result.assignment
+    assert result.objective == optimal_result.objective
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_only_stores_optimal(optimal_result):
+    cache = SolutionCache()
+    cache.put("a", AssignmentResult(optimal_result.assignment, "Feasible", 20.0, 27.0, 0.35))
+    assert cache.get("a") is None
+
+
+def test_cache_lru_eviction(optimal_result):
+    cache = SolutionCache(max_entries=2)
+    cache.put("a", optimal_result)
+    cache.put("b", optimal_result)
+    cache.get("a")
+    cache.put("c", optimal_result)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert len(cache) == 2
+
+
+def test_cache_on_disk(tmp_path, optimal_result):
+    SolutionCache(tmp_path).put("a", optimal_result)
+    cache = SolutionCache(tmp_path)
+    result = cache.get("a")
+    assert result.assignment == optimal_result.assignment
+    result.assignment.assign_student_to_activity_by_id(3, 1)
+
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_disk_eviction(tmp_path, optimal_result):
+    cache = SolutionCache(tmp_path, max_entries=1, max_disk_entries=2)
+    for key in "abc":
+        cache.put(key, optimal_result)
+    assert len(list(tmp_path.iterdir())) == 2
+    cache.invalidate()
+    assert len(cache) == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_solve_assignment_uses_cache(example_students, example_activities, example_assignment):
+    cache = SolutionCache()
+    first = solve_assignment(example_students, example_activities, cache=cache)
+    second = solve_assignment(example_students, example_activities, initial_assignment=first.assignment, cache=cache)
+    assert second.assignment == first.assignment == example_assignment
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert first.stats.path != "cache" and "presolve" in first.stats.phases
+    assert second.stats.path == "cache" and list(second.stats.phases) == ["cache"]
+
+    example_activities.append(Activity(name="C"))
+    example_students.append(Student(name="C", grade=1, subgrade="a", preferences={3: 1}))
+    assignment = assign_students(example_students, example_activities, cache=cache)
+    assert assignment.get_activities_for_student(3) == [3]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cached_assignment_is_a_copy(example_students, example_activities):
+    cache = SolutionCache()
+    first = assign_students(example_students, example_activities, cache=cache)
+    first.remove_student_from_activity_by_id(1, 1)
+    assert assign_students(example_students, example_activities, cache=cache) != first
@@ -0,0 +1,79 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from cli import _settings_from_arguments, build_parser, main
+from solver import SolverSettings
+from state import State
+
+SRC = Path(__file__).parent.parent / "src"
+
+
+def test_cli_solve(tmp_path, capsys, example_state):
+    example_state.reset_assignment().write(tmp_path / "state.json")
+    assert main(["solve", str(tmp_path / "state.json"), "--output", str(tmp_path / "solved.json")]) == 0
+    assert capsys.readouterr().out.startswith("Status: Optimal")
+
+    solved = State().read(tmp_path / "solved.json")
+    assert solved.assignment.get_activities_for_student(1) == [1, 2]
+    assert solved.assignment.get_activities_for_student(2) == [2]
+    assert State().read(tmp_path / "state.json").assignment.is_empty()
+
+    assert main(["solve", str(tmp_path / "state.json"), "--stats", str(tmp_path / "stats.json")]) == 0
+    stats = json.loads((tmp_path / "stats.json").read_text())
+    assert stats["status"] == "Optimal" and "build_model" in stats["phases"]
+
+
+def test_cli_solver_arguments_override_saved_settings():
+    saved = SolverSettings(backend="cbc", threads=4, seed=7)
+    args = build_parser().parse_args(["solve", "state.json", "--seed", "3", "--no-presolve"])
+    assert _settings_from_arguments(args, saved) == SolverSettings(backend="cbc", threads=4, seed=3, presolve=False)
+    assert saved.seed == 7
+
+
+def test_cli_solve_infeasible(tmp_path, capsys, example_state):
+    example_state.activities[0].min_capacity = 5
+    example_state.write(tmp_path / "state.json")
+    assert main(["solve", str(tmp_path / "state.json")]) == 2
+    assert "mindestens 5" in capsys.readouterr().err
+
+
+def test_cli_export(tmp_path, example_state):
+    pytest.importorskip("reportlab")
+    example_state.write(tmp_path / "state.json")
+    assert main(["export", str(tmp_path / "state.json"), "--pdf-dir", str(tmp_path / "pdf"), "--pdf", "students"]) == 0
+    assert [path.name for path in (tmp_path / "pdf").iterdir()] == ["Kinderzuteilungen.pdf"]
+
+
+def test_cli_does_not_import_gui(tmp_path, example_state):
+    example_state.write(tmp_path / "state.json")
+    script = (
+        "import sys, runpy; sys.argv = ['main.py', 'solve', sys.argv[1]]\n"
+        "try:\n    runpy.run_path('main.py', run_name='__main__')\n"
+        "except SystemExit:\n    pass\n"
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in ('gui', 'customtkinter', 'matplotlib', 'reportlab')))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script, str(tmp_path / "state.json")],
+        cwd=SRC,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.splitlines()[-1] == "[]"
+
+
+def test_cli_diff(tmp_path, capsys, example_state):
+    example_state.write(tmp_path / "before.json")
+    example_state.assignment.remove_student_from_activity_by_id(1, 1)
+    example_state.write(tmp_path / "after.json")
+
+    assert main(["diff", str(tmp_path / "before.json"), str(tmp_path / "before.json")]) == 0
+    assert capsys.readouterr().out == "Keine Unterschiede.\n"
+    assert main(["diff", str(tmp_path / "before.json"), str(tmp_path / "after.json"), "--json", "-"]) == 1
+    output = capsys.readouterr().out
+    assert "A (1a): - A" in output
+    assert json.loads(output[output.index("{") :])["students"]["1"]["removed"] == [1]
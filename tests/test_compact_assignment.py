@@ -0,0 +1,75 @@
+import json
+import random
+
+import pytest
+
+from assignment import ActivityIDNotAssigned, Assignment, NotAssignedToActivity, StudentIDNotAssigned
+from compact_assignment import CompactAssignment
+
+
+def test_compact_assignment_matches_assignment():
+    rng = random.Random(0)
+    reference = Assignment()
+    compact = CompactAssignment()
+    for step in range(3000):
+        if step % 250 == 0:
+            # Queries merge the pending changes into the arrays, which the later changes then build on.
+            assert compact == reference
+        student_id, activity_id = rng.randint(1, 150), rng.randint(1, 90)
+        if rng.random() < 0.7:
+            reference.assign_student_to_activity_by_id(student_id, activity_id)
+            compact.assign_student_to_activity_by_id(student_id, activity_id)
+        elif reference.student_known(student_id) and activity_id in reference.get_activities_for_student(student_id):
+            reference.remove_student_from_activity_by_id(student_id, activity_id)
+            compact.remove_student_from_activity_by_id(student_id, activity_id)
+
+    assert compact == reference and reference == compact
+    for student_id in range(1, 152):
+        assert compact.student_known(student_id) == reference.student_known(student_id)
+        if reference.student_known(student_id):
+            assert sorted(compact.get_activities_for_student(student_id)) == sorted(
+                reference.get_activities_for_student(student_id)
+            )
+    for activity_id in range(1, 92):
+        assert compact.activity_known(activity_id) == reference.activity_known(activity_id)
+        assert compact.participant_count(activity_id) == reference.participant_count(activity_id)
+        if reference.activity_known(activity_id):
+            assert sorted(compact.get_students_for_activity(activity_id)) == sorted(
+                reference.get_students_for_activity(activity_id)
+            )
+
+
+def test_compact_assignment_dict_format(example_assignment):
+    compact = CompactAssignment.from_assignment(example_assignment)
+    assert compact == example_assignment
+    # Both implementations read each other's saved format, also after a JSON round trip with string keys.
+    assert Assignment.from_dict(json.loads(json.dumps(compact.as_dict()))) == example_assignment
+    assert CompactAssignment.from_dict(json.loads(json.dumps(example_assignment.as_dict()))) == compact
+
+
+def test_compact_assignment_counts_and_errors():
+    assignment = CompactAssignment.from_pairs([(1, 1), (1, 1), (2, 1), (2, 9)])
+    assert assignment.participant_count(1) == 2 and assignment.participant_count(5) == 0
+    assert not assignment.is_empty()
+
+    assignment.remove_student_from_activity_by_id(2, 9)
+    assert assignment.get_activities_for_student(2) == [1]
+    assert assignment.get_students_for_activity(9) == []
+    with pytest.raises(NotAssignedToActivity):
+        assignment.remove_student_from_activity_by_id(2, 9)
+    with pytest.raises(StudentIDNotAssigned):
+        assignment.get_activities_for_student(3)
+    with pytest.raises(ActivityIDNotAssigned):
+        assignment.get_students_for_activity(3)
+
+    assignment.remove_student_from_activity_by_id(1, 1)
+    assignment.remove_student_from_activity_by_id(2, 1)
+    assert assignment.is_empty() and assignment.student_known(1)
+
+
+def test_compact_assignment_validity(example_students, example_activities, example_assignment):
+    example_activities[0].max_capacity = 0
+    compact = CompactAssignment.from_assignment(example_assignment)
+    assert list(map(str, compact.check_validity(example_students, example_activities))) == list(
+        map(str, example_assignment.check_validity(example_students, example_activities))
+    )
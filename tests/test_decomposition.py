@@ -0,0 +1,123 @@
+import multiprocessing
+import random
+import time
+from threading import Event, Thread
+
+import numpy as np
+import pytest
+
+from activity import Activity, Timespan
+from assignment import objective_value, solve_assignment
+from decomposition import find_components, split_model, solve_decomposed
+from model import AssignmentModel, build_model
+import solver
+from solver import SolverBackend, SolverSettings, solve_model
+from student import Student
+
+
+@pytest.fixture
+def separated_school() -> tuple[list[Student], list[Activity]]:
+    rng = random.Random(3)
+    activities = [
+        Activity(
+            name=str(idx),
+            min_capacity=rng.randint(0, 1),
+            max_capacity=rng.randint(2, 4),
+            timespan=Timespan.from_day_hour_minute(idx % 3, 14, 0, idx % 3, 16, 0),
+            valid_grades=[grade == idx % 4 for grade in range(4)],
+        )
+        for idx in range(16)
+    ]
+    students = []
+    for idx in range(60):
+        grade = rng.randint(1, 4)
+        grade_activities = [activity for activity in activities if activity.is_valid_grade(grade)]
+        preferences = {activity.id: rng.randint(1, 3) for activity in rng.sample(grade_activities, 2)}
+        students.append(Student(name=str(idx), grade=grade, subgrade="a", preferences=preferences))
+    return students, activities
+
+
+def test_find_components():
+    activities = [Activity(name="A"), Activity(name="B"), Activity(name="C")]
+    students = [
+        Student(name="A", grade=1, subgrade="a", preferences={1: 1}),
+        Student(name="B", grade=1, subgrade="a", preferences={1: 1, 2: 1}),
+        Student(name="C", grade=1, subgrade="a", preferences={3: 1}),
+        Student(name="D", grade=1, subgrade="a", preferences={}),
+    ]
+    components = find_components(build_model(students, activities))
+    assert components[0] == components[1]
+    assert len({components[0], components[2], components[3]}) == 3
+
+
+def test_split_model_covers_all_columns(separated_school):
+    students, activities = separated_school
+    model = build_model(students, activities)
+    chunks = split_model(model, 3)
+    assert len(chunks) == 3
+    columns = np.sort(np.concatenate([columns for _, columns in chunks]))
+    assert np.array_equal(columns, np.arange(model.n_columns))
+    assert sum(chunk.n_rows for chunk, _ in chunks) == model.n_rows
+
+
+def test_solve_decomposed(separated_school):
+    students, activities = separated_school
+    model = build_model(students, activities)
+    full = solve_model(model, SolverSettings())
+    decomposed = solve_decomposed(model, SolverSettings(workers=2))
+    assert decomposed.status == full.status == "Optimal"
+    assert decomposed.objective == full.objective
+
+
+def test_solve_assignment_with_workers(separated_school):
+    students, activities = separated_school
+    result = solve_assignment(students, activities, SolverSettings(workers=2))
+    assert result.status == "Optimal"
+    assert objective_value(students, result.assignment) == result.objective
+    assert result.objective == solve_assignment(students, activities).objective
+
+
+class SleepBackend(SolverBackend):
+    # Sleeps through the whole time limit unless cancelled, like a solver on a hard model.
+    def build(self, model) -> None:
+        self.values = np.zeros(model.n_columns)
+        self.cancelled = Event()
+
+    def solve(self, settings, initial_values=None, progress_callback=None) -> str:
+        self.cancelled.wait(60 if settings.time_limit is None else settings.time_limit)
+        return "Not Solved"
+
+    def extract(self) -> np.ndarray:
+        return self.values
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+
+@pytest.fixture
+def sleeping_chunks(monkeypatch) -> AssignmentModel:
+    # The workers are forked from this process and so know the backend as well.
+    monkeypatch.setitem(solver.BACKENDS, "sleep", SleepBackend)
+    activities = [Activity(name=str(idx)) for idx in range(8)]
+    students = [
+        Student(name=str(idx), grade=1, subgrade="a", preferences={activity.id: 1})
+        for idx, activity in enumerate(activities)
+    ]
+    return build_model(students, activities)
+
+
+def test_solve_decomposed_shares_time_limit(sleeping_chunks):
+    # 8 chunks on 2 workers run in 4 rounds; together they still only get the time limit once.
+    start = time.monotonic()
+    solve_decomposed(sleeping_chunks, SolverSettings(backend="sleep", workers=2, time_limit=0.5))
+    assert time.monotonic() - start < 1.5
+
+
+def test_solve_decomposed_cancel_stops_running_chunks(sleeping_chunks):
+    cancel_event = Event()
+    Thread(target=lambda: time.sleep(0.5) or cancel_event.set(), daemon=True).start()
+    start = time.monotonic()
+    result = solve_decomposed(sleeping_chunks, SolverSettings(backend="sleep", workers=2), cancel_event=cancel_event)
+    assert result.status == "Not Solved"
+    assert time.monotonic() - start < 2
+    assert multiprocessing.active_children() == []
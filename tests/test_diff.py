@@ -0,0 +1,54 @@
+import random
+
+from assignment import Assignment
+from compact_assignment import CompactAssignment
+from diff import diff, format_diff
+
+
+def test_diff_pairs(example_students, example_activities, example_assignment):
+    after = Assignment.from_pairs([(1, 2), (2, 1), (3, 2)])
+    assignment_diff = diff(example_assignment, after)
+
+    assert assignment_diff.added_pairs() == [(2, 1), (3, 2)]
+    assert assignment_diff.removed_pairs() == [(1, 1), (2, 2)]
+    assert [change.student_id for change in assignment_diff.moved_students()] == [2]
+    assert list(assignment_diff.students) == [1, 2, 3]
+    assert assignment_diff.activities[1].added == [2] and assignment_diff.activities[1].removed == [1]
+    assert assignment_diff.activities[2].added == [3] and assignment_diff.activities[2].removed == [2]
+    assert diff(after, example_assignment).added_pairs() == assignment_diff.removed_pairs()
+
+    assert format_diff(assignment_diff, example_students, example_activities).splitlines() == [
+        "3 Kinder mit geänderter Zuteilung, davon 1 mit Kurswechsel.",
+        "",
+        "A (1a): - A",
+        "B (2b): B -> A",
+        "Kind 3: + B",
+        "",
+        "A: +1 / -1",
+        "B: +1 / -1",
+    ]
+
+
+def test_diff_matches_sets():
+    rng = random.Random(0)
+    pairs_before = {(rng.randint(1, 200), rng.randint(1, 30)) for _ in range(500)}
+    pairs_after = {pair for pair in pairs_before if rng.random() < 0.8} | {
+        (rng.randint(1, 200), rng.randint(1, 30)) for _ in range(100)
+    }
+    before, after = Assignment.from_pairs(pairs_before), CompactAssignment.from_pairs(pairs_after)
+    after.remove_student_from_activity_by_id(*sorted(pairs_after)[0])
+    pairs_after.remove(sorted(pairs_after)[0])
+
+    assignment_diff = diff(before, after)
+    assert set(assignment_diff.added_pairs()) == pairs_after - pairs_before
+    assert set(assignment_diff.removed_pairs()) == pairs_before - pairs_after
+    assert diff(after, CompactAssignment.from_pairs(pairs_after)).is_empty()
+
+
+def test_diff_large_and_negative_ids():
+    # IDs from save files are arbitrary integers; packing them into one 64 bit key would let these pairs collide.
+    before = Assignment.from_pairs([(1, 2**32 + 5), (-1, 5)])
+    after = Assignment.from_pairs([(1, 5), (2**33, 7)])
+    assignment_diff = diff(before, after)
+    assert assignment_diff.added_pairs() == [(1, 5), (2**33, 7)]
+    assert assignment_diff.removed_pairs() == [(-1, 5), (1, 2**32 + 5)]
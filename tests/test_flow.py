@@ -0,0 +1,80 @@
+import random
+from collections import Counter
+
+import pytest
+
+from activity import Activity, Timespan
+from assignment import is_transportation_problem, objective_value, solve_assignment
+from solver import SolverSettings
+from student import Student
+
+
+def transportation_instance(seed: int) -> tuple[list[Student], list[Activity]]:
+    rng = random.Random(seed)
+    activities = [
+        Activity(
+            name=str(idx),
+            max_capacity=rng.choice([1, 2, 3, 5, float("inf")]),
+            timespan=Timespan.from_day_hour_minute(idx % 7, 14, 0, idx % 7, 16, 0),
+            valid_grades=[rng.random() < 0.8 for _ in range(4)],
+        )
+        for idx in range(7)
+    ]
+    students = [
+        Student(
+            name=str(idx),
+            grade=rng.randint(1, 4),
+            subgrade="a",
+            preferences={activity.id: rng.choice([1, 2, 3]) for activity in rng.sample(activities, rng.randint(0, 4))},
+        )
+        for idx in range(30)
+    ]
+    # Guarantees only where they still fit, otherwise the presolve rejects the instance.
+    guaranteed = Counter()
+    for student in students:
+        for activity in activities:
+            if (
+                activity.id in student.preferences
+                and activity.is_valid_grade(student.grade)
+                and guaranteed[activity.id] < activity.max_capacity
+                and rng.random() < 0.2
+            ):
+                student.preferences[activity.id] = -100
+                guaranteed[activity.id] += 1
+    return students, activities
+
+
+def test_is_transportation_problem():
+    activities = [
+        Activity(name="A", timespan=Timespan(0, 4)),
+        Activity(name="B", timespan=Timespan(2, 6)),
+        Activity(name="C", timespan=Timespan(4, 8)),
+    ]
+    students = [Student(name="A", grade=1, subgrade="a", preferences={1: 1, 3: 1})]
+    assert is_transportation_problem(students, activities)
+
+    students.append(Student(name="B", grade=1, subgrade="a", preferences={1: 1, 2: 1}))
+    assert not is_transportation_problem(students, activities)
+
+    activities[1].valid_grades = [False, True, True, True]
+    assert is_transportation_problem(students, activities)
+
+    activities[2].min_capacity = 1
+    assert not is_transportation_problem(students, activities)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_flow_matches_milp(seed):
+    students, activities = transportation_instance(seed)
+    assert is_transportation_problem(students, activities)
+
+    flow = solve_assignment(students, activities)
+    milp = solve_assignment(students, activities, SolverSettings(flow_fast_path=False))
+    assert flow.status == "Optimal"
+    assert flow.objective == milp.objective
+    assert objective_value(students, flow.assignment) == flow.objective
+    assert all(
+        flow.assignment.participant_count(activity.id) <= activity.max_capacity
+        for activity in activities
+        if flow.assignment.activity_known(activity.id)
+    )
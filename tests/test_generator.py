@@ -0,0 +1,38 @@
+from activity import Timespan
+from assignment import is_transportation_problem, solve_assignment
+from generator import GeneratorSettings, generate_instance
+
+
+def test_generator_is_seeded():
+    settings = GeneratorSettings(n_students=200, n_activities=15)
+    assert generate_instance(settings, 3) == generate_instance(settings, 3)
+    assert generate_instance(settings, 3) != generate_instance(settings, 4)
+
+
+def test_generator_settings():
+    settings = GeneratorSettings(
+        n_students=400,
+        n_activities=20,
+        preference_count_weights=[0, 1],
+        overlap_density=0.0,
+        capacity_tightness=2.0,
+        min_capacity_share=0.0,
+    )
+    students, activities = generate_instance(settings)
+    assert len(students) == 400 and len(activities) == 20
+    assert all(len(student.preferences) == 2 for student in students)
+    assert all(
+        activities[activity_id - 1].is_valid_grade(student.grade)
+        for student in students
+        for activity_id in student.preferences
+    )
+    assert all(activity.timespan == Timespan(0, 0) and activity.min_capacity == 0 for activity in activities)
+    assert sum(activity.max_capacity for activity in activities) < len(students)
+    assert is_transportation_problem(students, activities)
+
+
+def test_generated_instance_solves():
+    students, activities = generate_instance(GeneratorSettings(n_students=300, n_activities=20, overlap_density=1.0))
+    assert not is_transportation_problem(students, activities)
+    result = solve_assignment(students, activities)
+    assert result.status == "Optimal"
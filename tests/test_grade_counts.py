@@ -0,0 +1,53 @@
+import random
+from collections import Counter
+
+from assignment import Assignment
+from compact_assignment import CompactAssignment
+from grade_counts import GradeCountIndex
+from student import Student
+
+
+def test_grade_count_index_follows_edits():
+    rng = random.Random(0)
+    students = [
+        Student(name=str(idx), grade=rng.randint(1, 4), subgrade=rng.choice("ab"), id=idx) for idx in range(1, 61)
+    ]
+    assignment = CompactAssignment.from_pairs((rng.randint(1, 70), rng.randint(1, 12)) for _ in range(150))
+    index = GradeCountIndex(students, assignment, by_class=True)
+    student_map = {student.id: student for student in students}
+
+    for step in range(400):
+        student_id, activity_id = rng.randint(1, 70), rng.randint(1, 14)
+        if rng.random() < 0.6:
+            index.assign_student_to_activity_by_id(student_id, activity_id)
+        elif assignment.student_known(student_id) and activity_id in assignment.get_activities_for_student(student_id):
+            index.remove_student_from_activity_by_id(student_id, activity_id)
+        if step % 50 == 0:
+            student = student_map[rng.randint(1, 60)]
+            student.grade, student.subgrade = rng.randint(1, 4), "c"
+            index.update_student(student)
+
+        if step % 40 == 0:
+            for activity_id in range(1, 15):
+                members = [
+                    student_map[student_id]
+                    for student_id in (
+                        assignment.get_students_for_activity(activity_id)
+                        if assignment.activity_known(activity_id)
+                        else []
+                    )
+                    if student_id in student_map
+                ]
+                grades = Counter(student.grade for student in members)
+                assert index.grade_counts(activity_id) == [grades[grade] for grade in range(1, 5)]
+                assert index.class_counts(activity_id) == Counter(
+                    f"{student.grade}{student.subgrade}" for student in members
+                )
+
+
+def test_grade_count_index_example(example_students, example_assignment):
+    index = GradeCountIndex(example_students, example_assignment)
+    assert index.grade_counts(1) == [1, 0, 0, 0]
+    assert index.grade_counts(2) == [1, 1, 0, 0]
+    assert index.grade_counts(3) == [0, 0, 0, 0]
+    assert GradeCountIndex([], Assignment()).grade_counts(1) == [0, 0, 0, 0]
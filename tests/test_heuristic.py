@@ -0,0 +1,144 @@
+import random
+
+import pytest
+
+from activity import Activity, Timespan
+from assignment import ActivityIDNotAssigned, objective_value, solve_assignment
+from cli import main
+from heuristic import HeuristicSettings, solve_heuristic
+from presolve import MinimumCapacityUnreachable
+from solver import SolverSettings, available_backends
+from state import State
+from student import GUARANTEED_PREFERENCE, Student
+
+
+def random_instance(seed: int) -> tuple[list[Student], list[Activity]]:
+    rng = random.Random(seed)
+    activities = [
+        Activity(
+            name=str(idx),
+            min_capacity=rng.randint(0, 2),
+            max_capacity=rng.randint(3, 8),
+            timespan=Timespan.from_day_hour_minute(day, hour, 0, day, hour + 2, 0),
+            valid_grades=[rng.random() < 0.8 for _ in range(4)],
+        )
+        for idx, (day, hour) in enumerate((rng.randint(0, 2), rng.randint(12, 15)) for _ in range(15))
+    ]
+    students = [
+        Student(
+            name=str(idx),
+            grade=rng.randint(1, 4),
+            subgrade="a",
+            preferences={activity.id: rng.randint(1, 3) for activity in rng.sample(activities, rng.randint(1, 4))},
+        )
+        for idx in range(60)
+    ]
+    return students, activities
+
+
+def test_heuristic(example_students, example_activities, example_assignment):
+    result = solve_heuristic(example_students, example_activities, HeuristicSettings(seed=0))
+    assert result.status == "Feasible"
+    assert result.assignment == example_assignment
+    assert result.objective == objective_value(example_students, example_assignment)
+
+
+def test_heuristic_non_existing_preference(example_activities):
+    students = [Student(name="A", grade=1, subgrade="a", preferences={3: 1})]
+    with pytest.raises(ActivityIDNotAssigned):
+        solve_heuristic(students, example_activities)
+
+
+def test_heuristic_repairs_minimum_capacity():
+    activities = [Activity(name="A", max_capacity=3), Activity(name="B", min_capacity=2, max_capacity=2)]
+    students = [
+        Student(name=str(idx), grade=1, subgrade="a", preferences={activities[0].id: 1, activities[1].id: 3})
+        for idx in range(3)
+    ]
+    for activity in activities:
+        activity.timespan = Timespan(0, 4)
+
+    result = solve_heuristic(students, activities, HeuristicSettings(seed=1))
+    assert result.status == "Feasible"
+    assert result.assignment.participant_count(activities[1].id) == 2
+    assert result.objective == solve_assignment(students, activities).objective
+
+
+@pytest.mark.parametrize("seed", [0, 1, 3])
+def test_heuristic_random_instances(seed):
+    students, activities = random_instance(seed)
+    optimum = solve_assignment(students, activities)
+    result = solve_heuristic(students, activities, HeuristicSettings(iterations=20_000, seed=seed))
+    assert result.status == "Feasible"
+    assert result.objective == objective_value(students, result.assignment)
+    assert optimum.objective - 0.01 * abs(optimum.objective) <= result.objective <= optimum.objective
+
+
+def test_heuristic_presolve_errors():
+    students, activities = random_instance(2)
+    with pytest.raises(MinimumCapacityUnreachable):
+        solve_assignment(students, activities)
+    with pytest.raises(MinimumCapacityUnreachable):
+        solve_heuristic(students, activities, HeuristicSettings(iterations=1000, seed=0))
+
+
+def test_heuristic_reports_violations():
+    # Both overlapping courses have enough candidates on their own, but each child can only take one of them.
+    activities = [
+        Activity(name="A", min_capacity=2, max_capacity=2, timespan=Timespan(0, 4)),
+        Activity(name="B", min_capacity=2, max_capacity=2, timespan=Timespan(0, 4)),
+    ]
+    students = [
+        Student(name=str(idx), grade=1, subgrade="a", preferences={activities[0].id: 1, activities[1].id: 1})
+        for idx in range(2)
+    ]
+    assert solve_heuristic(students, activities, HeuristicSettings(iterations=1000, seed=0)).status == "Not Solved"
+
+
+def test_heuristic_keeps_guaranteed_preferences():
+    # Without the fixing, C in A and D in B would score better than leaving C without a course.
+    activities = [Activity(name="A", max_capacity=1), Activity(name="B", max_capacity=1)]
+    students = [
+        Student(name="C", grade=1, subgrade="a", preferences={activities[0].id: 1}),
+        Student(
+            name="D", grade=1, subgrade="a", preferences={activities[0].id: GUARANTEED_PREFERENCE, activities[1].id: 1}
+        ),
+    ]
+    for seed in range(5):
+        result = solve_heuristic(students, activities, HeuristicSettings(iterations=1000, seed=seed))
+        assert result.assignment.get_students_for_activity(activities[0].id) == [students[1].id]
+        assert result.objective == solve_assignment(students, activities).objective
+
+
+def test_heuristic_progress_and_time_limit():
+    students, activities = random_instance(0)
+    objectives = []
+    result = solve_heuristic(
+        students, activities, HeuristicSettings(iterations=10**9, time_limit=0.2, seed=0), objectives.append
+    )
+    assert objectives == sorted(objectives)
+    assert objectives[-1] == result.objective
+
+
+def test_heuristic_backend(example_students, example_activities, example_assignment, tmp_path, example_state):
+    assert "heuristic" in available_backends(include_heuristic=True) and "heuristic" not in available_backends()
+    result = solve_assignment(example_students, example_activities, SolverSettings(backend="heuristic"))
+    assert result.assignment == example_assignment and result.stats.path == "heuristic"
+
+    example_state.reset_assignment().write(tmp_path / "state.json")
+    assert main(["solve", str(tmp_path / "state.json"), "--backend", "heuristic"]) == 0
+    assert State().read(tmp_path / "state.json").assignment == example_assignment
+
+
+def test_heuristic_long_ejection_chain():
+    # The last child only fits if each of the others moves on to their second choice, one course further along.
+    activities = [Activity(name=str(idx), max_capacity=1) for idx in range(7)]
+    students = [
+        Student(name=str(idx), grade=1, subgrade="a", preferences={activities[idx].id: 1, activities[idx + 1].id: 3})
+        for idx in range(6)
+    ] + [Student(name="6", grade=1, subgrade="a", preferences={activities[0].id: 1})]
+    optimum = solve_assignment(students, activities)
+    for seed in range(5):
+        result = solve_heuristic(students, activities, HeuristicSettings(iterations=0, seed=seed))
+        assert all(result.assignment.get_activities_for_student(student.id) for student in students)
+        assert result.objective == optimum.objective
@@ -0,0 +1,155 @@
+import copy
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+
+from activity import Activity, Timespan
+from assignment import Assignment
+from grade_counts import GradeCountIndex
+from journal import Journal, JournalTargetMissing, Operation
+from state import State
+from student import Student
+
+
+@pytest.fixture
+def journal(example_state) -> Journal:
+    journal = Journal()
+    journal.clear()
+    return journal
+
+
+EDITS = [
+    lambda journal: journal.add_student(Student(name="C", grade=3, subgrade="a", preferences={1: 2})),
+    lambda journal: journal.edit_student(journal.state.students[0], name="D", preferences={2: 1}),
+    lambda journal: journal.assign_student_to_activity_by_id(2, 1),
+    lambda journal: journal.remove_student_from_activity_by_id(1, 1),
+    lambda journal: journal.edit_activity(journal.state.activities[1], max_capacity=5, timespan=Timespan(10, 20)),
+    lambda journal: journal.split_activity(journal.state.activities[0]),
+    lambda journal: journal.remove_student_by_id(2),
+    lambda journal: journal.add_activity(Activity(name="E", max_capacity=3)),
+    lambda journal: journal.remove_activity_by_id(2),
+    lambda journal: journal.set_assignment(Assignment.from_pairs([(1, 1)])),
+]
+
+
+def test_journal_undo_redo(journal):
+    state = State()
+    snapshots = [copy.deepcopy(state.as_dict())]
+    for edit in EDITS:
+        edit(journal)
+        snapshots.append(copy.deepcopy(state.as_dict()))
+
+    for snapshot in reversed(snapshots[:-1]):
+        assert journal.undo()
+        assert state.as_dict() == snapshot
+    assert not journal.undo() and not journal.can_undo()
+
+    for snapshot in snapshots[1:]:
+        assert journal.redo()
+        assert state.as_dict() == snapshot
+    assert not journal.redo()
+
+    # A new edit after an undo drops the undone steps.
+    journal.undo()
+    journal.remove_student_by_id(1)
+    assert not journal.can_redo()
+
+
+def _assert_indexes(journal: Journal) -> None:
+    # check_validity and a freshly built index are the reference for the indexes the journal keeps up to date.
+    state = journal.state
+    assert list(map(str, journal.violations.violations())) == list(
+        map(str, state.assignment.check_validity(state.students, state.activities))
+    )
+    fresh = GradeCountIndex(state.students, state.assignment)
+    for activity in state.activities:
+        assert journal.grade_counts.grade_counts(activity.id) == fresh.grade_counts(activity.id)
+
+
+def test_journal_keeps_indexes(journal):
+    state = State()
+    state.activities[0].max_capacity = 1
+    journal.clear()
+    moves = [
+        lambda journal: journal.assign_student_to_activity_by_id(2, 1),
+        lambda journal: journal.edit_student(journal.state.students[1], grade=1, preferences={2: 1}),
+        lambda journal: journal.edit_activity(
+            journal.state.activities[0], timespan=journal.state.activities[1].timespan
+        ),
+        lambda journal: journal.assign_student_to_activity_by_id(1, 2),
+        lambda journal: journal.remove_student_from_activity_by_id(2, 2),
+    ]
+    _assert_indexes(journal)
+    for edit in moves + EDITS:
+        edit(journal)
+        _assert_indexes(journal)
+    while journal.undo():
+        _assert_indexes(journal)
+    while journal.redo():
+        _assert_indexes(journal)
+
+
+def test_journal_split_is_one_step(journal):
+    state = State()
+    before = copy.deepcopy(state.as_dict())
+    twin = journal.split_activity(state.activities[0])
+    assert [activity.name for activity in state.activities] == ["A 1", "B", "A 2"]
+    assert state.students[0].preferences[twin.id] == 1
+    journal.undo()
+    assert state.as_dict() == before
+    assert not journal.can_undo()
+
+
+def test_journal_log_replay(journal, tmp_path: Path):
+    state = State()
+    start = copy.deepcopy(state.as_dict())
+    log_path = tmp_path / "journal.jsonl"
+    journal.clear(log_path)
+    for edit in EDITS:
+        edit(journal)
+    journal.undo()
+    journal.undo()
+    journal.redo()
+    end = copy.deepcopy(state.as_dict())
+
+    state.from_dict(start)
+    journal.replay(log_path)
+    assert state.as_dict() == end
+    journal.undo()
+    journal.undo()
+    assert len(log_path.read_text().splitlines()) == 15
+
+    state.from_dict(start)
+    journal.replay(log_path)
+    assert state.as_dict() != end
+    journal.redo()
+    journal.redo()
+    assert state.as_dict() == end
+
+
+def test_operation_dict_round_trip(journal):
+    journal.split_activity(journal.state.activities[1])
+    operation = journal._undo_stack[-1]
+    assert Operation.from_dict(operation.to_dict()).to_dict() == operation.to_dict()
+
+
+def test_journal_missing_target(journal):
+    journal.edit_student(journal.state.students[0], name="D")
+    # Removed behind the journal's back, e.g. by a dialog that still held the student.
+    journal.state.students.pop(0)
+    with pytest.raises(JournalTargetMissing):
+        journal.undo()
+    assert journal.can_undo() and not journal.can_redo()
+
+
+def test_operation_must_implement_revert():
+    @dataclass
+    class ApplyOnly(Operation):
+        kind = "apply_only"
+
+        def apply(self, state: State) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        ApplyOnly()
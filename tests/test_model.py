@@ -0,0 +1,61 @@
+from activity import Activity, Timespan
+from model import build_model, read_cbc_solution, write_mps
+from student import Student
+
+
+def test_model_only_contains_valid_pairs(example_students, example_activities):
+    example_students[1].grade = 3
+    model = build_model(example_students, example_activities)
+    assert model.n_pairs == 2
+    assert model.n_columns == model.n_pairs + len(example_students)
+    assert set(zip(model.pair_students.tolist(), model.pair_activities.tolist())) == {(0, 0), (0, 1)}
+
+
+def test_model_clique_rows():
+    activities = [
+        Activity(name="A", timespan=Timespan(0, 4)),
+        Activity(name="B", timespan=Timespan(2, 6)),
+        Activity(name="C", timespan=Timespan(3, 8)),
+    ]
+    students = [
+        Student(name="A", grade=1, subgrade="a", preferences={1: 1, 2: 2, 3: 3}),
+        Student(name="B", grade=1, subgrade="a", preferences={1: 1}),
+    ]
+    model = build_model(students, activities)
+
+    # Two cover rows and a single at-most-one row for the first student.
+    assert model.n_rows == 3
+    clique_row = model.row_indices == 2
+    assert sorted(model.col_indices[clique_row].tolist()) == [0, 1, 2]
+    assert model.row_upper[2] == 1
+
+
+def test_mps_round_trip(example_students, example_activities, tmp_path):
+    model = build_model(example_students, example_activities)
+    write_mps(model, tmp_path / "model.mps")
+    content = (tmp_path / "model.mps").read_text()
+    assert content.startswith("NAME")
+    assert content.rstrip().endswith("ENDATA")
+
+    (tmp_path / "model.sol").write_text(
+        "Optimal - objective value -26.00000000\n"
+        "      0 C0                     1                      -9\n"
+        "      1 C1                     1                      -9\n"
+        "      2 C2                     1                      -9\n"
+    )
+    status, values = read_cbc_solution(model, tmp_path / "model.sol")
+    assert status == "Optimal"
+    assert model.assigned_pairs(values) == [(1, 1), (1, 2), (2, 2)]
+
+
+def test_read_cbc_solution_marks_and_gaps(example_students, example_activities, tmp_path):
+    model = build_model(example_students, example_activities)
+    (tmp_path / "model.sol").write_text(
+        "Stopped on time - objective value -26.00000000\n"
+        "      0 C0                     1                      -9\n"
+        "**    2 C2                  0.99                      -9\n"
+        "      4 C4                     1                       0\n"
+    )
+    status, values = read_cbc_solution(model, tmp_path / "model.sol")
+    assert status == "Feasible"
+    assert values.tolist() == [1, 0, 0.99, 0, 1]
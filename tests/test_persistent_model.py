@@ -0,0 +1,235 @@
+import copy
+import random
+
+import pytest
+
+import model
+import presolve
+import solver
+from activity import Activity, Timespan
+from assignment import Assignment, solve_assignment
+from generator import GeneratorSettings, generate_instance
+from journal import Journal
+from model import AssignmentModel, build_model
+from presolve import GuaranteedCapacityExceeded
+from presolve import presolve as fresh_presolve
+from solver import SolverSettings, SolveStats
+from state import State
+from student import GUARANTEED_PREFERENCE, Student
+from symmetry import aggregate_interchangeable
+
+
+@pytest.fixture
+def journal() -> Journal:
+    students, activities = generate_instance(GeneratorSettings(n_students=120, n_activities=10, overlap_density=1.0))
+    State().set_students(students).set_activities(activities).set_assignment(Assignment())
+    journal = Journal()
+    journal.clear()
+    return journal
+
+
+def _canonical(assignment_model: AssignmentModel) -> tuple:
+    # The model up to the order of its columns and rows, each column named by its student and activity.
+    keys = [
+        (student_id, activity_id)
+        for student_id, activity_id in zip(
+            assignment_model.student_ids[assignment_model.pair_students].tolist(),
+            assignment_model.activity_ids[assignment_model.pair_activities].tolist(),
+        )
+    ] + [(student_id, -1) for student_id in assignment_model.student_ids.tolist()]
+    columns = sorted(
+        zip(
+            keys,
+            assignment_model.objective.tolist(),
+            assignment_model.col_lower.tolist(),
+            assignment_model.col_upper.tolist(),
+        )
+    )
+    entries: list[list[tuple]] = [[] for _ in range(assignment_model.n_rows)]
+    for row, col, coefficient in zip(
+        assignment_model.row_indices.tolist(),
+        assignment_model.col_indices.tolist(),
+        assignment_model.coefficients.tolist(),
+    ):
+        entries[row].append((keys[col], coefficient))
+    rows = sorted(
+        (tuple(sorted(row)), lower, upper)
+        for row, lower, upper in zip(entries, assignment_model.row_lower.tolist(), assignment_model.row_upper.tolist())
+    )
+    return columns, rows
+
+
+def _fresh_model(students: list[Student], activities: list[Activity]) -> AssignmentModel:
+    aggregation = aggregate_interchangeable(students, activities)
+    if aggregation is not None:
+        students, activities = aggregation.students, aggregation.activities
+    return build_model(students, activities, fresh_presolve(students, activities))
+
+
+def _random_edit(journal: Journal, rng: random.Random) -> None:
+    state = journal.state
+    student = rng.choice(state.students)
+    activity = rng.choice(state.activities)
+    activity_ids = [activity.id for activity in state.activities]
+    choice = rng.randrange(9)
+    if choice == 0:
+        chosen = rng.sample(activity_ids, rng.randint(1, 3))
+        preferences = {activity_id: rng.choice([1, 2, 3, GUARANTEED_PREFERENCE]) for activity_id in chosen}
+        journal.edit_student(student, preferences=preferences)
+    elif choice == 1:
+        journal.edit_student(student, grade=rng.randint(1, 4))
+    elif choice == 2:
+        preferences = {activity_id: 1 for activity_id in rng.sample(activity_ids, 2)}
+        journal.add_student(
+            Student(name="Neu", grade=2, subgrade="a", preferences=preferences, id=10000 + rng.randrange(10**6))
+        )
+    elif choice == 3:
+        journal.remove_student_by_id(student.id)
+    elif choice == 4:
+        max_capacity = rng.randint(0, 20)
+        journal.edit_activity(activity, max_capacity=max_capacity, min_capacity=min(rng.randint(0, 3), max_capacity))
+    elif choice == 5:
+        journal.edit_activity(activity, valid_grades=[rng.random() < 0.8 for _ in range(4)])
+    elif choice == 6:
+        journal.edit_activity(activity, timespan=Timespan(*sorted(rng.sample(range(0, 60, 2), 2))))
+    elif choice == 7:
+        journal.split_activity(activity)
+    else:
+        journal.assign_student_to_activity_by_id(student.id, rng.choice(activity_ids))
+
+
+def test_persistent_model_follows_journal(journal):
+    rng = random.Random(0)
+    persistent_model = journal.persistent_model
+    n_patched = 0
+    for _ in range(60):
+        _random_edit(journal, rng)
+        if rng.random() < 0.3:
+            journal.undo()
+        students, activities = copy.deepcopy(journal.state.students), copy.deepcopy(journal.state.activities)
+        try:
+            expected = _canonical(_fresh_model(students, activities))
+        except presolve.InfeasibleInput as e:
+            with pytest.raises(type(e)):
+                persistent_model.checkout().prepare(students, activities, True, SolveStats())
+            continue
+        stats = SolveStats()
+        prepared = persistent_model.checkout().prepare(students, activities, True, stats)
+        assert _canonical(prepared.model) == expected
+        n_patched += "patch_model" in stats.phases
+    assert n_patched > 10
+
+
+def test_persistent_model_follows_presolve(journal):
+    # A guarantee that takes the last seat of a course drops the course for every other chooser, who did not change.
+    state = journal.state
+    persistent_model = journal.persistent_model
+
+    def prepare():
+        students, activities = copy.deepcopy(state.students), copy.deepcopy(state.activities)
+        return persistent_model.checkout().prepare(students, activities, True, SolveStats())
+
+    def check():
+        prepared = prepare()
+        assert _canonical(prepared.model) == _canonical(_fresh_model(prepared.students, prepared.activities))
+
+    activity = state.activities[0]
+    journal.edit_activity(activity, max_capacity=1, min_capacity=0)
+    check()
+    first, second, third = [student for student in state.students if activity.id not in student.preferences][:3]
+    journal.edit_student(first, preferences={activity.id: GUARANTEED_PREFERENCE})
+    check()
+    journal.edit_student(third, preferences={activity.id: 1, state.activities[1].id: 2})
+    check()
+    journal.edit_student(second, preferences={activity.id: GUARANTEED_PREFERENCE})
+    with pytest.raises(GuaranteedCapacityExceeded):
+        prepare()
+    while journal.undo():
+        check()
+
+
+def _count_calls(monkeypatch, module, name: str) -> list:
+    calls = []
+    function = getattr(module, name)
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return function(*args, **kwargs)
+
+    monkeypatch.setattr(module, name, counted)
+    return calls
+
+
+def test_persistent_model_reuses_work_on_cbc_mps(journal, monkeypatch):
+    state = journal.state
+    settings = SolverSettings(backend="cbc-mps", flow_fast_path=False)
+
+    def solve():
+        students, activities = copy.deepcopy(state.students), copy.deepcopy(state.activities)
+        initial_assignment = None if state.assignment.is_empty() else copy.deepcopy(state.assignment)
+        persistent_model = journal.persistent_model.checkout()
+        return solve_assignment(
+            students, activities, settings, initial_assignment=initial_assignment, persistent_model=persistent_model
+        )
+
+    built = _count_calls(monkeypatch, model, "_build_student_rows")
+    reduced = _count_calls(monkeypatch, presolve, "_reduce_student")
+    structures = _count_calls(monkeypatch, solver, "mps_structure")
+    journal.set_assignment(solve().assignment)
+    assert [len(args[0]) for args in built] == [len(state.students)]
+    assert len(reduced) == len(state.students) and len(structures) == 1
+
+    # Moving students by hand leaves the model as it is; CBC gets the same rows and columns again.
+    student = state.students[0]
+    for activity_id in state.assignment.get_activities_for_student(student.id):
+        journal.remove_student_from_activity_by_id(student.id, activity_id)
+    for calls in (built, reduced, structures):
+        calls.clear()
+    result = solve()
+    assert built == [] and reduced == [] and structures == []
+    assert "presolve" not in result.stats.phases
+
+    # Editing one student only builds that student's columns and rows, a new capacity those of the choosers.
+    journal.edit_student(state.students[1], preferences={state.activities[-1].id: 1})
+    for calls in (built, reduced, structures):
+        calls.clear()
+    result = solve()
+    assert [len(args[0]) for args in built] == [1]
+    assert len(reduced) == 1 and len(structures) == 1
+    assert "patch_model" in result.stats.phases and "presolve" not in result.stats.phases
+
+    activity = state.activities[0]
+    journal.edit_activity(activity, max_capacity=activity.max_capacity + 2)
+    for calls in (built, reduced, structures):
+        calls.clear()
+    result = solve()
+    n_choosers = sum(activity.id in student.preferences for student in state.students)
+    assert [len(args[0]) for args in built] == [n_choosers]
+    assert len(reduced) == n_choosers and len(structures) == 1
+
+    fresh = solve_assignment(
+        copy.deepcopy(state.students), copy.deepcopy(state.activities), settings, copy.deepcopy(state.assignment)
+    )
+    assert result.status == fresh.status == "Optimal"
+    assert result.objective == fresh.objective
+
+
+def test_persistent_model_remove_student_after_presolve_removal(example_state):
+    # A removed student leaves no pairs to build, while presolve still drops a pair of the other one.
+    state = State()
+    state.students[0].preferences = {1: GUARANTEED_PREFERENCE, 2: 1}
+    state.activities[1].timespan = Timespan(34, 40)
+    journal = Journal()
+    journal.clear()
+    settings = SolverSettings(backend="cbc-mps", flow_fast_path=False)
+
+    def solve():
+        students, activities = copy.deepcopy(state.students), copy.deepcopy(state.activities)
+        return solve_assignment(students, activities, settings, persistent_model=journal.persistent_model.checkout())
+
+    assert solve().status == "Optimal"
+    journal.remove_student_by_id(state.students[1].id)
+    result = solve()
+    fresh = solve_assignment(copy.deepcopy(state.students), copy.deepcopy(state.activities), settings)
+    assert result.status == fresh.status == "Optimal"
+    assert result.objective == fresh.objective
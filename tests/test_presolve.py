@@ -0,0 +1,78 @@
+import pytest
+
+from activity import Activity, Timespan
+from assignment import solve_assignment
+from model import build_model
+from presolve import (
+    GuaranteedActivitiesOverlap,
+    GuaranteedCapacityExceeded,
+    MinimumCapacityUnreachable,
+    presolve,
+)
+from solver import SolverSettings
+from student import GUARANTEED_PREFERENCE, Student
+
+
+def test_presolve_reductions():
+    activities = [
+        Activity(name="A", max_capacity=1, timespan=Timespan(0, 4)),
+        Activity(name="B", timespan=Timespan(2, 6)),
+        Activity(name="C", timespan=Timespan(6, 8)),
+    ]
+    a, b, c = (activity.id for activity in activities)
+    students = [
+        Student(name="A", grade=1, subgrade="a", preferences={a: GUARANTEED_PREFERENCE, b: 1, c: 2}),
+        Student(name="B", grade=1, subgrade="a", preferences={a: 1, c: 1}),
+    ]
+    reductions = presolve(students, activities)
+    assert reductions.fixed_pairs == {(students[0].id, a)}
+    # B overlaps the guaranteed course, and the only seat in A is taken.
+    assert reductions.removed_pairs == {(students[0].id, b), (students[1].id, a)}
+
+    full_model = build_model(students, activities)
+    model = build_model(students, activities, reductions)
+    assert model.n_pairs == full_model.n_pairs - 2
+    assert model.n_rows < full_model.n_rows
+    assert model.col_lower[: model.n_pairs].sum() == 1
+
+
+def test_presolve_errors():
+    activities = [
+        Activity(name="A", max_capacity=1, timespan=Timespan(0, 4)),
+        Activity(name="B", timespan=Timespan(2, 6)),
+    ]
+    a, b = (activity.id for activity in activities)
+    student = Student(name="A", grade=1, subgrade="a", preferences={a: GUARANTEED_PREFERENCE, b: GUARANTEED_PREFERENCE})
+    with pytest.raises(GuaranteedActivitiesOverlap):
+        presolve([student], activities)
+
+    students = [
+        Student(name="A", grade=1, subgrade="a", preferences={a: GUARANTEED_PREFERENCE}),
+        Student(name="B", grade=1, subgrade="a", preferences={a: GUARANTEED_PREFERENCE}),
+    ]
+    with pytest.raises(GuaranteedCapacityExceeded):
+        presolve(students, activities)
+
+    activities[1].min_capacity = 2
+    activities[1].valid_grades = [False, True, True, True]
+    students = [
+        Student(name="A", grade=1, subgrade="a", preferences={b: 1}),
+        Student(name="B", grade=2, subgrade="a", preferences={b: 1}),
+    ]
+    with pytest.raises(MinimumCapacityUnreachable):
+        presolve(students, activities)
+
+
+@pytest.mark.parametrize("flow_fast_path", [True, False])
+def test_guarantee_beats_no_course_penalty(flow_fast_path):
+    # As a mere objective weight the guarantee would lose against leaving the other student without a course.
+    activities = [Activity(name="A", max_capacity=1), Activity(name="B", max_capacity=1)]
+    a, b = (activity.id for activity in activities)
+    students = [
+        Student(name="A", grade=1, subgrade="a", preferences={a: GUARANTEED_PREFERENCE, b: 1}),
+        Student(name="B", grade=1, subgrade="a", preferences={a: 1}),
+    ]
+    result = solve_assignment(students, activities, SolverSettings(flow_fast_path=flow_fast_path))
+    assert result.status == "Optimal"
+    assert result.assignment.get_activities_for_student(students[0].id) == [a, b]
+    assert not result.assignment.student_known(students[1].id)
@@ -0,0 +1,69 @@
+import json
+
+from activity import Activity, ActivityIDGenerator, split_activity
+from cli import main
+from scenarios import Scenario, apply_scenario, format_comparison, run_scenarios
+from student import Student
+
+
+def test_split_activity(example_students, example_activities):
+    twin = split_activity(example_activities[1], example_students)
+    assert (example_activities[1].name, twin.name) == ("B 1", "B 2")
+    assert twin.id not in (activity.id for activity in example_activities)
+    assert twin.valid_grades == example_activities[1].valid_grades
+    assert twin.valid_grades is not example_activities[1].valid_grades
+    assert all(student.preferences[twin.id] == student.preferences[2] for student in example_students)
+
+
+def test_apply_scenario(example_students, example_activities):
+    scenario = Scenario(name="X", removed_activities=[1], max_capacities={2: 1}, split_activities=[2])
+    students, activities = apply_scenario(scenario, example_students, example_activities)
+    assert [activity.name for activity in activities] == ["B 1", "B 2"]
+    assert [activity.max_capacity for activity in activities] == [1, 1]
+    assert all(1 not in student.preferences for student in students)
+    # The base plan stays untouched.
+    assert len(example_activities) == 2 and example_activities[1].name == "B"
+    assert example_students[0].preferences == {1: 1, 2: 1}
+
+
+def test_run_scenarios(example_students, example_activities):
+    scenarios = [
+        Scenario(name="Basis"),
+        Scenario(name="Voll", max_capacities={2: 1}),
+        Scenario(name="Geteilt", max_capacities={2: 1}, split_activities=[2]),
+        Scenario(name="Unbekannt", removed_activities=[7]),
+        Scenario(name="Zu klein", min_capacities={1: 2}),
+    ]
+    results = run_scenarios(example_students, example_activities, scenarios, max_workers=2)
+    assert [result.name for result in results] == [scenario.name for scenario in scenarios]
+    base, full, split, unknown, too_small = results
+    assert (base.status, base.unassigned, base.preference_counts) == ("Optimal", 0, {1: 3})
+    assert full.unassigned == 0 and full.preference_counts == {1: 2}
+    assert split.objective == base.objective
+    assert unknown.status == too_small.status == "Infeasible"
+    assert unknown.error is not None and too_small.error is not None
+
+    table = format_comparison(results).splitlines()
+    assert table[0].split() == ["Szenario", "Status", "Zielwert", "Ohne", "Kurs", "Präf.", "1"]
+    assert len(table) == 1 + len(scenarios) + 2
+
+
+def test_cli_scenarios(tmp_path, capsys, example_state):
+    example_state.write(tmp_path / "state.json")
+    (tmp_path / "scenarios.json").write_text(json.dumps([{"name": "Ohne A", "removed_activities": [1]}]))
+    assert main(["scenarios", str(tmp_path / "state.json"), str(tmp_path / "scenarios.json"), "--workers", "1"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in lines[1:]] == ["Basis", "Ohne"]
+
+
+def test_scenario_ids_do_not_collide():
+    activities = [Activity(name="A", id=5), Activity(name="B", id=9)]
+    students = [Student(name="A", grade=1, subgrade="a", preferences={5: 1, 9: 2})]
+    _, activities = apply_scenario(Scenario(name="X", split_activities=[5]), students, activities)
+    assert len({activity.id for activity in activities}) == 3
+
+
+def test_scenarios_keep_the_id_generator(example_students, example_activities):
+    ActivityIDGenerator().reset(20)
+    run_scenarios(example_students, example_activities, [Scenario(name="X", split_activities=[1])], max_workers=1)
+    assert ActivityIDGenerator().get_current_id() == 20
@@ -0,0 +1,214 @@
+import random
+import time
+import warnings
+from threading import Event, Thread
+
+import numpy as np
+import pytest
+
+from activity import Activity, Timespan
+from generator import GeneratorSettings, generate_instance
+from model import build_model
+from solver import (
+    CPSAT_DEFAULT_TIME_LIMIT,
+    CUT_STRATEGIES,
+    HIGHS_REQUIRED_API,
+    SolverSettings,
+    SolveStats,
+    UnknownSolverBackend,
+    available_backends,
+    get_backend,
+    solve_model,
+)
+from student import Student
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_solve_model(example_students, example_activities, backend):
+    model = build_model(example_students, example_activities)
+    result = solve_model(model, SolverSettings(backend=backend))
+    assert result.status == "Optimal"
+    assert model.assigned_pairs(result.values) == [(1, 1), (1, 2), (2, 2)]
+    assert np.all(result.values[model.n_pairs :] == 0)
+    assert result.objective == 27
+    assert result.bound == 27
+    assert result.gap == 0
+
+
+def test_solve_stats_phases():
+    stats = SolveStats()
+    with stats.phase("outer"):
+        time.sleep(0.02)
+        with stats.phase("inner"):
+            time.sleep(0.05)
+    with stats.phase("inner"):
+        time.sleep(0.01)
+    assert list(stats.phases) == ["outer", "inner"]
+    assert 0.02 <= stats.phases["outer"] < 0.05
+    assert stats.phases["inner"] >= 0.06
+    assert stats.summary().startswith(f"{stats.total:.2f} s (outer")
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_solve_model_stats(example_students, example_activities, backend):
+    stats = SolveStats()
+    solve_model(build_model(example_students, example_activities), SolverSettings(backend=backend), stats=stats)
+    assert {"backend_build", "solver", "extract"} <= set(stats.phases)
+    if backend == "cbc-mps":
+        assert {"write_mps", "read_solution"} <= set(stats.phases)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("cuts", CUT_STRATEGIES)
+def test_solver_tuning_settings(example_students, example_activities, backend, cuts):
+    settings = SolverSettings(backend=backend, threads=2, seed=3, presolve=cuts != "auto", cuts=cuts)
+    result = solve_model(build_model(example_students, example_activities), settings)
+    assert result.status == "Optimal"
+    assert result.objective == 27
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_solve_infeasible_model(backend):
+    activity = Activity(name="A", min_capacity=2)
+    students = [Student(name="A", grade=1, subgrade="a", preferences={activity.id: 1})]
+    result = solve_model(build_model(students, [activity]), SolverSettings(backend=backend))
+    assert result.status == "Infeasible"
+
+
+def test_unknown_backend():
+    with pytest.raises(UnknownSolverBackend):
+        get_backend("gurobi")
+
+
+def test_highs_root_cuts(example_students, example_activities):
+    # Also runs in the CI job with the lowest highspy allowed, which does not know the option.
+    highspy = pytest.importorskip("highspy")
+    probe = highspy.Highs()
+    probe.setOptionValue("output_flag", False)
+    supported = probe.setOptionValue("mip_allow_cut_separation_at_nodes", False) == highspy.HighsStatus.kOk
+
+    backend = get_backend("highs")
+    backend.build(build_model(example_students, example_activities))
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        status = backend.solve(SolverSettings(backend="highs", cuts="root"))
+    assert status == "Optimal"
+    assert len(caught) == (0 if supported else 1)
+    if supported:
+        assert backend.highs.getOptionValue("mip_allow_cut_separation_at_nodes")[1] is False
+
+
+def test_cpsat_limits(example_students, example_activities):
+    if "cpsat" not in available_backends():
+        pytest.skip("ortools is not installed")
+    backend = get_backend("cpsat")
+    backend.build(build_model(example_students, example_activities))
+    assert backend.solve(SolverSettings(backend="cpsat")) == "Optimal"
+    assert backend.solver.parameters.max_time_in_seconds == CPSAT_DEFAULT_TIME_LIMIT
+    assert all(variable.domain[-1] <= 1 for variable in backend.cp_model.proto.variables)
+
+
+def test_installed_highspy_has_required_api():
+    # Fails instead of silently skipping the HiGHS tests when the installed highspy is older than required.
+    highspy = pytest.importorskip("highspy")
+    assert [name for name in HIGHS_REQUIRED_API if not hasattr(highspy.Highs, name)] == []
+    assert "highs" in available_backends()
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_progress_callback(example_students, example_activities, backend):
+    incumbents = []
+    model = build_model(example_students, example_activities)
+    result = solve_model(model, SolverSettings(backend=backend), progress_callback=incumbents.append)
+    assert len(incumbents) > 0
+    assert max(incumbents) == result.objective
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_time_limit_and_gap(example_students, example_activities, backend):
+    model = build_model(example_students, example_activities)
+    result = solve_model(model, SolverSettings(backend=backend, time_limit=10, gap=0.01))
+    assert result.status in ("Optimal", "Feasible")
+    assert result.objective == 27
+    assert result.gap is None or result.gap <= 0.01
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_cancel_before_start(example_students, example_activities, backend):
+    cancel_event = Event()
+    cancel_event.set()
+    model = build_model(example_students, example_activities)
+    result = solve_model(model, SolverSettings(backend=backend), cancel_event=cancel_event)
+    assert result.status == "Not Solved"
+    assert np.all(result.values == 0)
+
+
+@pytest.mark.parametrize("backend_name", ["cbc", "cbc-mps"])
+def test_cancel_kills_cbc(backend_name):
+    rng = random.Random(7)
+    activities = [
+        Activity(
+            name=str(idx),
+            min_capacity=rng.randint(0, 4),
+            max_capacity=rng.randint(5, 12),
+            timespan=Timespan.from_day_hour_minute(day, hour, 0, day, hour + 2, 0),
+        )
+        for idx, (day, hour) in enumerate((rng.randint(0, 4), rng.randint(12, 16)) for _ in range(500))
+    ]
+    students = [
+        Student(
+            name=str(idx),
+            grade=rng.randint(1, 4),
+            subgrade="a",
+            preferences={activity.id: rng.randint(1, 5) for activity in rng.sample(activities, 6)},
+        )
+        for idx in range(5000)
+    ]
+    model = build_model(students, activities)
+    backend = get_backend(backend_name)
+
+    # Cancelled only once CBC runs, so the kill is tested and not the check before the start.
+    cancel_event = Event()
+    cancelled_at = []
+
+    def cancel_when_running():
+        while backend.process is None:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        cancelled_at.append(time.monotonic())
+        cancel_event.set()
+
+    Thread(target=cancel_when_running, daemon=True).start()
+    result = solve_model(model, SolverSettings(backend=backend_name), cancel_event=cancel_event, backend=backend)
+    assert result.status == "Not Solved"
+    assert np.all(result.values == 0)
+    assert backend.process.returncode != 0
+    assert time.monotonic() - cancelled_at[0] < 1.5
+
+
+def _edit_plan(students: list[Student], activities: list[Activity]) -> None:
+    students[0].preferences = {activities[-1].id: 1}
+    del students[1]
+    activities[2].max_capacity += 3
+    activities[3].min_capacity = 2
+    students.append(Student(name="Neu", grade=2, subgrade="a", preferences={activities[0].id: 1}, id=1000))
+
+
+def test_pulp_backend_rebuild():
+    students, activities = generate_instance(GeneratorSettings(n_students=200, n_activities=12, overlap_density=1.0))
+    backend = get_backend("cbc")
+    backend.build(build_model(students, activities))
+    reused = set(map(id, backend.prob.constraints.values()))
+
+    _edit_plan(students, activities)
+    model = build_model(students, activities)
+    backend.build(model)
+    fresh = get_backend("cbc")
+    fresh.build(model)
+    assert {name: str(c) for name, c in backend.prob.constraints.items()} == {
+        name: str(c) for name, c in fresh.prob.constraints.items()
+    }
+    assert [(v.name, v.lowBound, v.upBound) for v in backend.columns] == [
+        (v.name, v.lowBound, v.upBound) for v in fresh.columns
+    ]
+    assert 0 < len(reused & set(map(id, backend.prob.constraints.values()))) < len(backend.prob.constraints)
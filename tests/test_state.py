@@ -2,6 +2,7 @@ import os.path
 from pathlib import Path
 
 from activity import ActivityIDGenerator
+from solver import SolverSettings
 from state import State
 from student import StudentIDGenerator
 
@@ -77,3 +78,18 @@ def test_state_write_read(example_students, example_activities, example_assignme
     assert example_assignment == state.assignment
 
     os.remove(test_path)
+
+
+def test_solver_settings_are_saved(example_state):
+    example_state.set_solver_settings(SolverSettings(backend="cbc", threads=8, seed=5, presolve=False, cuts="off"))
+    state_dict = example_state.as_dict()
+    example_state.reset()
+    assert example_state.solver_settings == SolverSettings(backend="cbc-mps")
+
+    example_state.from_dict(state_dict)
+    assert example_state.solver_settings == SolverSettings(backend="cbc", threads=8, seed=5, presolve=False, cuts="off")
+
+    # Older saves have no solver settings.
+    del state_dict["solver_settings"]
+    example_state.from_dict(state_dict)
+    assert example_state.solver_settings == SolverSettings(backend="cbc-mps")
@@ -0,0 +1,87 @@
+import pytest
+
+from activity import Activity, ActivityIDGenerator, Timespan, split_activity
+from assignment import MaximumCapacityReached, MinimumCapacityNotReached, solve_assignment
+from generator import GeneratorSettings, generate_instance
+from solver import SolverSettings
+from student import Student
+from symmetry import aggregate_interchangeable, find_interchangeable_activities
+
+
+@pytest.fixture
+def split_plan() -> tuple[list[Student], list[Activity]]:
+    activities = [
+        Activity(name="A", min_capacity=2, max_capacity=3, timespan=Timespan(10, 14)),
+        Activity(name="B", max_capacity=2, timespan=Timespan(12, 16)),
+    ]
+    students = [
+        Student(name=str(idx), grade=1, subgrade="a", preferences={1: 1 + idx % 2, 2: 2 - idx % 2}) for idx in range(9)
+    ]
+    activities.append(split_activity(activities[0], students))
+    return students, activities
+
+
+def test_find_interchangeable_activities(split_plan):
+    students, activities = split_plan
+    assert find_interchangeable_activities(students, activities) == [[activities[0], activities[2]]]
+
+    students[0].preferences[3] = 3
+    assert find_interchangeable_activities(students, activities) == []
+
+    students[0].preferences[3] = students[0].preferences[1]
+    activities[0].timespan = activities[2].timespan = Timespan(0, 0)
+    assert find_interchangeable_activities(students, activities) == []
+
+
+def test_aggregate_interchangeable(split_plan):
+    students, activities = split_plan
+    aggregation = aggregate_interchangeable(students, activities)
+    assert [activity.id for activity in aggregation.activities] == [1, 2]
+    assert (aggregation.activities[0].min_capacity, aggregation.activities[0].max_capacity) == (4, 6)
+    assert all(set(student.preferences) == {1, 2} for student in aggregation.students)
+    # The inputs are not modified.
+    assert activities[0].max_capacity == 3 and all(3 in student.preferences for student in students)
+
+
+def test_aggregated_solve_matches_full_solve(split_plan):
+    students, activities = split_plan
+    aggregated = solve_assignment(students, activities)
+    full = solve_assignment(students, activities, SolverSettings(aggregate_interchangeable=False))
+    assert aggregated.status == full.status == "Optimal"
+    assert aggregated.objective == full.objective
+    assert aggregated.stats.variables < full.stats.variables
+    assert not [
+        e
+        for e in aggregated.assignment.check_validity(students, activities)
+        if isinstance(e, (MinimumCapacityNotReached, MaximumCapacityReached))
+    ]
+
+
+def test_disaggregation_keeps_previous_activity(split_plan):
+    students, activities = split_plan
+    first = solve_assignment(students, activities)
+    second = solve_assignment(students, activities, initial_assignment=first.assignment, incremental=True)
+    assert second.assignment == first.assignment
+
+
+def test_aggregation_on_split_heavy_plan():
+    students, activities = generate_instance(
+        GeneratorSettings(n_students=300, n_activities=12, overlap_density=1.0, min_capacity_share=0.3), seed=1
+    )
+    ActivityIDGenerator().reset(len(activities) + 1)
+    for activity in activities[:6]:
+        activities.append(split_activity(activity, students))
+    aggregated = solve_assignment(students, activities)
+    full = solve_assignment(students, activities, SolverSettings(aggregate_interchangeable=False))
+    assert aggregated.objective == full.objective
+
+
+def test_disaggregate_pairs(split_plan):
+    students, activities = split_plan
+    aggregation = aggregate_interchangeable(students, activities)
+    pairs = [(student_id, 1) for student_id in range(1, 6)] + [(6, 2)]
+    split = aggregation.disaggregate_pairs(pairs, {(1, 3), (2, 3), (3, 3), (4, 3)})
+    assert sorted(split) == [(1, 3), (2, 3), (3, 3), (4, 1), (5, 1), (6, 2)]
+    # Without previous placements the minimum capacities are filled first.
+    split = aggregation.disaggregate_pairs(pairs)
+    assert sorted(activity_id for _, activity_id in split) == [1, 1, 1, 2, 3, 3]
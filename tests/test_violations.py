@@ -0,0 +1,49 @@
+import random
+
+from assignment import ActivityNotPreferred, Assignment, MaximumCapacityReached, OverlappingActivities, solve_assignment
+from generator import GeneratorSettings, generate_instance
+from violations import ViolationIndex
+
+
+def test_violation_index_follows_edits():
+    students, activities = generate_instance(
+        GeneratorSettings(n_students=60, n_activities=8, overlap_density=1.0, min_capacity_share=0.5), seed=2
+    )
+    index = ViolationIndex(students, activities, solve_assignment(students, activities).assignment)
+    assert list(map(str, index.violations())) == list(map(str, index.assignment.check_validity(students, activities)))
+
+    rng = random.Random(0)
+    for _ in range(300):
+        student, activity = rng.choice(students), rng.choice(activities)
+        if index.assignment.student_known(student.id) and activity.id in index.assignment.get_activities_for_student(
+            student.id
+        ):
+            index.remove_student_from_activity_by_id(student.id, activity.id)
+        else:
+            index.assign_student_to_activity_by_id(student.id, activity.id)
+        expected = index.assignment.check_validity(students, activities)
+        assert list(map(str, index.violations())) == list(map(str, expected))
+        assert index.is_valid() == (not expected)
+
+
+def test_violation_index_types(example_students, example_activities):
+    example_activities[1].timespan = example_activities[0].timespan
+    index = ViolationIndex(example_students, example_activities, Assignment())
+    index.assign_student_to_activity_by_id(1, 1)
+    index.assign_student_to_activity_by_id(2, 2)
+    assert index.is_valid()
+
+    index.assign_student_to_activity_by_id(2, 1)
+    index.assign_student_to_activity_by_id(1, 2)
+    assert [type(violation) for violation in index.violations()] == [
+        OverlappingActivities,
+        ActivityNotPreferred,
+        OverlappingActivities,
+        MaximumCapacityReached,
+    ]
+
+    # Changes to the plan itself are picked up by updating the affected activity.
+    example_activities[0].max_capacity = 2
+    index.update_activity(1)
+    index.remove_student_from_activity_by_id(2, 1)
+    assert [type(violation) for violation in index.violations()] == [OverlappingActivities]